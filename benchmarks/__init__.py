@@ -0,0 +1 @@
+# 空文件，用于标记目录为Python包 
\ No newline at end of file
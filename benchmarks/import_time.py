@@ -0,0 +1,88 @@
+"""
+启动导入耗时
+在新的解释器中用 -X importtime 导入 main.py 和各场景实际用到的服务模块，
+统计导入总耗时和按顶层包汇总的耗时，对比全量运行、仅账单和单个服务的启动开销
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --scenarios billing,cvm --repeat 10 --top 15
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from collections import Counter
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 场景：(说明, 调度的服务, 额外导入的模块)
+SCENARIOS = {
+    'all': ('全部服务，启用数据库和邮件', ['CVM', 'Lighthouse', 'CBS', 'Domain', 'SSL', 'Billing'],
+            ['mysql.connector', 'smtplib']),
+    'resources': ('全部资源服务', ['CVM', 'Lighthouse', 'CBS', 'Domain', 'SSL'], []),
+    'billing': ('仅账单', ['Billing'], []),
+    'cvm': ('仅 CVM', ['CVM'], []),
+}
+
+SCRIPT = """
+import importlib, main
+from monitoring_services.registry import load_service_class
+for name in {services!r}:
+    load_service_class(main.service_class_path(name))
+for module in {modules!r}:
+    importlib.import_module(module)
+"""
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Counter]:
+    """
+    解析 -X importtime 的输出
+    :return: (顶层导入的总耗时, 按顶层包汇总的自身耗时)，单位为毫秒
+    """
+    total = 0.0
+    packages = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            total += int(cumulative_us) / 1000
+        packages[name.strip().split('.')[0]] += int(self_us) / 1000
+    return total, packages
+
+
+def measure(python: str, services: List[str], modules: List[str]) -> Dict:
+    """在新的解释器中导入一次，返回导入耗时"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', SCRIPT.format(services=services, modules=modules)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True
+    )
+    total, packages = parse_importtime(result.stderr)
+    return {'total': total, 'packages': packages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='统计各运行场景的启动导入耗时')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"场景，逗号分隔，可选: {', '.join(SCENARIOS)}")
+    parser.add_argument('--repeat', type=int, default=5, help='每个场景的测量次数，取中位数')
+    parser.add_argument('--top', type=int, default=8, help='显示耗时最多的顶层包数量')
+    parser.add_argument('--python', default=sys.executable, help='使用的解释器')
+    args = parser.parse_args()
+
+    for key in args.scenarios.split(','):
+        title, services, modules = SCENARIOS[key.strip()]
+        runs = [measure(args.python, services, modules) for _ in range(max(1, args.repeat))]
+        totals = [run['total'] for run in runs]
+        median_run = sorted(runs, key=lambda run: run['total'])[len(runs) // 2]
+        print(f"[{key}] {title}：导入耗时中位数 {statistics.median(totals):.1f} ms"
+              f"（最小 {min(totals):.1f} ms，最大 {max(totals):.1f} ms）")
+        for package, elapsed in median_run['packages'].most_common(args.top):
+            print(f"    {package:<24} {elapsed:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
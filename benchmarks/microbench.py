@@ -0,0 +1,320 @@
+"""
+进程内微基准
+用 1k 到 1M 条合成资源分别测量过滤、通知格式化、邮件渲染、时间转换和数据库写入路径的耗时和内存峰值，
+并与保存的基线对比，渲染或写入路径变慢时直接给出倍数
+
+    python -m benchmarks.microbench                                # 默认 1k、10k、100k
+    python -m benchmarks.microbench --sizes 1000,1000000 --stages email,db
+    python -m benchmarks.microbench --save-baseline                # 将本次结果保存为基线
+    python -m benchmarks.microbench --fail-on-regression           # 超过阈值时退出码为 1
+
+数据库写入默认使用不连接 MySQL 的空连接，只测量行组装、SQL 生成和分块等客户端开销；
+加 --live-db 时按 .env 中的 DB_* 配置写入真实数据库
+"""
+import os
+import gc
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import statistics
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from utils.alert_utils import filter_resources_by_days
+from utils.expiry_index import ExpiryIndex
+from utils.resource_model import CVMRecord, CBSRecord, LighthouseRecord, DomainRecord, SSLRecord
+from utils.time_utils import begin_run, compute_differ_days, convert_utc_to_beijing
+from support_services.wechat_service import WeChatService
+from support_services.yunzhijia_service import YunZhiJiaService
+from support_services.email_service import EmailService
+from support_services.database_service import ConnectionPool, DatabaseService
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# 各类资源在合成数据中的占比
+TYPE_SHARES = (('CVM', 0.4), ('CBS', 0.3), ('Lighthouse', 0.1), ('Domain', 0.1), ('SSL', 0.1))
+REGIONS = ('ap-guangzhou', 'ap-shanghai', 'ap-beijing', 'ap-chengdu')
+
+
+def build_dataset(size: int, accounts: int, seed: int = 0) -> Dict:
+    """
+    生成合成资源，结构与采集结果一致
+    :return: {'accounts': [账号数据], 'resources': [(账号, 类型, 资源列表)], 'utc_times': [UTC 时间字符串]}
+    """
+    rng = random.Random(seed)
+    now = begin_run()
+    accounts = max(1, min(accounts, size))
+    all_accounts, flat, utc_times = [], [], []
+    for account_index in range(accounts):
+        account_name = f'bench-{account_index + 1}'
+        count = size // accounts + (1 if account_index < size % accounts else 0)
+        regional = {region: {} for region in REGIONS}
+        global_resources = {}
+        for service_type, share in TYPE_SHARES:
+            records = []
+            for i in range(int(count * share)):
+                expired = now + timedelta(days=rng.randint(-30, 365), seconds=rng.randint(0, 86399))
+                utc_times.append((expired - timedelta(hours=8)).strftime('%Y-%m-%dT%H:%M:%SZ'))
+                records.append(_record(service_type, account_index, i, expired.strftime('%Y-%m-%d %H:%M:%S'),
+                                       REGIONS[i % len(REGIONS)], rng))
+            for record, differ_days in zip(records, compute_differ_days(r['ExpiredTime'] for r in records)):
+                record.DifferDays = differ_days
+            flat.append((account_name, service_type, records))
+            if service_type in ('Domain', 'SSL'):
+                global_resources[service_type] = records
+            else:
+                for region in REGIONS:
+                    regional[region][service_type] = [r for r in records if r['Region'] == region]
+        all_accounts.append({
+            'account_name': account_name,
+            'resources': {'regional': regional, 'global': global_resources},
+            'billing': {
+                'balance': round(rng.uniform(0, 100000), 2),
+                'bill_details': {
+                    f'project-{p}': {'total': 100.0, 'services': {
+                        name: {'RealTotalCost': 50.0, 'TotalCost': 55.0, 'CashPayAmount': 50.0}
+                        for name in ('云服务器CVM', '云硬盘CBS')
+                    }} for p in range(5)
+                }
+            }
+        })
+    return {'accounts': all_accounts, 'resources': flat, 'utc_times': utc_times}
+
+
+def _record(service_type: str, account_index: int, i: int, expired_time: str, region: str, rng):
+    project = f'project-{rng.randrange(5)}'
+    zone = f'{region}-{i % 3 + 1}'
+    if service_type == 'CVM':
+        return CVMRecord(Type='CVM', InstanceId=f'ins-{account_index}-{i}', InstanceName=f'cvm-{i}',
+                         Zone=zone, ProjectName=project, ExpiredTime=expired_time, Region=region)
+    if service_type == 'Lighthouse':
+        return LighthouseRecord(Type='Lighthouse', InstanceId=f'lhins-{account_index}-{i}',
+                                InstanceName=f'lighthouse-{i}', Zone=zone, ExpiredTime=expired_time, Region=region)
+    if service_type == 'CBS':
+        return CBSRecord(Type='CBS', DiskId=f'disk-{account_index}-{i}', DiskName=f'disk-{i}', ProjectId=0,
+                         ProjectName=project, Zone=zone, ExpiredTime=expired_time, Status='ATTACHED', Region=region)
+    if service_type == 'Domain':
+        return DomainRecord(Type='Domain', DomainId=f'domain-{account_index}-{i}', Domain=f'example-{i}.com',
+                            ProjectId=0, ProjectName=project, Zone='全球', ExpiredTime=expired_time, Status=[])
+    return SSLRecord(Type='SSL', CertificateId=f'cert-{account_index}-{i}', Domain=f'www.example-{i}.com',
+                     AllDomains=[f'www.example-{i}.com'], ProjectId='0', ProjectName=project,
+                     ExpiredTime=expired_time, Status='证书已颁发', IsWildcard=False, ProductName='SecureSite OV')
+
+
+class _NullCursor:
+    """不访问数据库的游标，只接收参数"""
+    rowcount = 0
+
+    def execute(self, sql, params=()):
+        self.rowcount = len(params)
+
+    def close(self):
+        pass
+
+
+class _NullConnection:
+    connection_id = 0
+
+    def cursor(self, prepared=False):
+        return _NullCursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class _NullPool(ConnectionPool):
+    """连接池逻辑不变，只将连接替换为空连接"""
+
+    def _connect(self):
+        connection = _NullConnection()
+        self._connections.append(connection)
+        return connection
+
+
+def offline_database_service(batch_size: int = 500) -> DatabaseService:
+    """创建只执行客户端写入路径的数据库服务"""
+    service = DatabaseService.__new__(DatabaseService)
+    service.logger = logging.getLogger('TencentCloudMonitor')
+    service.db_config = {}
+    service.enabled = True
+    service.batch_size = batch_size
+    service.current_batch = service._generate_batch_number()
+    service.snapshots = None
+    service.pool = _NullPool({}, pool_size=1)
+    return service
+
+
+def live_database_service() -> DatabaseService:
+    """按 DB_* 环境变量连接真实数据库"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    return DatabaseService({
+        'enable_db': True,
+        'database': os.getenv('DB_DATABASE'),
+        'user': os.getenv('DB_USER'),
+        'password': os.getenv('DB_PASSWORD'),
+        'host': os.getenv('DB_HOST'),
+        'port': os.getenv('DB_PORT', '3306'),
+        'batch_size': os.getenv('DB_BATCH_SIZE', '500'),
+        'pool_size': os.getenv('DB_POOL_SIZE', '4')
+    })
+
+
+def build_stages(dataset: Dict, db_service: DatabaseService) -> Dict[str, Callable[[], object]]:
+    """各测量阶段，键为阶段名，值为无参函数"""
+    accounts = dataset['accounts']
+    wechat = WeChatService({})
+    yunzhijia = YunZhiJiaService({})
+    email = EmailService({
+        'smtp_server': 'localhost', 'smtp_port': 25, 'sender': 'bench@example.com',
+        'password': '', 'receivers': [], 'use_ssl': False
+    })
+    # Markdown 转文本的输入是企业微信格式的消息，提前生成，不计入该阶段
+    markdown = [
+        wechat.format_resource_message(account['account_name'], account['resources']['regional'],
+                                       account['resources']['global'])
+        for account in accounts
+    ]
+
+    def wechat_format():
+        return [wechat.format_resource_message(account['account_name'], account['resources']['regional'],
+                                               account['resources']['global']) for account in accounts]
+
+    def database_write():
+        return sum(db_service.insert_resources(account_name, service_type, records)
+                   for account_name, service_type, records in dataset['resources'])
+
+    return {
+        'time.convert_utc_to_beijing': lambda: [convert_utc_to_beijing(value) for value in dataset['utc_times']],
+        'alert.filter_resources_by_days': lambda: [
+            filter_resources_by_days(records, 30) for _, _, records in dataset['resources']
+        ],
+        'index.from_accounts': lambda: ExpiryIndex.from_accounts(accounts),
+        'wechat.format_resource_message': wechat_format,
+        'yunzhijia.convert_markdown_to_text': lambda: [yunzhijia.convert_markdown_to_text(text) for text in markdown],
+        'email.format_summary_message': lambda: email.format_summary_message(accounts),
+        'db.insert_resources': database_write,
+    }
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict:
+    """先单独运行一次统计内存峰值（同时作为预热），再计时 repeat 次取最小值和中位数"""
+    # tracemalloc 会明显拖慢运行，不与计时混在一起
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return {
+        'min_s': round(min(times), 6),
+        'median_s': round(statistics.median(times), 6),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """与基线对比，返回超过阈值的回退项"""
+    regressions = []
+    print(f"\n与基线对比（{baseline.get('created_at', '未知时间')}，阈值 {threshold:.2f} 倍）:")
+    for stage, sizes in results.items():
+        for size, current in sizes.items():
+            previous = baseline.get('results', {}).get(stage, {}).get(size)
+            if not previous:
+                continue
+            time_ratio = current['min_s'] / previous['min_s'] if previous['min_s'] else 1.0
+            memory_ratio = current['peak_kb'] / previous['peak_kb'] if previous['peak_kb'] else 1.0
+            flag = ''
+            if time_ratio > threshold or memory_ratio > threshold:
+                flag = '  <-- 回退'
+                regressions.append(f'{stage}@{size}')
+            print(f"  {stage:<36} {size:>8}  耗时 {time_ratio:5.2f}x  内存 {memory_ratio:5.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='格式化、过滤和数据库写入路径的微基准')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='资源总数，逗号分隔，如 1000,1000000')
+    parser.add_argument('--accounts', type=int, default=10, help='账号数量')
+    parser.add_argument('--stages', help='只运行名称包含这些关键字的阶段，逗号分隔，如 email,db')
+    parser.add_argument('--repeat', type=int, default=3, help='每个阶段的计时次数')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件路径')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=1.2, help='耗时或内存超过基线的倍数视为回退')
+    parser.add_argument('--fail-on-regression', action='store_true', help='出现回退时退出码为 1')
+    parser.add_argument('--output', help='将本次结果写入 JSON 文件')
+    parser.add_argument('--live-db', action='store_true', help='写入 DB_* 配置的真实数据库')
+    args = parser.parse_args()
+
+    # 写入路径每批都会记录日志，基准测试时关闭
+    logging.getLogger('TencentCloudMonitor').setLevel(logging.WARNING)
+    db_service = live_database_service() if args.live_db else offline_database_service()
+    keywords = [keyword.strip() for keyword in (args.stages or '').split(',') if keyword.strip()]
+
+    results: Dict[str, Dict[str, Dict]] = {}
+    try:
+        for size in [int(value) for value in args.sizes.split(',') if value.strip()]:
+            started = time.perf_counter()
+            dataset = build_dataset(size, args.accounts)
+            print(f"\n== {size} 条资源，{args.accounts} 个账号（生成耗时 {time.perf_counter() - started:.2f}s）")
+            for stage, func in build_stages(dataset, db_service).items():
+                if keywords and not any(keyword in stage for keyword in keywords):
+                    continue
+                result = measure(func, max(1, args.repeat))
+                results.setdefault(stage, {})[str(size)] = result
+                print(f"  {stage:<36} 最小 {result['min_s'] * 1000:10.2f} ms  "
+                      f"中位 {result['median_s'] * 1000:10.2f} ms  内存峰值 {result['peak_kb'] / 1024:8.2f} MB")
+            del dataset
+    finally:
+        db_service.close()
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'accounts': args.accounts,
+        'live_db': args.live_db,
+        'results': results
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+    elif not args.save_baseline:
+        print(f"\n基线文件 {args.baseline} 不存在，可使用 --save-baseline 生成")
+
+    for path in filter(None, [args.output, args.baseline if args.save_baseline else None]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {path}")
+
+    if regressions and args.fail_on_regression:
+        print(f"性能回退: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,463 @@
+"""
+本地腾讯云API模拟服务
+按 TC3-HMAC-SHA256 校验签名，按产品和接口返回确定性的合成资源数据，
+并可注入延迟、限频和服务端错误，用于在不访问真实账号的情况下压测 main.py
+
+单独运行：
+    python -m benchmarks.mock_api_server --port 8900 --resources 200
+    TENCENTCLOUD_API_ENDPOINT=127.0.0.1:8900 TENCENTCLOUD_API_PROTOCOL=http python main.py
+"""
+import hmac
+import json
+import time
+import uuid
+import zlib
+import random
+import hashlib
+import argparse
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from socketserver import ThreadingMixIn
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+# DescribeRegions 返回的地域，数量不够时追加 ap-bench-N
+REGIONS = [
+    'ap-guangzhou', 'ap-shanghai', 'ap-beijing', 'ap-chengdu', 'ap-chongqing', 'ap-nanjing',
+    'ap-hongkong', 'ap-singapore', 'ap-tokyo', 'ap-seoul', 'ap-bangkok', 'ap-jakarta',
+    'ap-mumbai', 'eu-frankfurt', 'na-siliconvalley', 'na-ashburn'
+]
+
+def region_names(count: int) -> List[str]:
+    """前 count 个地域名称"""
+    return REGIONS[:count] + [f'ap-bench-{i}' for i in range(len(REGIONS) + 1, count + 1)]
+
+
+def _rng(*key) -> random.Random:
+    # 同一账号、产品、地域每次生成相同的资源，便于多次运行结果对比
+    return random.Random(zlib.crc32('/'.join(str(part) for part in key).encode('utf-8')))
+
+
+class FleetGenerator:
+    """
+    合成资源生成器
+    每个 (账号, 产品, 地域) 生成固定数量的资源，到期时间分布在过去 30 天到未来一年之间，
+    部分云服务器为按量计费（没有到期时间）
+    """
+
+    def __init__(self, resources_per_region: int = 50, global_resources: int = 20,
+                 projects: int = 5, postpaid_ratio: float = 0.2, regions: int = 3):
+        """
+        :param resources_per_region: 每个账号每个地域的云服务器、云硬盘、轻量应用服务器数量
+        :param global_resources: 每个账号的域名和 SSL 证书数量
+        :param projects: 项目数量
+        :param postpaid_ratio: 按量计费云服务器的比例
+        :param regions: DescribeRegions 返回的地域数量
+        """
+        self.resources_per_region = max(0, resources_per_region)
+        self.global_resources = max(0, global_resources)
+        self.projects = max(1, projects)
+        self.postpaid_ratio = postpaid_ratio
+        self.regions = region_names(max(1, regions))
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.cache: Dict[tuple, List[Dict]] = {}
+        self.lock = threading.Lock()
+
+    def items(self, secret_id: str, product: str, region: str, builder: Callable, count: int) -> List[Dict]:
+        """生成并缓存一组资源，分页请求只生成一次"""
+        key = (secret_id, product, region)
+        with self.lock:
+            items = self.cache.get(key)
+        if items is None:
+            rng = _rng(*key)
+            items = [builder(rng, i) for i in range(count)]
+            with self.lock:
+                self.cache[key] = items
+        return items
+
+    def expire_at(self, rng: random.Random) -> datetime:
+        return self.now + timedelta(days=rng.randint(-30, 365), seconds=rng.randint(0, 86399))
+
+    def project_id(self, rng: random.Random) -> int:
+        return rng.randrange(self.projects)
+
+    def cvm(self, rng, i, region):
+        expired = None if rng.random() < self.postpaid_ratio else self.expire_at(rng)
+        return {
+            'InstanceId': f'ins-{region}-{i:06d}',
+            'InstanceName': f'cvm-{region}-{i}',
+            'InstanceChargeType': 'POSTPAID_BY_HOUR' if expired is None else 'PREPAID',
+            'Placement': {'Zone': f'{region}-{i % 3 + 1}', 'ProjectId': self.project_id(rng)},
+            'ExpiredTime': expired.strftime('%Y-%m-%dT%H:%M:%SZ') if expired else None
+        }
+
+    def lighthouse(self, rng, i, region):
+        return {
+            'InstanceId': f'lhins-{region}-{i:06d}',
+            'InstanceName': f'lighthouse-{region}-{i}',
+            'Zone': f'{region}-{i % 3 + 1}',
+            'ExpiredTime': self.expire_at(rng).strftime('%Y-%m-%dT%H:%M:%SZ')
+        }
+
+    def cbs(self, rng, i, region):
+        project_id = self.project_id(rng)
+        expired = self.expire_at(rng) + timedelta(hours=8)
+        return {
+            'DiskId': f'disk-{region}-{i:06d}',
+            'DiskName': f'disk-{region}-{i}',
+            'DiskState': 'ATTACHED',
+            'Placement': {'Zone': f'{region}-{i % 3 + 1}', 'ProjectId': project_id,
+                          'ProjectName': f'project-{project_id}'},
+            'DeadlineTime': expired.strftime('%Y-%m-%d %H:%M:%S'),
+            'DifferDaysOfDeadline': (expired - self.now - timedelta(hours=8)).days
+        }
+
+    def domain(self, rng, i):
+        return {
+            'DomainId': f'domain-{i:06d}',
+            'DomainName': f'example-{i}.com',
+            'ExpirationDate': (self.expire_at(rng) + timedelta(hours=8)).strftime('%Y-%m-%d'),
+            'DomainStatus': []
+        }
+
+    def certificate(self, rng, i):
+        project_id = self.project_id(rng)
+        wildcard = i % 4 == 0
+        return {
+            'CertificateId': f'cert-{i:06d}',
+            'Domain': f'*.example-{i}.com' if wildcard else f'www.example-{i}.com',
+            'CertSANs': [],
+            'StatusName': '证书已颁发' if i % 10 else '已过期',
+            'CertEndTime': (self.expire_at(rng) + timedelta(hours=8)).strftime('%Y-%m-%d %H:%M:%S'),
+            'ProjectId': str(project_id),
+            'ProjectInfo': {'ProjectName': f'project-{project_id}'},
+            'ProductZhName': 'TrustAsia TLS RSA CA' if i % 2 else 'SecureSite OV',
+            'IsWildcard': wildcard
+        }
+
+
+class MockCloudAPI:
+    """
+    模拟云API的业务逻辑，与 HTTP 层分离，便于在同一进程内直接调用
+    按 (产品, 接口) 路由到处理函数，返回与官方接口同名的响应字段
+    """
+
+    def __init__(self, fleet: FleetGenerator = None, secret_keys: Dict[str, str] = None,
+                 latency_ms: float = 0, latency_jitter_ms: float = 0, throttle_rate: float = 0,
+                 error_rate: float = 0, qps_limit: float = 0):
+        """
+        :param secret_keys: {SecretId: SecretKey}，用于校验签名，None 表示不校验
+        :param latency_ms: 每次请求的固定延迟毫秒数
+        :param latency_jitter_ms: 额外的指数分布延迟均值，模拟长尾
+        :param throttle_rate: 随机返回 RequestLimitExceeded 的比例
+        :param error_rate: 随机返回 InternalError 的比例
+        :param qps_limit: 每个 (SecretId, 产品, 接口) 每秒允许的请求数，超出返回 RequestLimitExceeded，0 表示不限
+        """
+        self.fleet = fleet or FleetGenerator()
+        self.secret_keys = secret_keys
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.qps_limit = qps_limit
+        self.windows: Dict[tuple, deque] = {}
+        self.lock = threading.Lock()
+        self.reset_stats()
+        self.routes: Dict[Tuple[str, str], Callable] = {
+            ('cvm', 'DescribeInstances'): self.describe_cvm_instances,
+            ('cvm', 'DescribeRegions'): self.describe_regions,
+            ('lighthouse', 'DescribeInstances'): self.describe_lighthouse_instances,
+            ('lighthouse', 'DescribeRegions'): self.describe_regions,
+            ('cbs', 'DescribeDisks'): self.describe_disks,
+            ('domain', 'DescribeDomainNameList'): self.describe_domains,
+            ('ssl', 'DescribeCertificates'): self.describe_certificates,
+            ('tag', 'DescribeProjects'): self.describe_projects,
+            ('billing', 'DescribeAccountBalance'): self.describe_account_balance,
+            ('billing', 'DescribeBillSummary'): self.describe_bill_summary,
+        }
+
+    def reset_stats(self):
+        """清空调用统计"""
+        with self.lock:
+            self.calls: Dict[str, int] = {}
+            self.outcomes: Dict[str, int] = {}
+            self.latencies: List[float] = []
+
+    def get_stats(self) -> Dict:
+        """获取调用统计：各接口调用次数、各结果次数和服务端处理耗时（秒）"""
+        with self.lock:
+            return {
+                'calls': dict(self.calls),
+                'outcomes': dict(self.outcomes),
+                'latencies': list(self.latencies)
+            }
+
+    def handle(self, headers: Dict[str, str], body: bytes) -> Dict:
+        """处理一次请求，返回 {"Response": {...}}"""
+        started = time.perf_counter()
+        action = headers.get('x-tc-action', '')
+        region = headers.get('x-tc-region') or ''
+        secret_id, product, error = self.authenticate(headers, body)
+        request_id = str(uuid.uuid4())
+        key = f'{product}.{action}'
+
+        if error is None and (product, action) not in self.routes:
+            error = ('InvalidAction', f'模拟服务不支持接口 {key}')
+        if error is None:
+            error = self.inject_fault(secret_id, product, action)
+        if error is None:
+            try:
+                params = json.loads(body or b'{}')
+                response = self.routes[(product, action)](secret_id, region, params)
+            except Exception as e:
+                error = ('InternalError', str(e))
+
+        outcome = 'ok' if error is None else error[0]
+        if error is not None:
+            response = {'Error': {'Code': error[0], 'Message': error[1]}}
+        response['RequestId'] = request_id
+
+        # 注入的延迟计入服务端耗时，与真实接口的响应时间对应
+        delay = self.latency_ms / 1000
+        if self.latency_jitter_ms > 0:
+            delay += random.expovariate(1000 / self.latency_jitter_ms)
+        if delay > 0:
+            time.sleep(delay)
+        with self.lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            self.latencies.append(time.perf_counter() - started)
+        return {'Response': response}
+
+    def authenticate(self, headers: Dict[str, str], body: bytes) -> Tuple[str, str, Optional[Tuple[str, str]]]:
+        """解析并校验 TC3-HMAC-SHA256 签名，返回 (SecretId, 产品, 错误)"""
+        authorization = headers.get('authorization', '')
+        try:
+            algorithm, rest = authorization.split(' ', 1)
+            fields = dict(part.strip().split('=', 1) for part in rest.split(','))
+            secret_id, date, product, _ = fields['Credential'].split('/')
+            signed_headers = fields['SignedHeaders']
+            signature = fields['Signature']
+        except (ValueError, KeyError):
+            return '', '', ('AuthFailure.SignatureFailure', '无法解析 Authorization 请求头')
+        if algorithm != 'TC3-HMAC-SHA256':
+            return secret_id, product, ('AuthFailure.SignatureFailure', f'不支持的签名算法 {algorithm}')
+        if self.secret_keys is None:
+            return secret_id, product, None
+        secret_key = self.secret_keys.get(secret_id)
+        if secret_key is None:
+            return secret_id, product, ('AuthFailure.SecretIdNotFound', f'SecretId 不存在: {secret_id}')
+
+        canonical_headers = ''.join(
+            f"{name}:{headers.get(name, '').strip().lower() if name == 'content-type' else headers.get(name, '').strip()}\n"
+            for name in signed_headers.split(';')
+        )
+        canonical_request = '\n'.join([
+            'POST', '/', '', canonical_headers, signed_headers, hashlib.sha256(body).hexdigest()
+        ])
+        string_to_sign = '\n'.join([
+            algorithm, headers.get('x-tc-timestamp', ''), f'{date}/{product}/tc3_request',
+            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+        ])
+
+        def _hmac(key: bytes, msg: str) -> bytes:
+            return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
+
+        signing_key = _hmac(_hmac(_hmac(('TC3' + secret_key).encode('utf-8'), date), product), 'tc3_request')
+        expected = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, signature):
+            return secret_id, product, ('AuthFailure.SignatureFailure', '签名校验失败')
+        return secret_id, product, None
+
+    def inject_fault(self, secret_id: str, product: str, action: str) -> Optional[Tuple[str, str]]:
+        """按配置注入限频和服务端错误"""
+        if self.qps_limit > 0:
+            now = time.monotonic()
+            with self.lock:
+                window = self.windows.setdefault((secret_id, product, action), deque())
+                while window and now - window[0] >= 1:
+                    window.popleft()
+                if len(window) >= self.qps_limit:
+                    return 'RequestLimitExceeded', '请求的次数超过了频率限制'
+                window.append(now)
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            return 'RequestLimitExceeded', '请求的次数超过了频率限制'
+        if self.error_rate and random.random() < self.error_rate:
+            return 'InternalError', '内部错误'
+        return None
+
+    @staticmethod
+    def page(items: List[Dict], params: Dict, items_key: str, total_key: str = 'TotalCount') -> Dict:
+        offset = int(params.get('Offset') or 0)
+        limit = int(params.get('Limit') or 20)
+        return {total_key: len(items), items_key: items[offset:offset + limit]}
+
+    def describe_regions(self, secret_id, region, params):
+        return {
+            'TotalCount': len(self.fleet.regions),
+            'RegionSet': [{'Region': name, 'RegionName': name, 'RegionState': 'AVAILABLE'}
+                          for name in self.fleet.regions]
+        }
+
+    def describe_cvm_instances(self, secret_id, region, params):
+        fleet = self.fleet
+        items = fleet.items(secret_id, 'cvm', region, lambda rng, i: fleet.cvm(rng, i, region),
+                            fleet.resources_per_region)
+        return self.page(items, params, 'InstanceSet')
+
+    def describe_lighthouse_instances(self, secret_id, region, params):
+        fleet = self.fleet
+        items = fleet.items(secret_id, 'lighthouse', region, lambda rng, i: fleet.lighthouse(rng, i, region),
+                            fleet.resources_per_region)
+        return self.page(items, params, 'InstanceSet')
+
+    def describe_disks(self, secret_id, region, params):
+        fleet = self.fleet
+        items = fleet.items(secret_id, 'cbs', region, lambda rng, i: fleet.cbs(rng, i, region),
+                            fleet.resources_per_region)
+        return self.page(items, params, 'DiskSet')
+
+    def describe_domains(self, secret_id, region, params):
+        items = self.fleet.items(secret_id, 'domain', '', self.fleet.domain, self.fleet.global_resources)
+        return self.page(items, params, 'DomainSet')
+
+    def describe_certificates(self, secret_id, region, params):
+        items = self.fleet.items(secret_id, 'ssl', '', self.fleet.certificate, self.fleet.global_resources)
+        return self.page(items, params, 'Certificates')
+
+    def describe_projects(self, secret_id, region, params):
+        projects = [{'ProjectId': i, 'ProjectName': f'project-{i}'} for i in range(self.fleet.projects)]
+        return self.page(projects, params, 'Projects', total_key='Total')
+
+    def describe_account_balance(self, secret_id, region, params):
+        # 余额单位为分
+        return {'RealBalance': _rng(secret_id, 'balance').randint(0, 10 ** 8)}
+
+    def describe_bill_summary(self, secret_id, region, params):
+        rng = _rng(secret_id, 'bill', params.get('Month'))
+        details = []
+        for project_id in range(self.fleet.projects):
+            business = [
+                {'BusinessCodeName': name, 'RealTotalCost': f'{cost:.2f}', 'TotalCost': f'{cost * 1.1:.2f}',
+                 'CashPayAmount': f'{cost:.2f}'}
+                for name, cost in (('云服务器CVM', rng.uniform(0, 5000)), ('云硬盘CBS', rng.uniform(0, 800)),
+                                   ('SSL证书', rng.uniform(0, 300)))
+            ]
+            total = sum(float(item['RealTotalCost']) for item in business)
+            details.append({
+                'GroupKey': str(project_id), 'GroupValue': f'project-{project_id}',
+                'RealTotalCost': f'{total:.2f}', 'TotalCost': f'{total * 1.1:.2f}', 'Business': business
+            })
+        return {'Ready': 1, 'SummaryDetail': details}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支持长连接，与 SDK 的 keepAlive 一致
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        payload = json.dumps(self.server.api.handle(headers, body), ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockAPIServer(ThreadingMixIn, HTTPServer):
+    """模拟云API的 HTTP 服务，每个连接一个线程"""
+    daemon_threads = True
+
+    def __init__(self, api: MockCloudAPI, host: str = '127.0.0.1', port: int = 0):
+        """
+        :param port: 监听端口，0 表示随机选择空闲端口
+        """
+        super().__init__((host, port), _Handler)
+        self.api = api
+        self.thread = None
+
+    @property
+    def endpoint(self) -> str:
+        """供 TENCENTCLOUD_API_ENDPOINT 使用的地址，如 127.0.0.1:8900"""
+        host, port = self.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self) -> 'MockAPIServer':
+        """在后台线程中运行"""
+        self.thread = threading.Thread(target=self.serve_forever, name='mock-api', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def add_fleet_arguments(parser: argparse.ArgumentParser):
+    """添加资源规模和故障注入参数，压测脚本复用"""
+    parser.add_argument('--regions', type=int, default=3, help='地域数量')
+    parser.add_argument('--resources', type=int, default=50,
+                        help='每个账号每个地域的云服务器、云硬盘、轻量应用服务器数量')
+    parser.add_argument('--global-resources', type=int, default=20, help='每个账号的域名和 SSL 证书数量')
+    parser.add_argument('--projects', type=int, default=5, help='项目数量')
+    parser.add_argument('--latency-ms', type=float, default=20, help='每次请求的固定延迟毫秒数')
+    parser.add_argument('--latency-jitter-ms', type=float, default=10, help='额外的指数分布延迟均值（毫秒）')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='随机返回限频错误的比例')
+    parser.add_argument('--error-rate', type=float, default=0, help='随机返回 InternalError 的比例')
+    parser.add_argument('--qps-limit', type=float, default=0, help='每个账号每个接口每秒允许的请求数，0 表示不限')
+
+
+def build_api(args, secret_keys: Dict[str, str] = None) -> MockCloudAPI:
+    """按命令行参数创建模拟云API"""
+    fleet = FleetGenerator(args.resources, args.global_resources, args.projects, regions=args.regions)
+    return MockCloudAPI(
+        fleet, secret_keys,
+        latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+        throttle_rate=args.throttle_rate, error_rate=args.error_rate, qps_limit=args.qps_limit
+    )
+
+
+class _SharedKey(dict):
+    """所有 SecretId 共用同一个 SecretKey"""
+
+    def __init__(self, secret_key: str):
+        super().__init__()
+        self.secret_key = secret_key
+
+    def get(self, key, default=None):
+        return self.secret_key
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地腾讯云API模拟服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--secret-key', help='所有 SecretId 共用的 SecretKey，设置后校验签名')
+    add_fleet_arguments(parser)
+    args = parser.parse_args()
+
+    api = build_api(args)
+    if args.secret_key:
+        api.secret_keys = _SharedKey(args.secret_key)
+    server = MockAPIServer(api, args.host, args.port)
+    print(f"模拟云API已启动: {server.endpoint}")
+    print(f"TENCENTCLOUD_API_ENDPOINT={server.endpoint} TENCENTCLOUD_API_PROTOCOL=http")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"调用统计: {json.dumps(api.get_stats()['calls'], ensure_ascii=False)}")
+
+
+if __name__ == '__main__':
+    main()
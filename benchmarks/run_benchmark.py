@@ -0,0 +1,156 @@
+"""
+端到端压测
+启动本地模拟云API，用 N 个账号 × M 个地域的合成资源驱动完整的 main.py 运行，
+统计耗时、API 调用次数、接口延迟 p50/p99 和进程峰值内存
+
+    python -m benchmarks.run_benchmark --accounts 10 --regions 5 --resources 200
+    python -m benchmarks.run_benchmark --accounts 20 --throttle-rate 0.05 --repeat 3 --output logs/bench.json
+    python -m benchmarks.run_benchmark --env COLLECT_MAX_WORKERS=16 --env API_PAGE_PREFETCH=true
+
+main.py 在子进程中运行，通知、数据库和 API 缓存默认关闭，可用 --env 覆盖
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks.mock_api_server import MockAPIServer, add_fleet_arguments, build_api, region_names
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程的固定配置，保证压测只访问模拟服务，不发送任何通知
+BASE_ENV = {
+    'TENCENTCLOUD_API_PROTOCOL': 'http',
+    'ENABLE_WECHAT_ALERT': 'false',
+    'ENABLE_YUNZHIJIA_ALERT': 'false',
+    'ENABLE_EMAIL_ALERT': 'false',
+    'ENABLE_DATABASE': 'false',
+    'ENABLE_API_CACHE': 'false',
+    'EMPTY_REGION_TTL_HOURS': '0',
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[min(len(ordered), max(1, rank)) - 1]
+
+
+def build_env(args, endpoint: str) -> Dict[str, str]:
+    """生成子进程环境变量：模拟服务地址、合成账号和地域"""
+    env = dict(os.environ)
+    env.update(BASE_ENV)
+    env['TENCENTCLOUD_API_ENDPOINT'] = endpoint
+    env['RESOURCE_SERVICE_REGIONS'] = ','.join(region_names(args.regions))
+    for i in range(1, args.accounts + 1):
+        env[f'ACCOUNT{i}_NAME'] = f'bench-{i}'
+        env[f'ACCOUNT{i}_SECRET_ID'] = f'AKIDbench{i:04d}'
+        env[f'ACCOUNT{i}_SECRET_KEY'] = f'bench-key-{i}'
+    # 账号按序号读取，置空下一个序号，避免 .env 中的真实账号混入
+    env[f'ACCOUNT{args.accounts + 1}_NAME'] = ''
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key.strip()] = value
+    return env
+
+
+def run_main(args, env: Dict[str, str]) -> Dict:
+    """运行一次 main.py，返回耗时、退出码和峰值内存"""
+    command = [args.python, os.path.join(ROOT, 'main.py'), '--mode', args.mode]
+    output = None if args.show_output else subprocess.DEVNULL
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=output, stderr=output)
+    # wait4 返回子进程自己的资源占用，ru_maxrss 在 Linux 上以 KB 为单位
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    peak_rss_kb = usage.ru_maxrss if platform.system() == 'Linux' else usage.ru_maxrss // 1024
+    return {
+        'wall_time': round(elapsed, 3),
+        'exit_code': process.returncode,
+        'peak_rss_mb': round(peak_rss_kb / 1024, 1),
+        'cpu_time': round(usage.ru_utime + usage.ru_stime, 3)
+    }
+
+
+def summarize(run: Dict, stats: Dict) -> Dict:
+    """合并一次运行的进程指标和模拟服务端的调用统计"""
+    latencies = stats['latencies']
+    return dict(
+        run,
+        api_calls=sum(stats['calls'].values()),
+        api_calls_by_action=dict(sorted(stats['calls'].items())),
+        outcomes=stats['outcomes'],
+        latency_p50_ms=round(percentile(latencies, 50) * 1000, 2),
+        latency_p99_ms=round(percentile(latencies, 99) * 1000, 2),
+        latency_max_ms=round(max(latencies, default=0) * 1000, 2)
+    )
+
+
+def print_result(index: int, result: Dict):
+    print(f"[第 {index} 次] 耗时 {result['wall_time']}s，CPU {result['cpu_time']}s，"
+          f"峰值内存 {result['peak_rss_mb']} MB，退出码 {result['exit_code']}")
+    print(f"    API 调用 {result['api_calls']} 次，延迟 p50 {result['latency_p50_ms']} ms，"
+          f"p99 {result['latency_p99_ms']} ms，最大 {result['latency_max_ms']} ms")
+    print(f"    结果: {json.dumps(result['outcomes'], ensure_ascii=False)}")
+    for action, count in result['api_calls_by_action'].items():
+        print(f"    {action}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='基于本地模拟云API的端到端压测')
+    parser.add_argument('--accounts', type=int, default=3, help='账号数量')
+    parser.add_argument('--mode', choices=['all', 'resources', 'billing'], default='all', help='main.py 的运行模式')
+    parser.add_argument('--repeat', type=int, default=1, help='重复运行次数')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='传给 main.py 的额外环境变量，可多次指定')
+    parser.add_argument('--python', default=sys.executable, help='运行 main.py 的解释器')
+    parser.add_argument('--output', help='将结果写入 JSON 文件')
+    parser.add_argument('--show-output', action='store_true', help='显示 main.py 的输出')
+    add_fleet_arguments(parser)
+    args = parser.parse_args()
+
+    secret_keys = {f'AKIDbench{i:04d}': f'bench-key-{i}' for i in range(1, args.accounts + 1)}
+    api = build_api(args, secret_keys)
+    server = MockAPIServer(api).start()
+    print(f"模拟云API: {server.endpoint}，{args.accounts} 个账号 × {args.regions} 个地域，"
+          f"每个地域每类资源 {args.resources} 个")
+
+    results = []
+    try:
+        env = build_env(args, server.endpoint)
+        for index in range(1, args.repeat + 1):
+            api.reset_stats()
+            result = summarize(run_main(args, env), api.get_stats())
+            results.append(result)
+            print_result(index, result)
+    finally:
+        server.stop()
+
+    if args.output:
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'parameters': {key: value for key, value in vars(args).items() if key not in ('python', 'output')},
+            'runs': results
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+    if any(result['exit_code'] != 0 for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
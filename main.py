@@ -1,31 +1,42 @@
 import argparse
 import os
-from utils.client import get_client_profile, create_credential
+import logging
+from functools import partial
+from collections import Counter
+from utils.client import get_client_profile, ClientFactory
 from utils.config import (
     load_accounts, load_wechat_config, load_wechat_send_config, 
     load_email_config, load_alert_config, load_service_regions,
-    load_yunzhijia_config, load_yunzhijia_send_config
+    load_yunzhijia_config, load_yunzhijia_send_config, load_collect_config,
+    load_webhook_config, load_rate_limit_config, load_api_cache_config,
+    load_daemon_config, load_metrics_config
 )
-from monitoring_services.cvm_service import CVMService
-from monitoring_services.cbs_service import CBSService
-from monitoring_services.domain_service import DomainService
+from monitoring_services.base_service import BaseService
+from monitoring_services.registry import load_service_class, preload_service_classes
 from support_services.tag_service import TagService
 from support_services.wechat_service import WeChatService
+from support_services.webhook_dispatcher import WebhookDispatcher
 from support_services.email_service import EmailService
-from monitoring_services.billing_service import BillingService
-from monitoring_services.lighthouse_service import LighthouseService
 from support_services.database_service import DatabaseService
 from dotenv import load_dotenv
-from utils.alert_utils import filter_resources_by_days
+from utils.pipeline import ResourceWriter, AlertAccumulator, count_alert_resources, merge_account_data
+from utils.expiry_index import ExpiryIndex
+from utils.daemon import DaemonScheduler
+from utils.snapshot_store import SnapshotStore
+from utils.region_cache import EmptyRegionCache
+from utils.response_cache import ResponseCache, ResponseCacheMiss
 from utils.log_utils import setup_logger
-from monitoring_services.ssl_service import SSLService
+from utils.time_utils import begin_run
+from utils.task_scheduler import CollectionTask, CollectionScheduler
+from utils.metrics import METRICS
+from utils.profiler import PROFILER
 from datetime import datetime
 from support_services.yunzhijia_service import YunZhiJiaService
 
 # 加载环境变量
 load_dotenv()
 
-# 服务类型定义
+# 服务类型定义，服务类以 "模块:类名" 登记，只在该服务被调度时才导入对应的SDK
 SERVICE_TYPES = {
     # 资源类服务
     'RESOURCE_SERVICES': {
@@ -33,32 +44,40 @@ SERVICE_TYPES = {
         'REGIONAL': {
             'CVM': {
                 'regions': None,  # 将在运行时从配置加载
-                'service_class': CVMService
+                'service_class': 'monitoring_services.cvm_service:CVMService'
             },
             'Lighthouse': {
                 'regions': None,  # 将在运行时从配置加载
-                'service_class': LighthouseService
+                'service_class': 'monitoring_services.lighthouse_service:LighthouseService'
             },
             'CBS': {
                 'regions': None,  # 将在运行时从配置加载
-                'service_class': CBSService
+                'service_class': 'monitoring_services.cbs_service:CBSService',
+                'region_source': 'CVM'  # CBS 没有 DescribeRegions 接口，自动发现时使用 CVM 的地域列表
             }
         },
         # 不需要region的服务
         'GLOBAL': {
-            'Domain': DomainService,
-            'SSL': SSLService
+            'Domain': 'monitoring_services.domain_service:DomainService',
+            'SSL': 'monitoring_services.ssl_service:SSLService'
         }
     },
     # 账单类服务
     'BILLING_SERVICES': {
         'Billing': {
-            'service_class': BillingService,
+            'service_class': 'monitoring_services.billing_service:BillingService',
             'region': None  # 将在运行时从配置加载
         }
     }
 }
 
+# 常驻模式下的任务组：(任务组名称, 包含的服务, 间隔配置项)
+DAEMON_GROUPS = [
+    ('billing', ['Billing'], 'billing_interval'),
+    ('instances', ['CVM', 'Lighthouse', 'CBS'], 'instance_interval'),
+    ('certificates', ['Domain', 'SSL'], 'certificate_interval'),
+]
+
 def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='腾讯云资源和账单信息查询工具')
@@ -68,81 +87,186 @@ def parse_args():
         default='all',
         help='输出模式：all=全部信息，resources=仅资源信息，billing=仅账单信息'
     )
-    return parser.parse_args()
+    parser.add_argument(
+        '--from-cache',
+        action='store_true',
+        help='只使用本地缓存的API响应重新生成报告和通知，不访问云API'
+    )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='常驻运行，按各服务的采集间隔定期采集并发送汇总'
+    )
+    parser.add_argument(
+        '--services',
+        type=lambda value: [name.strip() for name in value.split(',') if name.strip()],
+        help='只采集指定的服务，逗号分隔，如 CVM,SSL；未调度的服务不会导入对应的SDK'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='采样CPU调用栈并在各阶段记录内存快照，结束后将折叠栈和内存分配表写入 logs/'
+    )
+    args = parser.parse_args()
+    args.services = args.services or None
+    if args.services:
+        unknown = [name for name in args.services if name not in all_service_names()]
+        if unknown:
+            parser.error(f"未知的服务: {', '.join(unknown)}，可选: {', '.join(all_service_names())}")
+    return args
+
+def all_service_names():
+    """所有已登记的服务名称"""
+    return (list(SERVICE_TYPES['RESOURCE_SERVICES']['REGIONAL']) + list(SERVICE_TYPES['RESOURCE_SERVICES']['GLOBAL'])
+            + list(SERVICE_TYPES['BILLING_SERVICES']))
 
-def get_regional_resources(account_info, client_profile):
-    """获取需要region的资源"""
-    cred = create_credential(account_info["secret_id"], account_info["secret_key"])
-    # 修改数据结构，使用区域作为第一层键
-    all_resources = {}
-    
-    # 遍历每个需要region的服务
-    for service_name, service_info in SERVICE_TYPES['RESOURCE_SERVICES']['REGIONAL'].items():
-        print(f"\n获取 {service_name} 资源...")
+def service_class_path(service_name):
+    """服务对应的服务类路径，如 monitoring_services.cvm_service:CVMService"""
+    if service_name in SERVICE_TYPES['RESOURCE_SERVICES']['REGIONAL']:
+        return SERVICE_TYPES['RESOURCE_SERVICES']['REGIONAL'][service_name]['service_class']
+    if service_name in SERVICE_TYPES['RESOURCE_SERVICES']['GLOBAL']:
+        return SERVICE_TYPES['RESOURCE_SERVICES']['GLOBAL'][service_name]
+    return SERVICE_TYPES['BILLING_SERVICES'][service_name]['service_class']
+
+def collect_regional_resource(cred, client_factory, service_name, region,
+                              region_cache=None, account_name=None):
+    """获取单个区域下单个服务的资源"""
+    service_info = SERVICE_TYPES['RESOURCE_SERVICES']['REGIONAL'][service_name]
+    print(f"正在获取 {region} 区域的 {service_name} 资源...")
+    
+    # 初始化服务
+    service = load_service_class(service_info['service_class'])(
+        cred, client_factory.client_profile, region, client_factory
+    )
+    
+    # 获取资源（根据服务类型调用相应的方法）
+    if service_name == 'CVM':
+        resources = service.get_instances()
+    elif service_name == 'Lighthouse':
+        resources = service.get_instances()
+    elif service_name == 'CBS':
+        resources = service.get_disks()
         
-        # 遍历每个region
-        for region in service_info['regions']:
-            print(f"正在获取 {region} 区域的资源...")
-            
-            # 初始化区域的资源字典
-            if region not in all_resources:
-                all_resources[region] = {}
-            
-            # 初始化服务
-            service = service_info['service_class'](cred, client_profile, region)
-            
-            # 获取资源（根据服务类型调用相应的方法）
-            if service_name == 'CVM':
-                resources = service.get_instances()
-            elif service_name == 'Lighthouse':
-                resources = service.get_instances()
-            elif service_name == 'CBS':
-                resources = service.get_disks()
-                
-            # 添加region信息到资源中
-            for resource in resources:
-                resource['Region'] = region
-            
-            # 将资源存储到对应区域的服务类型下
-            all_resources[region][service_name] = resources
+    # 添加region信息到资源中
+    for resource in resources:
+        resource['Region'] = region
     
-    return all_resources
+    # 记录空区域，查询失败时不记录
+    if region_cache:
+        region_cache.record(account_name, service_name, region, len(resources), service.last_error)
+    
+    return resources
 
-def get_global_resources(account_info, client_profile):
-    """获取不需要region的资源"""
-    cred = create_credential(account_info["secret_id"], account_info["secret_key"])
-    all_resources = {}
-    
-    for service_name, service_class in SERVICE_TYPES['RESOURCE_SERVICES']['GLOBAL'].items():
-        print(f"\n获取 {service_name} 资源...")
-        # 使用默认region
-        service = service_class(cred, client_profile, "ap-guangzhou")
-        
-        if service_name == 'Domain':
-            all_resources[service_name] = service.get_domains()
-        elif service_name == 'SSL':
-            all_resources[service_name] = service.get_certificates()
-            
-    return all_resources
+def collect_global_resource(cred, client_factory, service_name):
+    """获取单个不需要region的服务的资源"""
+    print(f"\n获取 {service_name} 资源...")
+    service_class = load_service_class(SERVICE_TYPES['RESOURCE_SERVICES']['GLOBAL'][service_name])
+    # 使用默认region
+    service = service_class(cred, client_factory.client_profile, "ap-guangzhou", client_factory)
+    
+    if service_name == 'Domain':
+        return service.get_domains()
+    elif service_name == 'SSL':
+        return service.get_certificates()
 
-def get_billing_info(account_info, client_profile):
-    """获取账单相关信息"""
-    cred = create_credential(account_info["secret_id"], account_info["secret_key"])
+def get_billing_info(cred, client_factory, account_name):
+    """
+    获取账单相关信息
+    :return: {'balance': 余额, 'bill_details': 账单详情}，查询失败或 --from-cache 时缓存未命中返回 None，
+             避免把 0 余额和空账单当作真实数据入库和通知
+    """
+    logger = logging.getLogger('TencentCloudMonitor')
     billing_info = {}
     
     for service_name, service_info in SERVICE_TYPES['BILLING_SERVICES'].items():
-        service = service_info['service_class'](
+        service = load_service_class(service_info['service_class'])(
             cred, 
-            client_profile,
-            service_info['region']
+            client_factory.client_profile,
+            service_info['region'],
+            client_factory
         )
         
         if service_name == 'Billing':
             billing_info['balance'] = service.get_account_balance()
             billing_info['bill_details'] = service.get_monthly_bill()
+        
+        if isinstance(service.last_error, ResponseCacheMiss):
+            logger.warning(f"[账单] 账号 {account_name} 的账单数据未缓存，跳过账单通知和入库")
+            return None
+        if service.last_error is not None:
+            logger.error(f"[账单] 获取账号 {account_name} 的账单失败，跳过账单通知和入库: {str(service.last_error)}")
+            return None
             
     return billing_info
 
+def discover_regions(accounts, client_factory, logger, services=None):
+    """
+    通过 DescribeRegions 获取各区域服务可用的地域，每个产品只查询一次
+    :param services: 需要采集的服务名称，None 表示全部
+    """
+    account_info = next(iter(accounts.values()))
+    cred = client_factory.credential(account_info["secret_id"], account_info["secret_key"])
+    regional_services = SERVICE_TYPES['RESOURCE_SERVICES']['REGIONAL']
+    discovered = {}
+    
+    for service_name, service_info in regional_services.items():
+        if services is not None and service_name not in services:
+            continue
+        source = service_info.get('region_source', service_name)
+        if source not in discovered:
+            service = load_service_class(regional_services[source]['service_class'])(
+                cred, client_factory.client_profile, None, client_factory
+            )
+            try:
+                discovered[source] = service.describe_regions()
+                logger.info(f"[地域发现] {source} 可用地域 {len(discovered[source])} 个")
+            except Exception as e:
+                logger.error(f"[地域发现] 获取 {source} 地域列表失败，使用默认地域: {str(e)}")
+                discovered[source] = [BaseService.DEFAULT_REGION]
+        service_info['regions'] = discovered[source]
+
+def build_collection_tasks(account_name, account_info, client_factory, mode, region_cache=None, services=None):
+    """
+    为单个账号生成 (账号, 区域, 服务) 采集任务，跳过空区域缓存中的区域
+    :param services: 需要采集的服务名称，None 表示全部
+    """
+    cred = client_factory.credential(account_info["secret_id"], account_info["secret_key"])
+    tasks = []
+    
+    if mode in ['all', 'resources']:
+        # 需要region的服务，每个区域一个任务
+        for service_name, service_info in SERVICE_TYPES['RESOURCE_SERVICES']['REGIONAL'].items():
+            if services is not None and service_name not in services:
+                continue
+            for region in service_info['regions']:
+                if region_cache and region_cache.should_skip(account_name, service_name, region):
+                    continue
+                tasks.append(CollectionTask(
+                    account_name, 'regional', service_name, region,
+                    partial(collect_regional_resource, cred, client_factory, service_name, region,
+                            region_cache, account_name),
+                    default=[]
+                ))
+        
+        # 不需要region的服务
+        for service_name in SERVICE_TYPES['RESOURCE_SERVICES']['GLOBAL']:
+            if services is not None and service_name not in services:
+                continue
+            tasks.append(CollectionTask(
+                account_name, 'global', service_name, None,
+                partial(collect_global_resource, cred, client_factory, service_name),
+                default=[]
+            ))
+    
+    if mode in ['all', 'billing'] and (services is None or 'Billing' in services):
+        tasks.append(CollectionTask(
+            account_name, 'billing', 'Billing', SERVICE_TYPES['BILLING_SERVICES']['Billing']['region'],
+            partial(get_billing_info, cred, client_factory, account_name),
+            default=None
+        ))
+    
+    return tasks
+
 def display_billing_info(account_name, billing_info):
     """显示账单信息"""
     messages = [f"📢腾讯云 {account_name} 账单信息\n"]
@@ -161,217 +285,481 @@ def display_billing_info(account_name, billing_info):
     print("\n".join(messages))
     return "\n".join(messages)
 
-def main():
-    # 设置日志记录器
-    logger = setup_logger()
-    
-    # 解析命令行参数
-    args = parse_args()
-    
-    # 从环境变量加载配置
-    accounts = load_accounts()
-    client_profile = get_client_profile()
-    alert_config = load_alert_config()
-    wechat_bots = load_wechat_config()
-    wechat_send_config = load_wechat_send_config()
-    email_config = load_email_config()
-    service_regions = load_service_regions()
-    
-    # 更新服务配置中的区域信息
-    for service in SERVICE_TYPES['RESOURCE_SERVICES']['REGIONAL'].values():
-        service['regions'] = service_regions['resources']
-    SERVICE_TYPES['BILLING_SERVICES']['Billing']['region'] = service_regions['billing']
-    
-    # 加载云之家配置
-    yunzhijia_bots = load_yunzhijia_config()
-    yunzhijia_send_config = load_yunzhijia_send_config()
-    
-    # 初始化通知服务
-    wechat_service = WeChatService(wechat_bots) if alert_config['enable_wechat'] else None
-    email_service = EmailService(email_config) if alert_config['enable_email'] else None
-    yunzhijia_service = YunZhiJiaService(yunzhijia_bots) if alert_config['enable_yunzhijia'] else None
-    
-    # 数据库配置
-    db_config = {
-        'enable_db': os.getenv('ENABLE_DATABASE', 'false').lower() == 'true',
-        'database': os.getenv('DB_DATABASE'),
-        'user': os.getenv('DB_USER'),
-        'password': os.getenv('DB_PASSWORD'),
-        'host': os.getenv('DB_HOST'),
-        'port': os.getenv('DB_PORT', '3306')
+class RunContext:
+    """
+    运行上下文
+    保存配置以及跨多次采集复用的客户端、数据库连接池、通知服务和各类缓存，
+    单次运行和常驻模式共用
+    """
+
+    def __init__(self, args, logger):
+        self.args = args
+        self.logger = logger
+        
+        # 从环境变量加载配置
+        self.accounts = load_accounts()
+        self.client_factory = ClientFactory(get_client_profile())
+        self.alert_config = load_alert_config()
+        wechat_bots = load_wechat_config()
+        self.wechat_send_config = load_wechat_send_config()
+        email_config = load_email_config()
+        service_regions = load_service_regions()
+        
+        # 更新服务配置中的区域信息
+        for service in SERVICE_TYPES['RESOURCE_SERVICES']['REGIONAL'].values():
+            service['regions'] = service_regions['resources']
+        SERVICE_TYPES['BILLING_SERVICES']['Billing']['region'] = service_regions['billing']
+        
+        # 加载云之家配置
+        yunzhijia_bots = load_yunzhijia_config()
+        self.yunzhijia_send_config = load_yunzhijia_send_config()
+        
+        # 初始化通知服务，企业微信和云之家共用一个 Webhook 发送器
+        self.dispatcher = WebhookDispatcher(**load_webhook_config())
+        self.wechat_service = WeChatService(
+            wechat_bots, self.dispatcher,
+            self.wechat_send_config['max_bytes'], self.wechat_send_config['rate_limit']
+        ) if self.alert_config['enable_wechat'] else None
+        self.email_service = EmailService(email_config) if self.alert_config['enable_email'] else None
+        self.yunzhijia_service = YunZhiJiaService(
+            yunzhijia_bots, self.dispatcher,
+            self.yunzhijia_send_config['max_bytes'], self.yunzhijia_send_config['rate_limit']
+        ) if self.alert_config['enable_yunzhijia'] else None
+        
+        # 数据库配置
+        self.db_config = {
+            'enable_db': os.getenv('ENABLE_DATABASE', 'false').lower() == 'true',
+            'database': os.getenv('DB_DATABASE'),
+            'user': os.getenv('DB_USER'),
+            'password': os.getenv('DB_PASSWORD'),
+            'host': os.getenv('DB_HOST'),
+            'port': os.getenv('DB_PORT', '3306'),
+            'batch_size': os.getenv('DB_BATCH_SIZE', '500'),
+            'pool_size': os.getenv('DB_POOL_SIZE', '4'),
+            'ping_interval': os.getenv('DB_PING_INTERVAL', '60'),
+            'writer_threads': os.getenv('DB_WRITER_THREADS', '2'),
+            'incremental': os.getenv('ENABLE_INCREMENTAL_WRITE', 'false').lower() == 'true',
+            'snapshot_path': os.getenv('SNAPSHOT_DB_PATH', 'data/snapshots.db')
+        }
+        
+        # 初始化数据库服务
+        self.db_service = DatabaseService(self.db_config)
+        
+        # 只推送变化时，用快照记录已通知过的资源
+        self.notify_snapshots = SnapshotStore(self.db_config['snapshot_path']) if self.alert_config['notify_delta_only'] else None
+        
+        # 运行指标：启用后每次运行导出 JSON 报告和 Prometheus textfile
+        self.metrics_config = load_metrics_config()
+        METRICS.configure(self.metrics_config['enable'], self.metrics_config['max_spans'])
+        
+        # 采集配置
+        collect_config = load_collect_config()
+        BaseService.PAGE_PREFETCH = collect_config['page_prefetch']
+        BaseService.RATE_LIMITER.configure(**load_rate_limit_config())
+        
+        # 响应缓存：启用后 Describe 类接口优先读取未过期的缓存，--from-cache 时只读缓存
+        cache_config = load_api_cache_config()
+        if cache_config['enable'] or args.from_cache:
+            BaseService.RESPONSE_CACHE = ResponseCache(
+                cache_config['path'],
+                offline=args.from_cache,
+                ttl_overrides=cache_config['ttl_overrides']
+            )
+        TagService.clear_cache()
+        self.scheduler = CollectionScheduler(
+            collect_config['max_workers'],
+            collect_config['max_workers_per_account']
+        )
+        if service_regions['auto'] and self.accounts and args.mode in ['all', 'resources']:
+            discover_regions(self.accounts, self.client_factory, logger, args.services)
+        self.region_cache = EmptyRegionCache(
+            service_regions['empty_region_cache_path'],
+            service_regions['empty_region_ttl']
+        ) if service_regions['empty_region_ttl'] > 0 else None
+        
+        # 各账号最近一次的采集结果，常驻模式下用于定期汇总
+        self.latest = {}
+
+    def close(self):
+        """释放连接和缓存"""
+        self.dispatcher.close()
+        if self.notify_snapshots:
+            self.notify_snapshots.prune()
+            self.notify_snapshots.close()
+        
+        if BaseService.RESPONSE_CACHE:
+            BaseService.RESPONSE_CACHE.prune()
+            BaseService.RESPONSE_CACHE.close()
+            BaseService.RESPONSE_CACHE = None
+        
+        if self.email_service:
+            self.email_service.close()
+        
+        # 关闭数据库连接
+        self.db_service.close()
+
+def run_once(context, services=None, account_names=None, notify_mode=None, send_email=True):
+    """
+    执行一次采集
+    :param services: 需要采集的服务名称，如 ['CVM', 'Billing']，None 表示全部
+    :param account_names: 需要采集的账号名称，None 表示全部
+    :param notify_mode: 每个账号采集完成后的通知模式 all/resources/billing，None 表示不发送通知
+    :param send_email: 是否在采集完成后发送汇总邮件
+    :return: {账号名称: 账号数据}
+    """
+    logger = context.logger
+    alert_config = context.alert_config
+    accounts = {
+        account_name: account_info for account_name, account_info in context.accounts.items()
+        if account_names is None or account_name in account_names
     }
     
-    # 初始化数据库服务
-    db_service = DatabaseService(db_config)
+    # 数据库写入器和告警累积器，采集结果到达后立即入库并过滤
+    db_service = context.db_service
+    if db_service.enabled:
+        db_service.start_batch()
+    writer = ResourceWriter(
+        db_service,
+        threads=int(context.db_config['writer_threads'])
+    ) if db_service.enabled else None
+    notify_snapshots = context.notify_snapshots
+    accumulator = AlertAccumulator(alert_config, notify_snapshots)
     
-    # 创建汇总数据结构
-    all_accounts_data = []
+    BaseService.RATE_LIMITER.reset_stats()
+    context.client_factory.reset_stats()
+    # 本次运行的所有剩余天数以同一时刻为准
+    begin_run()
     
+    # 并发采集所有账号的资源和账单信息
+    tasks = []
     for account_name, account_info in accounts.items():
-        account_data = {
-            'account_name': account_name,
-            'resources': {
-                'regional': {},
-                'global': {}
-            },
-            'billing': None
-        }
+        tasks.extend(build_collection_tasks(
+            account_name, account_info, context.client_factory, context.args.mode,
+            context.region_cache, services
+        ))
+    
+    # 在主线程中导入本次调度的服务，未调度的服务不加载SDK
+    preload_service_classes(service_class_path(task.service_name) for task in tasks)
+    
+    # 每个账号的任务全部完成后立即将该账号的通知放入发件箱
+    remaining = Counter(task.account_name for task in tasks)
+    accounts_data = {}
+    # 只推送变化时各账号资源通知的目标机器人，发送成功后才记录快照
+    notified = {}
+    for task in tasks:
+        accumulator.reserve(task.account_name, task.region if task.scope == 'regional' else None)
+    
+    # 采集、告警过滤和通知消息生成在结果到达时流水线执行，作为同一个阶段分析
+    with METRICS.span('run.collect', tasks=len(tasks)), PROFILER.phase('collect'):
+        for item in context.scheduler.iter_results(tasks):
+            task = item.task
+            account_data = accounts_data.setdefault(task.account_name, {
+                'account_name': task.account_name,
+                'resources': accumulator.get(task.account_name),
+                'billing': None
+            })
         
-        # 获取资源信息
-        if args.mode in ['all', 'resources']:
-            # 获取原始资源数据
-            regional_resources = get_regional_resources(account_info, client_profile)
-            global_resources = get_global_resources(account_info, client_profile)
-            
-            # 根据告警模式决定是否过滤资源
-            if alert_config['resource_alert_mode'] == 'specific':
-                # 只在 specific 模式下过滤资源
-                filtered_regional = {}
-                for region, services in regional_resources.items():
-                    filtered_regional[region] = {}
-                    for service_type, resources in services.items():
-                        filtered_regional[region][service_type] = filter_resources_by_days(
-                            resources, 
-                            alert_config['resource_alert_days']
-                        )
-                
-                filtered_global = {}
-                for service_type, resources in global_resources.items():
-                    filtered_global[service_type] = filter_resources_by_days(
-                        resources, 
-                        alert_config['resource_alert_days']
-                    )
+            if task.scope == 'billing':
+                # 账单获取失败或缓存未命中时为 None，不入库也不发送账单通知
+                if item.result is not None:
+                    account_data['billing'] = item.result
+                    if writer:
+                        writer.submit_billing(task.account_name, item.result)
             else:
-                # all 模式下不过滤资源
-                filtered_regional = regional_resources
-                filtered_global = global_resources
-            
-            # 存储原始数据用于数据库
-            account_data['resources']['regional'] = regional_resources
-            account_data['resources']['global'] = global_resources
-            
-            # 发送企业微信通知（使用过滤后的数据）
-            if alert_config['enable_wechat'] and wechat_service:
-                message = wechat_service.format_resource_message(
-                    account_name, filtered_regional, filtered_global
-                )
-                if message:
-                    if wechat_send_config["send_mode"] == "all":
-                        results = wechat_service.send_message(message)
-                    else:
-                        results = wechat_service.send_message(
-                            message,
-                            bot_names=wechat_send_config["bot_names"]
-                        )
-                    
-                    for bot_name, success in results.items():
-                        status = "成功" if success else "失败"
-                        logger.info(f"[资源告警] 企业微信通知发送到 {bot_name}: {status}")
-            
-            # 发送云之家通知
-            if alert_config['enable_yunzhijia'] and yunzhijia_service:
-                message = yunzhijia_service.format_resource_message(
-                    account_name, filtered_regional, filtered_global
-                )
-                if message:
-                    if yunzhijia_send_config["send_mode"] == "all":
-                        results = yunzhijia_service.send_message(message)
-                    else:
-                        results = yunzhijia_service.send_message(
-                            message,
-                            bot_names=yunzhijia_send_config["bot_names"]
-                        )
-                    
-                    for bot_name, success in results.items():
-                        status = "成功" if success else "失败"
-                        logger.info(f"[资源告警] 云之家通知发送到 {bot_name}: {status}")
-            
-            # 存储过滤后的数据用于邮件通知
-            account_data['filtered_resources'] = {
-                'regional': filtered_regional,
-                'global': filtered_global
-            }
-            
-        # 获取账单信息
-        if args.mode in ['all', 'billing']:
-            account_data['billing'] = get_billing_info(account_info, client_profile)
-            
-            # 添加这段代码来写入账单数据
-            if db_service.enabled:
-                db_service.insert_billing_info(
-                    account_name,
-                    account_data['billing']['balance'],
-                    account_data['billing']['bill_details']
-                )
-            
-            # 发送企业微信账单通知（保持原有逻辑）
-            if alert_config['enable_wechat'] and wechat_service:
-                message = display_billing_info(account_name, account_data['billing'])
-                if wechat_send_config["send_mode"] == "all":
-                    results = wechat_service.send_message(message)
+                accumulator.add(task.account_name, task.scope, task.service_name, task.region, item.result)
+                if writer:
+                    writer.submit(task.account_name, task.service_name, item.result)
+        
+            remaining[task.account_name] -= 1
+            if not remaining[task.account_name] and notify_mode:
+                if notify_snapshots:
+                    # 企业微信和云之家只推送新增或变化的资源，汇总邮件仍包含全部资源
+                    notify_data = dict(account_data, resources=accumulator.get_delta(task.account_name))
                 else:
-                    results = wechat_service.send_message(
-                        message,
-                        bot_names=wechat_send_config["bot_names"]
-                    )
-                
-                for bot_name, success in results.items():
-                    status = "成功" if success else "失败"
-                    logger.info(f"[账单告警] 企业微信通知发送到 {bot_name}: {status}")
-            
-            # 发送云之家账单通知
-            if alert_config['enable_yunzhijia'] and yunzhijia_service:
-                message = yunzhijia_service.format_billing_message(
-                    account_name, account_data['billing']
+                    notify_data = account_data
+                targets = notify_account(
+                    notify_data, notify_mode, alert_config, logger,
+                    context.wechat_service, context.wechat_send_config,
+                    context.yunzhijia_service, context.yunzhijia_send_config
                 )
-                if yunzhijia_send_config["send_mode"] == "all":
-                    results = yunzhijia_service.send_message(message)
-                else:
-                    results = yunzhijia_service.send_message(
-                        message,
-                        bot_names=yunzhijia_send_config["bot_names"]
-                    )
-                
-                for bot_name, success in results.items():
-                    status = "成功" if success else "失败"
-                    logger.info(f"[账单告警] 云之家通知发送到 {bot_name}: {status}")
-        
-        all_accounts_data.append(account_data)
-        
-        # 写入数据库
-        for region_data in account_data['resources']['regional'].values():
-            if 'CVM' in region_data:
-                db_service.insert_cvm_instances(account_name, region_data['CVM'])
-            if 'Lighthouse' in region_data:
-                db_service.insert_lighthouse_instances(account_name, region_data['Lighthouse'])
-            if 'CBS' in region_data:
-                db_service.insert_cbs_disks(account_name, region_data['CBS'])
-
-        if 'Domain' in account_data['resources']['global']:
-            db_service.insert_domains(account_name, account_data['resources']['global']['Domain'])
-        if 'SSL' in account_data['resources']['global']:
-            db_service.insert_ssl_certificates(account_name, account_data['resources']['global']['SSL'])
+                if notify_snapshots:
+                    notified[task.account_name] = targets
+    
+    # 所有账号的消息在采集完成后合并发送，频率限制的等待不阻塞采集结果的处理
+    if notify_mode:
+        with METRICS.span('run.notify'), PROFILER.phase('notify.send'):
+            results = flush_notifications(context)
+        commit_notified(accumulator, notified, results, logger)
+    
+    for account_data in accounts_data.values():
+        merge_account_data(context.latest, account_data)
+    
+    log_run_stats(context)
+    
+    # 等待数据库写入完成
+    if writer:
+        with METRICS.span('run.db_wait'), PROFILER.phase('db.write'):
+            writer.close()
     
     # 所有账号处理完后，发送汇总邮件（使用过滤后的数据）
-    if alert_config['enable_email'] and email_service:
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        subject = f"腾讯云资源和账单汇总报告 ({current_date})"
+    if send_email:
+        with METRICS.span('run.email'):
+            send_summary_email(context, [
+                accounts_data[account_name] for account_name in accounts
+                if account_name in accounts_data
+            ])
+    
+    return accounts_data
+
+def commit_notified(accumulator, notified, results, logger):
+    """
+    记录已通知的资源，账号的资源通知发送到所有目标机器人后才记录；
+    发送失败时保留上次的快照，下次运行重新推送
+    :param notified: {账号名称: {渠道: 目标机器人集合}}
+    :param results: flush_notifications 返回的发送结果
+    """
+    for account_name, targets in notified.items():
+        failed = [
+            bot_name for channel, bot_names in targets.items() for bot_name in bot_names
+            if not results.get(channel, {}).get(bot_name, False)
+        ]
+        if failed:
+            logger.warning(f"[资源告警] 账号 {account_name} 的通知未能发送到 {', '.join(failed)}，下次运行重新推送")
+        else:
+            accumulator.commit(account_name)
+
+def log_run_stats(context):
+    """输出本次采集的缓存、客户端和限频统计"""
+    logger = context.logger
+    tag_stats = TagService.get_cache_stats()
+    logger.info(
+        f"[项目缓存] 加载账号 {tag_stats['accounts']} 个，"
+        f"命中 {tag_stats['hits']} 次，未命中 {tag_stats['misses']} 次"
+    )
+    if context.region_cache:
+        context.region_cache.save()
+        region_stats = context.region_cache.get_stats()
+        logger.info(
+            f"[空区域缓存] 跳过 {region_stats['skipped']} 个区域，探测 {region_stats['probed']} 个，"
+            f"新增空区域 {region_stats['emptied']} 个，恢复 {region_stats['revived']} 个"
+        )
+    if BaseService.RESPONSE_CACHE:
+        cache_stats = BaseService.RESPONSE_CACHE.get_stats()
+        logger.info(
+            f"[响应缓存] 命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次，"
+            f"写入 {cache_stats['stores']} 次"
+        )
+    client_stats = context.client_factory.get_stats()
+    logger.info(
+        f"[客户端] 新建 {client_stats['constructed']} 个，复用 {client_stats['reused']} 次，"
+        f"账号 {client_stats['accounts']} 个"
+    )
+    rate_stats = BaseService.RATE_LIMITER.get_stats()
+    logger.info(
+        f"[限频] 请求 {rate_stats['requests']} 次，被限频 {rate_stats['throttled']} 次，"
+        f"重试 {rate_stats['retries']} 次，排队等待 {rate_stats['waits']} 次共 {rate_stats['wait_time']:.2f}s"
+    )
+    if rate_stats['apis']:
+        logger.warning(f"[限频] 被限频的接口: {rate_stats['apis']}")
+
+def send_summary_email(context, all_accounts_data):
+    """发送汇总邮件"""
+    email_service = context.email_service
+    if not (context.alert_config['enable_email'] and email_service):
+        return
+    
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    subject = f"腾讯云资源和账单汇总报告 ({current_date})"
+    with PROFILER.phase('email.render'):
+        email_service.queue_summary(subject, all_accounts_data)
         
-        # 使用过滤后的资源数据
+        # 配置了单独收件人的账号，收件人相同的账号合并为一封报告
+        groups = {}
+        for account_data in all_accounts_data:
+            receivers = context.accounts[account_data['account_name']].get('email_receivers')
+            if receivers:
+                groups.setdefault(tuple(receivers), []).append(account_data)
+        for receivers, accounts_data in groups.items():
+            account_names = '、'.join(account_data['account_name'] for account_data in accounts_data)
+            email_service.queue_summary(f"{subject} - {account_names}", accounts_data, list(receivers))
+    
+    # 所有报告通过同一个 SMTP 连接依次发送，发送完成后断开，避免常驻模式下长时间占用连接
+    with PROFILER.phase('email.send'):
+        results = email_service.flush()
+        email_service.close()
+    succeeded = sum(1 for result in results if result['success'])
+    if succeeded == len(results):
+        context.logger.info(f"汇总邮件发送成功: 共 {succeeded} 封")
+    else:
+        context.logger.error(f"汇总邮件发送失败: 成功 {succeeded}/{len(results)} 封")
+
+def send_report(context):
+    """常驻模式下定期发送通知和汇总邮件，使用各服务最近一次的采集结果"""
+    mode = context.args.mode
+    all_accounts_data = [
+        context.latest[account_name] for account_name in context.accounts
+        if account_name in context.latest
+    ]
+    
+    # 只推送变化时，资源通知已在每次采集后发送，这里只发送账单通知
+    if context.alert_config['notify_delta_only']:
+        notify_mode = 'billing' if mode in ['all', 'billing'] else None
+    else:
+        notify_mode = mode
+    if notify_mode:
         for account_data in all_accounts_data:
-            if 'filtered_resources' in account_data:
-                account_data['resources'] = account_data['filtered_resources']
+            notify_account(
+                account_data, notify_mode, context.alert_config, context.logger,
+                context.wechat_service, context.wechat_send_config,
+                context.yunzhijia_service, context.yunzhijia_send_config
+            )
+        with METRICS.span('run.notify'), PROFILER.phase('notify.send'):
+            flush_notifications(context)
+    with METRICS.span('run.email'):
+        send_summary_email(context, all_accounts_data)
+    
+    # 项目名称可能变化，每个汇总周期重新加载
+    TagService.clear_cache()
+
+def run_daemon(context):
+    """常驻模式：按各任务组的间隔循环采集，并定期发送汇总"""
+    daemon_config = load_daemon_config()
+    mode = context.args.mode
+    scheduler = DaemonScheduler(daemon_config['jitter'])
+    account_names = list(context.accounts)
+    
+    groups = {}
+    for group, services, interval_key in DAEMON_GROUPS:
+        # 按运行模式和 --services 只调度需要的任务组
+        if context.args.services:
+            services = [name for name in services if name in context.args.services]
+        if services and (mode == 'all' or (mode == 'billing') == (group == 'billing')):
+            groups[group] = services
+            scheduler.add(group, daemon_config[interval_key], account_names)
+    # 首次汇总在所有任务组首次采集之后
+    scheduler.add('report', daemon_config['report_interval'], initial_delay=daemon_config['jitter'] + 1)
+    
+    # 只推送变化时，每次采集后立即推送资源变化
+    tick_notify_mode = 'resources' if context.alert_config['notify_delta_only'] and mode in ['all', 'resources'] else None
+    
+    def on_due(due_groups):
+        METRICS.begin_run(mode=mode, daemon=True, groups=sorted(due_groups))
+        for group, names in due_groups.items():
+            if group == 'report':
+                continue
+            context.logger.info(f"[常驻模式] 开始采集 {group}，账号: {', '.join(names)}")
+            run_once(context, groups[group], names, notify_mode=tick_notify_mode, send_email=False)
+        if 'report' in due_groups:
+            send_report(context)
+        export_metrics(context)
+    
+    scheduler.run_forever(on_due)
+
+def main():
+    # 设置日志记录器
+    logger = setup_logger()
+    
+    # 解析命令行参数
+    args = parse_args()
+    if args.profile:
+        PROFILER.start()
+    
+    with PROFILER.phase('init'):
+        context = RunContext(args, logger)
+    try:
+        if args.daemon:
+            run_daemon(context)
+        else:
+            METRICS.begin_run(mode=args.mode, daemon=False, accounts=len(context.accounts))
+            run_once(context, args.services, notify_mode=args.mode)
+            export_metrics(context)
+    finally:
+        context.close()
+        PROFILER.stop()
+
+def export_metrics(context):
+    """导出本次运行的指标，未启用指标时不做任何事"""
+    METRICS.export(context.metrics_config['report_path'], context.metrics_config['prometheus_path'])
+
+def notify_account(account_data, mode, alert_config, logger,
+                   wechat_service, wechat_send_config,
+                   yunzhijia_service, yunzhijia_send_config):
+    """
+    将单个账号的资源和账单通知放入企业微信、云之家的发件箱
+    多个账号的消息会合并发送，需要在所有账号处理完后调用 flush_notifications
+    :return: 资源通知的目标机器人，格式为 {渠道: 机器人名称集合}，渠道为 wechat、yunzhijia
+    """
+    account_name = account_data['account_name']
+    wechat_enabled = alert_config['enable_wechat'] and wechat_service
+    yunzhijia_enabled = alert_config['enable_yunzhijia'] and yunzhijia_service
+    wechat_bots = None if wechat_send_config["send_mode"] == "all" else wechat_send_config["bot_names"]
+    yunzhijia_bots = None if yunzhijia_send_config["send_mode"] == "all" else yunzhijia_send_config["bot_names"]
+    targets = {}
+    
+    if (mode in ['all', 'resources'] and alert_config['notify_delta_only']
+            and not count_alert_resources(account_data['resources'])):
+        logger.info(f"[资源告警] 账号 {account_name} 没有新增或变化的资源，跳过通知")
+    elif mode in ['all', 'resources']:
+        filtered_regional = account_data['resources']['regional']
+        filtered_global = account_data['resources']['global']
+        # 企业微信和云之家共用同一个到期索引
+        index = ExpiryIndex.from_resources(account_name, filtered_regional, filtered_global)
         
-        content = email_service.format_summary_message(all_accounts_data)
+        # 企业微信通知（使用过滤后的数据），超长时在资源之间拆分
+        if wechat_enabled:
+            message = wechat_service.build_resource_message(
+                account_name, filtered_regional, filtered_global, index
+            )
+            if message:
+                wechat_service.queue_message(message, wechat_bots)
+                targets['wechat'] = resolve_bots(wechat_service, wechat_bots)
         
-        if content:
-            if email_service.send_email(subject, content):
-                logger.info("汇总邮件发送成功")
-            else:
-                logger.error("汇总邮件发送失败")
+        # 云之家通知
+        if yunzhijia_enabled:
+            message = yunzhijia_service.build_resource_message(
+                account_name, filtered_regional, filtered_global, index
+            )
+            if message:
+                yunzhijia_service.queue_message(message, yunzhijia_bots)
+                targets['yunzhijia'] = resolve_bots(yunzhijia_service, yunzhijia_bots)
     
-    # 关闭数据库连接
-    db_service.close()
+    if mode in ['all', 'billing'] and account_data['billing'] is not None:
+        # 企业微信账单通知（保持原有逻辑）
+        if wechat_enabled:
+            wechat_service.queue_message(
+                display_billing_info(account_name, account_data['billing']), wechat_bots
+            )
+        
+        # 云之家账单通知
+        if yunzhijia_enabled:
+            yunzhijia_service.queue_message(
+                yunzhijia_service.format_billing_message(account_name, account_data['billing']),
+                yunzhijia_bots
+            )
+    
+    return targets
+
+def resolve_bots(service, bot_names):
+    """消息实际发送到的机器人，bot_names 为 None 时发送到所有机器人"""
+    if bot_names is None:
+        return set(service.bots)
+    return {bot_name for bot_name in bot_names if bot_name in service.bots}
+
+def flush_notifications(context):
+    """
+    发送发件箱中合并后的通知，并记录每个机器人的发送结果
+    :return: {渠道: {机器人名称: 是否全部发送成功}}，渠道为 wechat、yunzhijia
+    """
+    results = {}
+    for channel, label, service in (("wechat", "企业微信", context.wechat_service),
+                                    ("yunzhijia", "云之家", context.yunzhijia_service)):
+        if service is None:
+            continue
+        results[channel] = service.flush()
+        for bot_name, success in results[channel].items():
+            status = "成功" if success else "失败"
+            context.logger.info(f"[告警通知] {label}通知发送到 {bot_name}: {status}")
+    return results
 
 def display_results(account_name, regional_resources, global_resources):
     """按区域显示资源信息"""
@@ -1,15 +1,26 @@
-from .base_service import BaseService
-from .billing_service import BillingService
-from .cbs_service import CBSService
-from .cvm_service import CVMService
-from .domain_service import DomainService
-from .lighthouse_service import LighthouseService
-
-__all__ = [
-    'BaseService',
-    'BillingService',
-    'CBSService',
-    'CVMService',
-    'DomainService',
-    'LighthouseService'
-] 
\ No newline at end of file
+import importlib
+
+# 服务类按需导入（PEP 562），导入本包时不加载各产品的SDK模块
+_SERVICE_MODULES = {
+    'BaseService': '.base_service',
+    'BillingService': '.billing_service',
+    'CBSService': '.cbs_service',
+    'CVMService': '.cvm_service',
+    'DomainService': '.domain_service',
+    'LighthouseService': '.lighthouse_service',
+    'SSLService': '.ssl_service',
+    'TagService': '.tag_service'
+}
+
+__all__ = list(_SERVICE_MODULES)
+
+
+def __getattr__(name):
+    module_name = _SERVICE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_name, __name__), name)
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
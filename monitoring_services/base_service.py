@@ -1,13 +1,102 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from utils.rate_limiter import RateLimiter
+from utils.metrics import METRICS
+
 class BaseService:
     """服务基类，处理通用逻辑"""
     DEFAULT_REGION = "ap-guangzhou"  # 默认region
-    
-    def __init__(self, cred, client_profile, region=None):
+    PAGE_PREFETCH = False  # 处理当前页时是否预取下一页
+    PRODUCT = None  # 产品名称，用于按产品和接口限频，如 cvm
+    RATE_LIMITER = RateLimiter()  # 所有服务共享的限频器
+    RESPONSE_CACHE = None  # 响应缓存，启用时为 ResponseCache 实例
+    CACHE_TTL = 3600  # 响应缓存有效期（秒）
+
+    def __init__(self, cred, client_profile, region=None, client_factory=None):
         self.cred = cred
         self.client_profile = client_profile
         self.region = region or self.DEFAULT_REGION
+        self.client_factory = client_factory
+        self.last_error = None  # 最近一次查询的异常，用于区分查询失败和没有资源
         self.init_client()
-    
+
     def init_client(self):
         """初始化客户端，子类需要实现此方法"""
-        raise NotImplementedError 
\ No newline at end of file
+        raise NotImplementedError
+
+    def create_client(self, client_cls):
+        """创建SDK客户端，传入客户端工厂时复用已创建的客户端"""
+        if self.client_factory is not None:
+            return self.client_factory.get_client(client_cls, self.cred, self.region, self.client_profile)
+        return client_cls(self.cred, self.region, self.client_profile)
+
+    def call_api(self, action, request_cls, params=None) -> dict:
+        """
+        调用云API并以字典形式返回响应
+        启用响应缓存时 Describe 类接口优先读取缓存；请求经过限频器，被限频时自动降速重试
+        :param action: API名称，如 DescribeInstances
+        :param request_cls: 请求模型类
+        :param params: 请求参数
+        """
+        product = self.PRODUCT or type(self).__name__
+        cache = self.RESPONSE_CACHE if action.startswith('Describe') else None
+        if cache is not None:
+            cache_key = cache.make_key(self.cred.secret_id, product, action, self.region, params)
+            cached = cache.get(cache_key, cache.ttl_for(product, self.CACHE_TTL))
+            if cached is not None:
+                METRICS.count_api_call(product, action, 'cached')
+                return cached
+        
+        req = request_cls()
+        req.from_json_string(json.dumps(params or {}))
+        
+        def request():
+            # 每次实际请求（包括限频后的重试）单独计时
+            with METRICS.span('api', product=product, action=action, region=self.region):
+                return getattr(self.client, action)(req)
+        
+        resp = self.RATE_LIMITER.call(self.cred.secret_id, product, action, request)
+        result = json.loads(resp.to_json_string())
+        
+        if cache is not None:
+            cache.put(cache_key, result)
+        return result
+
+    def paginate(self, action, request_cls, items_key, page_size, params=None,
+                 total_key="TotalCount", prefetch=None):
+        """
+        按 Offset/Limit 分页拉取全部数据，逐页产出列表中的每一项
+        :param items_key: 响应中列表字段名，如 InstanceSet
+        :param page_size: 每页数量，应使用该API允许的最大值
+        :param total_key: 响应中总数字段名
+        :param prefetch: 是否在处理当前页时预取下一页，默认使用 PAGE_PREFETCH
+        """
+        if prefetch is None:
+            prefetch = self.PAGE_PREFETCH
+        base_params = dict(params or {})
+
+        def fetch(offset):
+            return self.call_api(action, request_cls, dict(base_params, Offset=offset, Limit=page_size))
+        # 预取在另一个线程中执行，沿用采集任务的账号等标签
+        fetch = METRICS.bind(fetch)
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            offset = 0
+            page = fetch(offset)
+            while True:
+                items = page.get(items_key) or []
+                total = page.get(total_key)
+                offset += page_size
+                has_more = len(items) >= page_size and (total is None or offset < total)
+
+                # 先发出下一页请求，再交出当前页数据
+                next_page = executor.submit(fetch, offset) if has_more and executor else None
+                yield from items
+
+                if not has_more:
+                    break
+                page = next_page.result() if next_page else fetch(offset)
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
@@ -1,14 +1,15 @@
-import json
 from datetime import datetime
 from tencentcloud.billing.v20180709 import billing_client, models
 from .base_service import BaseService
 
 class BillingService(BaseService):
     """账单服务类"""
+    PRODUCT = "billing"
+    CACHE_TTL = 600  # 响应缓存有效期（秒），余额变化较快
     
     def init_client(self):
         """初始化账单客户端"""
-        self.client = billing_client.BillingClient(self.cred, self.region, self.client_profile)
+        self.client = self.create_client(billing_client.BillingClient)
     
     def get_account_balance(self) -> float:
         """
@@ -16,10 +17,10 @@ class BillingService(BaseService):
         :return: 账号余额（元）
         """
         try:
-            req = models.DescribeAccountBalanceRequest()
-            resp = self.client.DescribeAccountBalance(req)
-            return json.loads(resp.to_json_string())["RealBalance"] / 100  # 单位转换为元
+            resp_dict = self.call_api('DescribeAccountBalance', models.DescribeAccountBalanceRequest)
+            return resp_dict["RealBalance"] / 100  # 单位转换为元
         except Exception as e:
+            self.last_error = e
             print(f"获取账号余额时发生错误: {str(e)}")
             return 0.0
     
@@ -29,13 +30,10 @@ class BillingService(BaseService):
         :return: 账单详情字典
         """
         try:
-            req = models.DescribeBillSummaryRequest()
-            req.from_json_string(json.dumps({
+            resp_dict = self.call_api('DescribeBillSummary', models.DescribeBillSummaryRequest, {
                 "Month": datetime.now().strftime("%Y-%m"),
                 "GroupType": "project"
-            }))
-            resp = self.client.DescribeBillSummary(req)
-            resp_dict = json.loads(resp.to_json_string())
+            })
             
             if "SummaryDetail" not in resp_dict:
                 print("警告：响应中缺少 'SummaryDetail' 键")
@@ -64,6 +62,7 @@ class BillingService(BaseService):
             return bill_details
             
         except Exception as e:
+            self.last_error = e
             print(f"获取账单信息时发生错误: {str(e)}")
             return {}
             
@@ -1,43 +1,54 @@
 import json
 from .base_service import BaseService
 from tencentcloud.cvm.v20170312 import cvm_client, models
-from utils.time_utils import convert_utc_to_beijing, get_beijing_now
+from utils.time_utils import compute_differ_days, format_time
+from utils.resource_model import CVMRecord
 from typing import List, Dict
 from .tag_service import TagService
 
 class CVMService(BaseService):
+    PRODUCT = "cvm"
+    PAGE_SIZE = 100  # DescribeInstances 单页最大数量
+
     def init_client(self):
         """初始化CVM客户端"""
-        self.client = cvm_client.CvmClient(self.cred, self.region, self.client_profile)
-        self.tag_service = TagService(self.cred, self.region, self.client_profile)
+        self.client = self.create_client(cvm_client.CvmClient)
+        # 标签接口不区分区域，所有区域共用同一个标签客户端
+        self.tag_service = TagService(self.cred, self.DEFAULT_REGION, self.client_profile, self.client_factory)
     
     def get_instances(self) -> List[Dict]:
         """获取云服务器实例列表"""
         try:
-            req = models.DescribeInstancesRequest()
-            resp = self.client.DescribeInstances(req)
-            
             instances = []
-            if resp.InstanceSet:
-                for instance in resp.InstanceSet:
-                    # 获取项目名称
-                    project_id = instance.Placement.ProjectId
-                    project_name = self.tag_service.get_project_name(project_id) or "未知项目"
-                    
-                    # 计算剩余天数
-                    expired_time = convert_utc_to_beijing(instance.ExpiredTime)
-                    differ_days = (expired_time - get_beijing_now()).days
-                    
-                    instances.append({
-                        'Type': 'CVM',
-                        'InstanceId': instance.InstanceId,
-                        'InstanceName': instance.InstanceName,
-                        'Zone': instance.Placement.Zone,
-                        'ProjectName': project_name,
-                        'ExpiredTime': expired_time.strftime("%Y-%m-%d %H:%M:%S"),
-                        'DifferDays': differ_days
-                    })
+            for instance in self.paginate('DescribeInstances', models.DescribeInstancesRequest,
+                                          'InstanceSet', self.PAGE_SIZE):
+                # 获取项目名称
+                project_id = instance['Placement']['ProjectId']
+                project_name = self.tag_service.get_project_name(project_id) or "未知项目"
+                
+                instances.append(CVMRecord(
+                    Type='CVM',
+                    InstanceId=instance['InstanceId'],
+                    InstanceName=instance['InstanceName'],
+                    Zone=instance['Placement']['Zone'],
+                    ProjectName=project_name,
+                    ExpiredTime=format_time(instance.get('ExpiredTime')),
+                    DifferDays=None
+                ))
+            
+            # 批量计算剩余天数
+            for item, differ_days in zip(instances, compute_differ_days(item['ExpiredTime'] for item in instances)):
+                item.DifferDays = differ_days
             return instances
         except Exception as err:
+            self.last_error = err
             print(f"获取云服务器实例列表失败: {err}")
-            return [] 
\ No newline at end of file
+            return [] 
+
+    def describe_regions(self) -> List[str]:
+        """获取CVM可用的地域列表"""
+        resp = self.call_api('DescribeRegions', models.DescribeRegionsRequest)
+        return [
+            region['Region'] for region in resp.get('RegionSet') or []
+            if region.get('RegionState', 'AVAILABLE') == 'AVAILABLE'
+        ]
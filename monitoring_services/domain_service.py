@@ -1,39 +1,41 @@
-import json
-from datetime import datetime
 from .base_service import BaseService
 from tencentcloud.domain.v20180808 import domain_client, models
+from utils.time_utils import compute_differ_days
+from utils.resource_model import DomainRecord
 
 class DomainService(BaseService):
+    PRODUCT = "domain"
+    CACHE_TTL = 86400  # 响应缓存有效期（秒）
+    PAGE_SIZE = 100  # DescribeDomainNameList 单页最大数量
+
     def init_client(self):
         """初始化域名服务客户端"""
-        self.client = domain_client.DomainClient(self.cred, self.region, self.client_profile)
+        self.client = self.create_client(domain_client.DomainClient)
 
     def get_domains(self):
         """获取所有域名"""
         try:
-            req = models.DescribeDomainNameListRequest()
-            resp = self.client.DescribeDomainNameList(req)
-            resp_dict = json.loads(resp.to_json_string())
-            
             domains = []
-            for domain in resp_dict.get("DomainSet", []):
-                expiration_date = datetime.strptime(domain["ExpirationDate"], "%Y-%m-%d")
-                differ_days = (expiration_date - datetime.now()).days
-
-                domains.append({
-                    "Type": "Domain",
-                    "DomainId": domain["DomainId"],
-                    "Domain": domain["DomainName"],
-                    "ProjectId": None,
-                    "ProjectName": None,
-                    "Zone": None,
-                    "ExpiredTime": domain["ExpirationDate"],
-                    "DifferDays": differ_days,
-                    "Status": domain.get("DomainStatus", "Unknown")
-                })
+            for domain in self.paginate('DescribeDomainNameList', models.DescribeDomainNameListRequest,
+                                        'DomainSet', self.PAGE_SIZE):
+                domains.append(DomainRecord(
+                    Type="Domain",
+                    DomainId=domain["DomainId"],
+                    Domain=domain["DomainName"],
+                    ProjectId=None,
+                    ProjectName=None,
+                    Zone=None,
+                    ExpiredTime=domain["ExpirationDate"],
+                    DifferDays=None,
+                    Status=domain.get("DomainStatus", "Unknown")
+                ))
             
+            # 批量计算剩余天数
+            for item, differ_days in zip(domains, compute_differ_days(item["ExpiredTime"] for item in domains)):
+                item.DifferDays = differ_days
             return domains
             
         except Exception as e:
+            self.last_error = e
             print(f"获取域名信息时发生错误: {str(e)}")
             return [] 
\ No newline at end of file
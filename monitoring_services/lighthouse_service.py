@@ -1,36 +1,46 @@
 import json
 from .base_service import BaseService
 from tencentcloud.lighthouse.v20200324 import lighthouse_client, models
-from utils.time_utils import convert_utc_to_beijing, get_beijing_now
+from utils.time_utils import compute_differ_days, format_time
+from utils.resource_model import LighthouseRecord
 from typing import List, Dict
 
 class LighthouseService(BaseService):
+    PRODUCT = "lighthouse"
+    PAGE_SIZE = 100  # DescribeInstances 单页最大数量
+
     def init_client(self):
         """初始化Lighthouse客户端"""
-        self.client = lighthouse_client.LighthouseClient(self.cred, self.region, self.client_profile)
+        self.client = self.create_client(lighthouse_client.LighthouseClient)
     
     def get_instances(self) -> List[Dict]:
         """获取轻量应用服务器实例列表"""
         try:
-            req = models.DescribeInstancesRequest()
-            resp = self.client.DescribeInstances(req)
-            
             instances = []
-            if resp.InstanceSet:
-                for instance in resp.InstanceSet:
-                    # 计算剩余天数
-                    expired_time = convert_utc_to_beijing(instance.ExpiredTime)
-                    differ_days = (expired_time - get_beijing_now()).days
-                    
-                    instances.append({
-                        'Type': 'Lighthouse',
-                        'InstanceId': instance.InstanceId,
-                        'InstanceName': instance.InstanceName,
-                        'Zone': instance.Zone,
-                        'ExpiredTime': expired_time.strftime("%Y-%m-%d %H:%M:%S"),
-                        'DifferDays': differ_days
-                    })
+            for instance in self.paginate('DescribeInstances', models.DescribeInstancesRequest,
+                                          'InstanceSet', self.PAGE_SIZE):
+                instances.append(LighthouseRecord(
+                    Type='Lighthouse',
+                    InstanceId=instance['InstanceId'],
+                    InstanceName=instance['InstanceName'],
+                    Zone=instance['Zone'],
+                    ExpiredTime=format_time(instance.get('ExpiredTime')),
+                    DifferDays=None
+                ))
+            
+            # 批量计算剩余天数
+            for item, differ_days in zip(instances, compute_differ_days(item['ExpiredTime'] for item in instances)):
+                item.DifferDays = differ_days
             return instances
         except Exception as err:
+            self.last_error = err
             print(f"获取轻量应用服务器实例列表失败: {err}")
-            return [] 
\ No newline at end of file
+            return [] 
+
+    def describe_regions(self) -> List[str]:
+        """获取轻量应用服务器可用的地域列表"""
+        resp = self.call_api('DescribeRegions', models.DescribeRegionsRequest)
+        return [
+            region['Region'] for region in resp.get('RegionSet') or []
+            if region.get('RegionState', 'AVAILABLE') == 'AVAILABLE'
+        ]
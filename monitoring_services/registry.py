@@ -0,0 +1,47 @@
+import time
+import logging
+import importlib
+import threading
+from typing import Iterable
+
+# 已导入的服务类：{"模块:类名": 类}
+_classes = {}
+# 各服务模块首次导入的耗时（秒），包括该产品的SDK模块
+_import_times = {}
+_lock = threading.Lock()
+
+
+def load_service_class(path: str):
+    """
+    按 "模块:类名" 导入服务类
+    服务模块在首次使用时才导入，只运行账单或单个服务时不会加载其他产品的SDK
+    """
+    cls = _classes.get(path)
+    if cls is not None:
+        return cls
+    with _lock:
+        cls = _classes.get(path)
+        if cls is None:
+            module_name, _, class_name = path.partition(':')
+            start = time.perf_counter()
+            module = importlib.import_module(module_name)
+            _import_times[path] = time.perf_counter() - start
+            cls = _classes[path] = getattr(module, class_name)
+        return cls
+
+
+def preload_service_classes(paths: Iterable[str]):
+    """
+    在主线程中预先导入本次调度的服务，避免多个采集线程同时导入同一个模块，
+    并记录导入耗时
+    """
+    loaded = [path for path in dict.fromkeys(paths) if path not in _classes]
+    for path in loaded:
+        load_service_class(path)
+    if loaded:
+        logging.getLogger('TencentCloudMonitor').info(
+            "[服务加载] " + "，".join(
+                f"{path.partition(':')[2]} {_import_times[path] * 1000:.0f}ms" for path in loaded
+            )
+        )
+
@@ -1,30 +1,85 @@
-import json
-from tencentcloud.tag.v20180813 import tag_client, models
+import threading
+from .base_service import BaseService
 
-class TagService:
-    def __init__(self, cred, region, client_profile):
-        self.client = tag_client.TagClient(cred, region, client_profile)
+class TagService(BaseService):
+    """标签服务，负责将项目ID解析为项目名称"""
+    PRODUCT = "tag"
+    CACHE_TTL = 21600  # 响应缓存有效期（秒）
+    PAGE_SIZE = 1000  # DescribeProjects 每页固定数量
+
+    # 项目缓存按凭证共享：{secret_id: {project_id: project_name}}
+    _project_cache = {}
+    _load_locks = {}
+    _cache_lock = threading.Lock()
+    _stats = {'hits': 0, 'misses': 0, 'loads': 0}
+
+    def __init__(self, cred, region, client_profile, client_factory=None):
+        super().__init__(cred, client_profile, region, client_factory)
+
+    def init_client(self):
+        """初始化标签客户端"""
+        # 主程序启动时只用到项目缓存，标签SDK在创建客户端时才导入
+        from tencentcloud.tag.v20180813 import tag_client
+        self.client = self.create_client(tag_client.TagClient)
+
+    def load_projects(self) -> dict:
+        """
+        加载当前账号下的全部项目
+        同一凭证在一次运行中只请求一次，结果由所有区域的服务共享
+        """
+        key = self.cred.secret_id
+        with self._cache_lock:
+            if key in self._project_cache:
+                return self._project_cache[key]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # 同一账号的多个区域并发查询时，只让一个线程去加载
+        with load_lock:
+            with self._cache_lock:
+                if key in self._project_cache:
+                    return self._project_cache[key]
+
+            from tencentcloud.tag.v20180813 import models
+            projects = {}
+            try:
+                for project in self.paginate('DescribeProjects', models.DescribeProjectsRequest,
+                                             'Projects', self.PAGE_SIZE, {"AllList": 1},
+                                             total_key='Total'):
+                    projects[project["ProjectId"]] = project["ProjectName"]
+            except Exception as e:
+                # 失败时也缓存空结果，避免每个实例都重新请求
+                print(f"获取项目列表时发生错误: {str(e)}")
+
+            with self._cache_lock:
+                self._project_cache[key] = projects
+                self._stats['loads'] += 1
+            return projects
 
     def get_project_name(self, project_id):
         """获取项目名称"""
-        try:
-            req = models.DescribeProjectsRequest()
-            params = {
-                "AllList": 1,
-                "Limit": 100,
-                "Offset": 0,
-                "ProjectId": project_id
-            }
-            req.from_json_string(json.dumps(params))
-            resp = self.client.DescribeProjects(req)
-            resp_dict = json.loads(resp.to_json_string())
-            
-            if "Projects" in resp_dict and resp_dict["Projects"]:
-                return resp_dict["Projects"][0]["ProjectName"]
-                
+        project_name = self.load_projects().get(project_id)
+
+        with self._cache_lock:
+            if project_name is None:
+                self._stats['misses'] += 1
+            else:
+                self._stats['hits'] += 1
+
+        if project_name is None:
             print(f"未找到项目 ID {project_id} 对应的项目名称")
-            return None
-            
-        except Exception as e:
-            print(f"获取项目名称时发生错误: {str(e)}")
-            return None 
\ No newline at end of file
+        return project_name
+
+    @classmethod
+    def get_cache_stats(cls) -> dict:
+        """获取项目缓存命中统计"""
+        with cls._cache_lock:
+            return dict(cls._stats, accounts=len(cls._project_cache))
+
+    @classmethod
+    def clear_cache(cls):
+        """清空项目缓存和统计，每次运行开始时调用"""
+        with cls._cache_lock:
+            cls._project_cache.clear()
+            cls._load_locks.clear()
+            for key in cls._stats:
+                cls._stats[key] = 0
@@ -1,11 +1,23 @@
-from .database_service import DatabaseService
-from .email_service import EmailService
-from .tag_service import TagService
-from .wechat_service import WeChatService
-
-__all__ = [
-    'DatabaseService',
-    'EmailService',
-    'TagService',
-    'WeChatService'
-] 
\ No newline at end of file
+import importlib
+
+# 服务类按需导入（PEP 562），未启用数据库或邮件时不加载 MySQL 驱动和 SMTP 模块
+_SERVICE_MODULES = {
+    'DatabaseService': '.database_service',
+    'EmailService': '.email_service',
+    'TagService': '.tag_service',
+    'WeChatService': '.wechat_service',
+    'YunZhiJiaService': '.yunzhijia_service'
+}
+
+__all__ = list(_SERVICE_MODULES)
+
+
+def __getattr__(name):
+    module_name = _SERVICE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_name, __name__), name)
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,8 +1,192 @@
-import mysql.connector
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from datetime import datetime
+from functools import lru_cache
+from collections import OrderedDict
+from contextlib import contextmanager
 import logging
+import queue
+import threading
+import time
 import uuid
+from utils.snapshot_store import SnapshotStore, content_hash
+from utils.time_utils import get_reference_now
+from utils.metrics import METRICS
+
+# 各表写入的列，前 N 列为业务主键，其余列在重复时更新
+UPSERT_COLUMNS = {
+    'cvm_instances': (
+        ('account_name', 'instance_id', 'instance_name', 'zone', 'project_name',
+         'expired_time', 'differ_days', 'batch_number', 'updated_at'), 2),
+    'lighthouse_instances': (
+        ('account_name', 'instance_id', 'instance_name', 'zone',
+         'expired_time', 'differ_days', 'batch_number', 'updated_at'), 2),
+    'cbs_disks': (
+        ('account_name', 'disk_id', 'disk_name', 'project_name', 'zone',
+         'expired_time', 'differ_days', 'batch_number', 'updated_at'), 2),
+    'domains': (
+        ('account_name', 'domain_id', 'domain_name',
+         'expired_time', 'differ_days', 'batch_number', 'updated_at'), 2),
+    'ssl_certificates': (
+        ('account_name', 'certificate_id', 'domain', 'product_name', 'project_name',
+         'expired_time', 'differ_days', 'batch_number', 'updated_at'), 2),
+    'billing_info': (
+        ('account_name', 'project_name', 'service_name', 'balance', 'real_total_cost',
+         'total_cost', 'cash_pay_amount', 'batch_number', 'updated_at'), 3),
+}
+
+# 内容哈希不包含的列：剩余天数每天变化，可由到期时间推算
+VOLATILE_COLUMNS = ('differ_days', 'batch_number', 'updated_at')
+
+# 资源类型对应的写入方法
+RESOURCE_WRITERS = {
+    'CVM': 'insert_cvm_instances',
+    'Lighthouse': 'insert_lighthouse_instances',
+    'CBS': 'insert_cbs_disks',
+    'Domain': 'insert_domains',
+    'SSL': 'insert_ssl_certificates',
+}
+
+@lru_cache(maxsize=None)
+def build_upsert_sql(table: str, columns: Tuple[str, ...], key_count: int, row_count: int) -> str:
+    """生成多行 INSERT ... ON DUPLICATE KEY UPDATE 语句"""
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    updates = ", ".join(f"{column} = VALUES({column})" for column in columns[key_count:])
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES {', '.join([placeholders] * row_count)} "
+        f"ON DUPLICATE KEY UPDATE {updates}"
+    )
+
+# 复制未变化资源时重新计算的列，参数按列在 UPSERT_COLUMNS 中的顺序传入
+REFRESH_EXPRESSIONS = {
+    'differ_days': "FLOOR(TIMESTAMPDIFF(SECOND, %s, expired_time) / 86400)",
+    'batch_number': "%s",
+    'updated_at': "%s",
+}
+
+@lru_cache(maxsize=None)
+def build_refresh_sql(table: str, columns: Tuple[str, ...], key_column: str, row_count: int) -> str:
+    """
+    生成未变化资源的刷新语句：从上次写入的批次复制记录到当前批次，
+    只根据到期时间重新计算剩余天数，旧批次的记录保持不变
+    """
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"SELECT {', '.join(REFRESH_EXPRESSIONS.get(column, column) for column in columns)} FROM {table} "
+        f"WHERE account_name = %s AND batch_number = %s "
+        f"AND {key_column} IN ({', '.join(['%s'] * row_count)})"
+    )
+
+class ConnectionPool:
+    """
+    数据库连接池
+    连接按需创建，最多 pool_size 个，借不到连接时阻塞等待；
+    只对空闲超过 ping_interval 秒的连接做健康检查，避免每次借出都多一次往返。
+    每个连接缓存按 SQL 复用的服务端预处理语句。
+    """
+    MAX_STATEMENTS_PER_CONNECTION = 32
+
+    def __init__(self, connect_args: Dict, pool_size: int = 4, ping_interval: float = 60):
+        self.connect_args = connect_args
+        self.ping_interval = ping_interval
+        self._slots = threading.BoundedSemaphore(max(1, pool_size))
+        # 后进先出，优先复用刚用过的连接，减少健康检查次数
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """借出一个连接"""
+        self._slots.acquire()
+        try:
+            try:
+                connection, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if time.monotonic() - last_used > self.ping_interval:
+                connection_id = connection.connection_id
+                connection.ping(reconnect=True, attempts=2, delay=1)
+                if connection.connection_id != connection_id:
+                    # 重连后服务端预处理语句已失效
+                    self._drop_statements(connection)
+            return connection
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection):
+        """归还连接"""
+        self._idle.put((connection, time.monotonic()))
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """以上下文管理器方式借用连接"""
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def revive(self, connection):
+        """语句执行失败后检查连接，断开则重连"""
+        if not connection.is_connected():
+            connection.reconnect(attempts=2, delay=1)
+            self._drop_statements(connection)
+
+    def prepared_cursor(self, connection, sql: str):
+        """获取该连接上指定 SQL 的预处理游标，不存在时创建"""
+        with self._lock:
+            statements = self._statements.setdefault(id(connection), OrderedDict())
+            cursor = statements.get(sql)
+            if cursor is not None:
+                statements.move_to_end(sql)
+                return cursor
+
+            cursor = connection.cursor(prepared=True)
+            statements[sql] = cursor
+            evicted = None
+            if len(statements) > self.MAX_STATEMENTS_PER_CONNECTION:
+                _, evicted = statements.popitem(last=False)
+
+        if evicted is not None:
+            self._close_cursor(evicted)
+        return cursor
+
+    def close(self):
+        """关闭所有游标和连接"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for connection in connections:
+            self._drop_statements(connection)
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _connect(self):
+        # 未启用数据库时不导入 MySQL 驱动
+        import mysql.connector
+        connection = mysql.connector.connect(**self.connect_args)
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def _drop_statements(self, connection):
+        with self._lock:
+            statements = self._statements.pop(id(connection), {})
+        for cursor in statements.values():
+            self._close_cursor(cursor)
+
+    @staticmethod
+    def _close_cursor(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
 
 class DatabaseService:
     def __init__(self, db_config):
@@ -15,20 +199,41 @@ class DatabaseService:
             
         self.db_config = db_config
         self.enabled = True
+        self.batch_size = max(1, int(db_config.get('batch_size', 500)))
         self.current_batch = self._generate_batch_number()
+        self.snapshots = None
         try:
-            self.connection = mysql.connector.connect(
-                host=db_config['host'],
-                user=db_config['user'],
-                password=db_config['password'],
-                database=db_config['database'],
-                port=int(db_config['port'])
+            self.pool = ConnectionPool(
+                {
+                    'host': db_config['host'],
+                    'user': db_config['user'],
+                    'password': db_config['password'],
+                    'database': db_config['database'],
+                    'port': int(db_config['port'])
+                },
+                pool_size=int(db_config.get('pool_size', 4)),
+                ping_interval=float(db_config.get('ping_interval', 60))
             )
-            self.cursor = self.connection.cursor()
+            # 预先建立一个连接，尽早发现配置错误
+            with self.pool.connection():
+                pass
             self.logger.info(f"成功连接到数据库 {db_config['database']}")
         except Exception as e:
             self.logger.error(f"数据库连接失败: {str(e)}")
             self.enabled = False
+            return
+        
+        # 增量写入：只完整写入新增或变化的资源，其余资源在数据库内从上次的批次复制
+        if db_config.get('incremental', False):
+            try:
+                self.snapshots = SnapshotStore(db_config.get('snapshot_path') or 'data/snapshots.db')
+                self.logger.info(f"已启用增量写入，快照文件: {self.snapshots.path}")
+            except Exception as e:
+                self.logger.error(f"打开资源快照失败，使用全量写入: {str(e)}")
+
+    def start_batch(self):
+        """开始新的写入批次，常驻模式下每次采集前调用"""
+        self.current_batch = self._generate_batch_number()
 
     def _generate_batch_number(self) -> str:
         """生成批次号，使用时间戳格式：YYYYMMDDHHMMSS"""
@@ -36,300 +241,318 @@ class DatabaseService:
 
     def insert_cvm_instances(self, account_name: str, instances: List[Dict]):
         if not self.enabled or not self.ensure_connection():
-            return
+            return 0
             
-        success_count = 0
-        for instance in instances:
-            try:
-                self.cursor.execute("""
-                    INSERT INTO cvm_instances 
-                    (account_name, instance_id, instance_name, zone, project_name, expired_time, differ_days, batch_number, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                    instance_name = VALUES(instance_name),
-                    zone = VALUES(zone),
-                    project_name = VALUES(project_name),
-                    expired_time = VALUES(expired_time),
-                    differ_days = VALUES(differ_days),
-                    batch_number = VALUES(batch_number),
-                    updated_at = VALUES(updated_at)
-                """, (
-                    account_name,
-                    instance['InstanceId'],
-                    instance['InstanceName'],
-                    instance['Zone'],
-                    instance.get('ProjectName', '默认项目'),
-                    instance['ExpiredTime'],
-                    instance['DifferDays'],
-                    self.current_batch,
-                    datetime.now()
-                ))
-                self.connection.commit()
-                success_count += 1
-            except Exception as e:
-                self.logger.error(f"插入CVM实例数据失败 - {instance.get('InstanceName', 'unknown')}: {str(e)}")
-        
-        if instances:
-            self.logger.info(f"CVM实例数据写入完成: 成功 {success_count}/{len(instances)}")
+        now = datetime.now()
+        rows = [(
+            account_name,
+            instance['InstanceId'],
+            instance['InstanceName'],
+            instance['Zone'],
+            instance.get('ProjectName', '默认项目'),
+            instance['ExpiredTime'],
+            instance['DifferDays'],
+            self.current_batch,
+            now
+        ) for instance in instances]
+        names = [instance.get('InstanceName', 'unknown') for instance in instances]
+        return self._write_resources('cvm_instances', account_name, rows, 'CVM实例', names)
 
     def insert_lighthouse_instances(self, account_name: str, instances: List[Dict]):
         if not self.enabled or not self.ensure_connection():
-            return
+            return 0
             
-        success_count = 0
-        for instance in instances:
-            try:
-                self.cursor.execute("""
-                    INSERT INTO lighthouse_instances 
-                    (account_name, instance_id, instance_name, zone, expired_time, differ_days, batch_number, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                    instance_name = VALUES(instance_name),
-                    zone = VALUES(zone),
-                    expired_time = VALUES(expired_time),
-                    differ_days = VALUES(differ_days),
-                    batch_number = VALUES(batch_number),
-                    updated_at = VALUES(updated_at)
-                """, (
-                    account_name,
-                    instance['InstanceId'],
-                    instance['InstanceName'],
-                    instance['Zone'],
-                    instance['ExpiredTime'],
-                    instance['DifferDays'],
-                    self.current_batch,
-                    datetime.now()
-                ))
-                self.connection.commit()
-                success_count += 1
-            except Exception as e:
-                self.logger.error(f"插入轻量应用服务器实例数据失败 - {instance.get('InstanceName', 'unknown')}: {str(e)}")
-        
-        if instances:
-            self.logger.info(f"轻量应用服务器实例数据写入完成: 成功 {success_count}/{len(instances)}")
+        now = datetime.now()
+        rows = [(
+            account_name,
+            instance['InstanceId'],
+            instance['InstanceName'],
+            instance['Zone'],
+            instance['ExpiredTime'],
+            instance['DifferDays'],
+            self.current_batch,
+            now
+        ) for instance in instances]
+        names = [instance.get('InstanceName', 'unknown') for instance in instances]
+        return self._write_resources('lighthouse_instances', account_name, rows, '轻量应用服务器实例', names)
 
     def insert_cbs_disks(self, account_name: str, disks: List[Dict]):
         if not self.enabled or not self.ensure_connection():
-            return
+            return 0
             
-        success_count = 0
-        for disk in disks:
-            try:
-                self.cursor.execute("""
-                    INSERT INTO cbs_disks 
-                    (account_name, disk_id, disk_name, project_name, zone, expired_time, differ_days, batch_number, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                    disk_name = VALUES(disk_name),
-                    project_name = VALUES(project_name),
-                    zone = VALUES(zone),
-                    expired_time = VALUES(expired_time),
-                    differ_days = VALUES(differ_days),
-                    batch_number = VALUES(batch_number),
-                    updated_at = VALUES(updated_at)
-                """, (
-                    account_name,
-                    disk['DiskId'],
-                    disk['DiskName'],
-                    disk.get('ProjectName', '默认项目'),
-                    disk['Zone'],
-                    disk['ExpiredTime'],
-                    disk['DifferDays'],
-                    self.current_batch,
-                    datetime.now()
-                ))
-                self.connection.commit()
-                success_count += 1
-            except Exception as e:
-                self.logger.error(f"插入云硬盘数据失败 - {disk.get('DiskName', 'unknown')}: {str(e)}")
-        
-        if disks:
-            self.logger.info(f"云硬盘数据写入完成: 成功 {success_count}/{len(disks)}")
+        now = datetime.now()
+        rows = [(
+            account_name,
+            disk['DiskId'],
+            disk['DiskName'],
+            disk.get('ProjectName', '默认项目'),
+            disk['Zone'],
+            disk['ExpiredTime'],
+            disk['DifferDays'],
+            self.current_batch,
+            now
+        ) for disk in disks]
+        names = [disk.get('DiskName', 'unknown') for disk in disks]
+        return self._write_resources('cbs_disks', account_name, rows, '云硬盘', names)
 
     def insert_domains(self, account_name: str, domains: List[Dict]):
         if not self.enabled or not self.ensure_connection():
-            return
+            return 0
             
-        success_count = 0
-        for domain in domains:
-            try:
-                self.cursor.execute("""
-                    INSERT INTO domains 
-                    (account_name, domain_id, domain_name, expired_time, differ_days, batch_number, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                    domain_name = VALUES(domain_name),
-                    expired_time = VALUES(expired_time),
-                    differ_days = VALUES(differ_days),
-                    batch_number = VALUES(batch_number),
-                    updated_at = VALUES(updated_at)
-                """, (
-                    account_name,
-                    domain['DomainId'],
-                    domain['Domain'],
-                    domain['ExpiredTime'],
-                    domain['DifferDays'],
-                    self.current_batch,
-                    datetime.now()
-                ))
-                self.connection.commit()
-                success_count += 1
-            except Exception as e:
-                self.logger.error(f"插入域名数据失败 - {domain.get('Domain', 'unknown')}: {str(e)}")
-        
-        if domains:
-            self.logger.info(f"域名数据写入完成: 成功 {success_count}/{len(domains)}")
+        now = datetime.now()
+        rows = [(
+            account_name,
+            domain['DomainId'],
+            domain['Domain'],
+            domain['ExpiredTime'],
+            domain['DifferDays'],
+            self.current_batch,
+            now
+        ) for domain in domains]
+        names = [domain.get('Domain', 'unknown') for domain in domains]
+        return self._write_resources('domains', account_name, rows, '域名', names)
 
     def insert_billing_info(self, account_name: str, balance: float, bill_details: Dict):
         """插入账单数据"""
         if not self.enabled or not self.ensure_connection():
             self.logger.warning("数据库未启用或连接失败，跳过账单数据写入")
-            return
+            return 0
             
-        total_count = 1  # 余额记录
-        success_count = 0
+        now = datetime.now()
+        self.logger.debug(f"正在写入账户 {account_name} 的余额信息: {balance}")
         
-        try:
-            # 插入余额记录
-            self.logger.debug(f"正在写入账户 {account_name} 的余额信息: {balance}")
-            self.cursor.execute("""
-                INSERT INTO billing_info 
-                (account_name, project_name, service_name, balance, real_total_cost, total_cost, cash_pay_amount, batch_number, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                balance = VALUES(balance),
-                real_total_cost = VALUES(real_total_cost),
-                total_cost = VALUES(total_cost),
-                cash_pay_amount = VALUES(cash_pay_amount),
-                batch_number = VALUES(batch_number),
-                updated_at = VALUES(updated_at)
-            """, (
-                account_name,
-                '系统',
-                '账户余额',
-                balance,
-                0,
-                0,
-                0,
-                self.current_batch,
-                datetime.now()
-            ))
-            self.connection.commit()
-            success_count += 1
-            self.logger.debug("余额信息写入成功")
-        except Exception as e:
-            self.logger.error(f"插入账户余额数据失败: {str(e)}")
+        # 余额记录
+        rows = [(account_name, '系统', '账户余额', balance, 0, 0, 0, self.current_batch, now)]
+        names = ['账户余额']
         
-        # 计算总服务数
-        for project_name, details in bill_details.items():
-            total_count += len(details["services"])
-        
-        # 插入服务费用记录
+        # 服务费用记录
         for project_name, details in bill_details.items():
             for service_name, costs in details["services"].items():
-                try:
-                    self.logger.debug(f"正在写入项目 {project_name} 服务 {service_name} 的账单信息")
-                    self.cursor.execute("""
-                        INSERT INTO billing_info 
-                        (account_name, project_name, service_name, balance, real_total_cost, total_cost, cash_pay_amount, batch_number, updated_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON DUPLICATE KEY UPDATE
-                        balance = VALUES(balance),
-                        real_total_cost = VALUES(real_total_cost),
-                        total_cost = VALUES(total_cost),
-                        cash_pay_amount = VALUES(cash_pay_amount),
-                        batch_number = VALUES(batch_number),
-                        updated_at = VALUES(updated_at)
-                    """, (
-                        account_name,
-                        project_name,
-                        service_name,
-                        0,
-                        costs['RealTotalCost'],
-                        costs['TotalCost'],
-                        costs['CashPayAmount'],
-                        self.current_batch,
-                        datetime.now()
-                    ))
-                    self.connection.commit()
-                    success_count += 1
-                except Exception as e:
-                    self.logger.error(f"插入账单数据失败 - 项目: {project_name}, 服务: {service_name}: {str(e)}")
+                rows.append((
+                    account_name,
+                    project_name,
+                    service_name,
+                    0,
+                    costs['RealTotalCost'],
+                    costs['TotalCost'],
+                    costs['CashPayAmount'],
+                    self.current_batch,
+                    now
+                ))
+                names.append(f"项目: {project_name}, 服务: {service_name}")
         
-        self.logger.info(f"账单数据写入完成: 成功 {success_count}/{total_count}")
+        return len(self._bulk_upsert('billing_info', rows, '账单', names))
 
     def insert_ssl_certificates(self, account_name: str, certificates: List[Dict]):
         """插入SSL证书数据"""
         if not self.enabled or not self.ensure_connection():
-            return
+            return 0
             
-        success_count = 0
-        for cert in certificates:
-            try:
-                self.cursor.execute("""
-                    INSERT INTO ssl_certificates 
-                    (account_name, certificate_id, domain, product_name, project_name, 
-                    expired_time, differ_days, batch_number, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                    domain = VALUES(domain),
-                    product_name = VALUES(product_name),
-                    project_name = VALUES(project_name),
-                    expired_time = VALUES(expired_time),
-                    differ_days = VALUES(differ_days),
-                    batch_number = VALUES(batch_number),
-                    updated_at = VALUES(updated_at)
-                """, (
-                    account_name,
-                    cert['CertificateId'],
-                    cert['Domain'],
-                    cert['ProductName'],
-                    cert['ProjectName'],
-                    cert['ExpiredTime'],
-                    cert['DifferDays'],
-                    self.current_batch,
-                    datetime.now()
-                ))
-                self.connection.commit()
-                success_count += 1
-            except Exception as e:
-                self.logger.error(f"插入SSL证书数据失败 - {cert.get('Domain', 'unknown')}: {str(e)}")
+        now = datetime.now()
+        rows = [(
+            account_name,
+            cert['CertificateId'],
+            cert['Domain'],
+            cert['ProductName'],
+            cert['ProjectName'],
+            cert['ExpiredTime'],
+            cert['DifferDays'],
+            self.current_batch,
+            now
+        ) for cert in certificates]
+        names = [cert.get('Domain', 'unknown') for cert in certificates]
+        return self._write_resources('ssl_certificates', account_name, rows, 'SSL证书', names)
+
+    def insert_resources(self, account_name: str, service_type: str, resources: List[Dict]) -> int:
+        """按资源类型写入数据，返回成功写入的行数"""
+        method = RESOURCE_WRITERS.get(service_type)
+        if method is None:
+            self.logger.warning(f"未知的资源类型 {service_type}，跳过写入")
+            return 0
+        return getattr(self, method)(account_name, resources)
+
+    def _write_resources(self, table: str, account_name: str, rows: List[tuple],
+                         label: str, names: List[str]) -> int:
+        """
+        写入资源数据
+        未启用增量写入时全量写入；启用后与本地快照比较，新增或变化的资源完整写入，
+        未变化的资源由数据库从上次写入的批次复制到当前批次并重新计算剩余天数，
+        每个批次仍包含全部资源；写入成功后才更新快照
+        :return: 成功写入或复制的行数
+        """
+        if self.snapshots is None:
+            return len(self._bulk_upsert(table, rows, label, names))
+        if not rows:
+            return 0
+        
+        columns, _ = UPSERT_COLUMNS[table]
+        stable = [index for index, column in enumerate(columns) if column not in VOLATILE_COLUMNS]
+        hashes = {}
+        for row in rows:
+            hashes[row[1]] = content_hash(row[index] for index in stable)
+        changed, unchanged = self.snapshots.diff(account_name, table, hashes)
+        
+        changed_ids = set(changed)
+        changed_rows, changed_names = [], []
+        for row, name in zip(rows, names):
+            if row[1] in changed_ids:
+                changed_rows.append(row)
+                changed_names.append(name)
+        
+        written = self._bulk_upsert(table, changed_rows, label, changed_names)
+        refreshed, missing = self._refresh_unchanged(table, account_name, unchanged, label)
+        if missing:
+            # 数据库中已不存在或复制失败的记录按变化资源重新写入
+            missing_rows = [row for row in rows if row[1] in missing]
+            written += self._bulk_upsert(table, missing_rows, label,
+                                         [str(row[1]) for row in missing_rows])
         
-        if certificates:
-            self.logger.info(f"SSL证书数据写入完成: 成功 {success_count}/{len(certificates)}")
+        self.snapshots.commit(account_name, table, {
+            resource_id: (hashes[resource_id], self.current_batch)
+            for resource_id in [row[1] for row in written] + refreshed
+        })
+        self.logger.info(
+            f"{label}增量写入: 共 {len(rows)} 条，新增或变化 {len(changed_rows) + len(missing)} 条，"
+            f"未变化 {len(refreshed)} 条"
+        )
+        return len(written) + len(refreshed)
+
+    def _refresh_unchanged(self, table: str, account_name: str, unchanged: Dict[str, str], label: str):
+        """
+        将未变化资源的记录从上次写入的批次复制到当前批次，并刷新剩余天数
+        :param unchanged: {资源ID: 上次写入的批次号}
+        :return: (复制成功的资源ID列表, 数据库中找不到记录的资源ID集合)
+        """
+        refreshed, missing = [], set()
+        if not unchanged:
+            return refreshed, missing
+        
+        columns, _ = UPSERT_COLUMNS[table]
+        key_column = columns[1]
+        now = datetime.now()
+        # 到期时间按北京时间存储，剩余天数与采集时使用同一参考时间
+        today = get_reference_now()
+        by_batch = {}
+        for resource_id, batch_number in unchanged.items():
+            by_batch.setdefault(batch_number, []).append(resource_id)
+        
+        with self.pool.connection() as connection:
+            for batch_number, resource_ids in by_batch.items():
+                for offset in range(0, len(resource_ids), self.batch_size):
+                    chunk = resource_ids[offset:offset + self.batch_size]
+                    sql = build_refresh_sql(table, columns, key_column, len(chunk))
+                    try:
+                        with METRICS.span('db.refresh', account=account_name, table=table, rows=len(chunk)):
+                            cursor = self.pool.prepared_cursor(connection, sql)
+                            cursor.execute(sql, (today, self.current_batch, now, account_name, batch_number, *chunk))
+                            copied = cursor.rowcount
+                            connection.commit()
+                    except Exception as e:
+                        self._rollback(connection)
+                        # 复制失败时按变化资源完整写入，避免当前批次缺少这些资源
+                        self.logger.error(f"复制未变化的{label}记录失败，改为完整写入: {str(e)}")
+                        missing.update(chunk)
+                        continue
+                    
+                    if copied >= len(chunk):
+                        refreshed.extend(chunk)
+                        continue
+                    # 部分旧记录已被删除，查出实际复制的记录，其余按变化资源处理
+                    found = self._select_current(connection, table, key_column, account_name, chunk)
+                    refreshed.extend(resource_id for resource_id in chunk if resource_id in found)
+                    missing.update(resource_id for resource_id in chunk if resource_id not in found)
+        return refreshed, missing
+
+    def _select_current(self, connection, table: str, key_column: str, account_name: str, resource_ids: List[str]) -> set:
+        """查询当前批次中已存在的资源ID"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                f"SELECT {key_column} FROM {table} WHERE account_name = %s AND batch_number = %s "
+                f"AND {key_column} IN ({', '.join(['%s'] * len(resource_ids))})",
+                (account_name, self.current_batch, *resource_ids)
+            )
+            return {row[0] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def _bulk_upsert(self, table: str, rows: List[tuple], label: str, names: List[str]) -> List[tuple]:
+        """
+        分块批量写入数据
+        每个分块使用一条多行 INSERT ... ON DUPLICATE KEY UPDATE 语句并只提交一次，
+        分块写入失败时仅对该分块回退为逐行写入
+        :param table: 表名，列定义见 UPSERT_COLUMNS
+        :param rows: 按列顺序组织的数据行
+        :param label: 日志中显示的数据类型名称
+        :param names: 每行数据的名称，用于错误日志
+        :return: 成功写入的数据行列表，包括分块失败后逐行写入成功的行；写入失败的行不在其中
+        """
+        if not rows:
+            return []
+            
+        columns, key_count = UPSERT_COLUMNS[table]
+        start = time.perf_counter()
+        written = []
+        
+        with self.pool.connection() as connection:
+            for offset in range(0, len(rows), self.batch_size):
+                chunk = rows[offset:offset + self.batch_size]
+                sql = build_upsert_sql(table, columns, key_count, len(chunk))
+                # 每行第一列为账号名称，回退为逐行写入的耗时也计入该分块
+                with METRICS.span('db.upsert', account=chunk[0][0], table=table, rows=len(chunk)) as span:
+                    try:
+                        cursor = self.pool.prepared_cursor(connection, sql)
+                        cursor.execute(sql, tuple(value for row in chunk for value in row))
+                        connection.commit()
+                        written.extend(chunk)
+                        continue
+                    except Exception as e:
+                        self._rollback(connection)
+                        span.fail('fallback')
+                        self.logger.warning(f"批量写入{label}数据失败，回退为逐行写入: {str(e)}")
+                    
+                    single_sql = build_upsert_sql(table, columns, key_count, 1)
+                    for row, name in zip(chunk, names[offset:offset + self.batch_size]):
+                        try:
+                            cursor = self.pool.prepared_cursor(connection, single_sql)
+                            cursor.execute(single_sql, row)
+                            connection.commit()
+                            written.append(row)
+                        except Exception as e:
+                            self._rollback(connection)
+                            self.logger.error(f"插入{label}数据失败 - {name}: {str(e)}")
+        
+        elapsed = time.perf_counter() - start
+        rate = len(written) / elapsed if elapsed > 0 else 0
+        self.logger.info(
+            f"{label}数据写入完成: 成功 {len(written)}/{len(rows)}，"
+            f"耗时 {elapsed:.2f}s，{rate:.0f} 行/秒"
+        )
+        return written
+
+    def _rollback(self, connection):
+        """回滚当前事务，连接已断开时尝试重连"""
+        try:
+            connection.rollback()
+        except Exception:
+            pass
+        try:
+            self.pool.revive(connection)
+        except Exception as e:
+            self.logger.error(f"数据库重连失败: {str(e)}")
 
     def close(self):
         """关闭数据库连接"""
         if self.enabled:
             try:
-                while self.connection.unread_result:
-                    self.cursor.fetchall()
-                self.cursor.close()
-                self.connection.close()
+                self.pool.close()
+                if self.snapshots is not None:
+                    self.snapshots.prune()
+                    self.snapshots.close()
                 self.logger.info("数据库连接已关闭")
             except Exception as e:
                 self.logger.error(f"关闭数据库连接时发生错误: {str(e)}")
 
     def ensure_connection(self):
-        """确保数据库连接有效"""
-        if not self.enabled:
-            return False
-        
-        try:
-            self.cursor.execute("SELECT 1")
-            self.cursor.fetchall()
-            return True
-        except:
-            try:
-                if hasattr(self, 'cursor') and self.cursor:
-                    self.cursor.close()
-                if hasattr(self, 'connection') and self.connection:
-                    self.connection.close()
-                    
-                self.connection = mysql.connector.connect(**self.db_config)
-                self.cursor = self.connection.cursor()
-                self.logger.info("数据库重连成功")
-                return True
-            except Exception as e:
-                self.logger.error(f"数据库重连失败: {str(e)}")
-                return False 
\ No newline at end of file
+        """确保数据库可用，连接的健康检查在从连接池借出时进行"""
+        return self.enabled
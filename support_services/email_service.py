@@ -1,11 +1,20 @@
-import smtplib
 import os
+import io
+import csv
+import gzip
+import base64
+import time
 import logging
-from email.mime.text import MIMEText
+import zipfile
+import threading
+from collections import deque
 from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
-from typing import List, Dict, Union
+from email.mime.nonmultipart import MIMENonMultipart
+from typing import List, Dict, Tuple, Union
 from datetime import datetime
+from utils.expiry_index import ExpiryIndex
+from utils.metrics import METRICS
+from . import email_templates as templates
 
 # 配置日志
 logging.basicConfig(
@@ -28,411 +37,403 @@ class EmailService:
         self.password = config['password']
         self.receivers = config['receivers']
         self.use_ssl = config['use_ssl']
+        self.report_mode = config.get('report_mode', 'full')
+        self.inline_top_n = config.get('inline_top_n', 20)
+        self.attachment_compression = config.get('attachment_compression', 'gzip')
+        self.csv_export = config.get('csv_export', False)
+        self.timeout = config.get('timeout', 30)
         self.logger = logging.getLogger('TencentCloudMonitor')
+        # 待发送的邮件队列和复用的 SMTP 连接
+        self.outbox = deque()
+        self.smtp = None
+        self.lock = threading.Lock()
+        self.stats = {'sent': 0, 'failed': 0, 'connects': 0, 'reconnects': 0}
         
-    def send_email(self, subject: str, content: str) -> bool:
-        """发送带HTML附件的邮件"""
+    def send_email(self, subject: str, content: str, attachments: List[Tuple[str, str, bytes]] = None,
+                   receivers: List[str] = None) -> bool:
+        """
+        发送HTML邮件，复用已建立的 SMTP 连接
+        :param attachments: 附件列表 [(文件名, MIME类型, 内容)]，不传时附带与正文相同的HTML附件
+        :param receivers: 收件人，默认为配置的收件人
+        """
+        return self._send(subject, content, attachments, receivers)['success']
+
+    def queue_email(self, subject: str, content: str, attachments: List[Tuple[str, str, bytes]] = None,
+                    receivers: List[str] = None):
+        """加入发送队列，调用 flush 时通过同一个 SMTP 连接依次发送"""
+        self.outbox.append((subject, content, attachments, receivers))
+
+    def flush(self) -> List[Dict]:
+        """
+        依次发送队列中的邮件
+        :return: 每封邮件的发送结果 [{'subject', 'receivers', 'success', 'latency'}]
+        """
+        results = []
+        while self.outbox:
+            results.append(self._send(*self.outbox.popleft()))
+        return results
+
+    def close(self):
+        """关闭 SMTP 连接"""
+        with self.lock:
+            self._disconnect(quit=True)
+
+    def get_stats(self) -> Dict:
+        """获取发送统计"""
+        with self.lock:
+            return dict(self.stats)
+
+    def _send(self, subject, content, attachments=None, receivers=None) -> Dict:
+        """发送单封邮件，返回发送结果和耗时"""
+        receivers = receivers or self.receivers
+        start = time.monotonic()
         try:
-            msg = MIMEMultipart('alternative')  # 使用 alternative 类型
-            msg['From'] = self.sender
-            msg['To'] = ','.join(self.receivers)
-            msg['Subject'] = subject
-            
-            # 添加HTML正文
-            html_part = MIMEText(content, 'html', 'utf-8')
-            msg.attach(html_part)
+            msg = self._build_message(subject, content, attachments, receivers)
+            with self.lock, METRICS.span('email.send', channel='email', receivers=len(receivers)):
+                self._deliver(msg, receivers)
+                self.stats['sent'] += 1
+            latency = time.monotonic() - start
+            self.logger.info(f"邮件发送成功 - {subject}，收件人 {len(receivers)} 个，耗时 {latency:.2f}s")
+            return {'subject': subject, 'receivers': receivers, 'success': True, 'latency': latency}
             
+        except Exception as e:
+            with self.lock:
+                self.stats['failed'] += 1
+            self.logger.error(f"邮件发送失败 - {subject}: {str(e)}")
+            return {'subject': subject, 'receivers': receivers, 'success': False,
+                    'latency': time.monotonic() - start}
+
+    def _build_message(self, subject, content, attachments, receivers) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')  # 使用 alternative 类型
+        msg['From'] = self.sender
+        msg['To'] = ','.join(receivers)
+        msg['Subject'] = subject
+        
+        # 正文和附件内容相同时只编码一次，两个部分共用同一份 base64 数据
+        payload = base64.encodebytes(content.encode('utf-8')).decode('ascii')
+        
+        # 添加HTML正文
+        msg.attach(self._base64_part('text', 'html', payload, charset='utf-8'))
+        
+        if attachments is None:
             # 生成HTML附件
-            html_filename = f"腾讯云资源报告-{datetime.now().strftime('%Y%m%d')}.html"
-            html_attachment = MIMEApplication(content.encode('utf-8'), _subtype="html")
+            html_filename = f"{self._report_basename()}.html"
+            html_attachment = self._base64_part('application', 'html', payload)
             html_attachment.add_header('Content-Disposition', 'attachment', 
                                      filename=html_filename)
             msg.attach(html_attachment)
-            
-            # 发送邮件
+        else:
+            for filename, mime_type, data in attachments:
+                maintype, subtype = mime_type.split('/', 1)
+                attachment = self._base64_part(maintype, subtype, base64.encodebytes(data).decode('ascii'))
+                attachment.add_header('Content-Disposition', 'attachment', filename=filename)
+                msg.attach(attachment)
+        return msg
+
+    def _deliver(self, msg, receivers):
+        """通过已建立的连接发送，连接已被服务端断开时重新连接并重试一次"""
+        for attempt in range(2):
+            if self.smtp is None:
+                self._connect()
+            try:
+                self.smtp.send_message(msg, self.sender, receivers)
+                return
+            except Exception as e:
+                if not self._is_disconnect(e):
+                    raise
+                self._disconnect()
+                if attempt:
+                    raise
+                self.stats['reconnects'] += 1
+                self.logger.warning(f"SMTP 连接已断开，重新连接后重试: {str(e)}")
+
+    def _connect(self):
+        """建立连接并登录，之后的邮件复用该连接"""
+        # 只在实际发送邮件时导入 SMTP 模块
+        import smtplib
+        with METRICS.span('email.connect', channel='email'):
             if self.use_ssl:
-                smtp = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port)
+                smtp = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=self.timeout)
             else:
-                smtp = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                smtp.starttls()
-            
-            smtp.login(self.sender, self.password)
-            smtp.send_message(msg)
-            smtp.quit()
-            
-            self.logger.info("邮件发送成功")
+                smtp = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+            try:
+                if not self.use_ssl:
+                    smtp.starttls()
+                smtp.login(self.sender, self.password)
+            except Exception:
+                smtp.close()
+                raise
+        self.smtp = smtp
+        self.stats['connects'] += 1
+
+    def _disconnect(self, quit: bool = False):
+        if self.smtp is None:
+            return
+        try:
+            if quit:
+                self.smtp.quit()
+            else:
+                self.smtp.close()
+        except Exception:
+            pass
+        self.smtp = None
+
+    @staticmethod
+    def _is_disconnect(error: Exception) -> bool:
+        """连接被断开、超时或服务端返回 421（服务关闭）时可以重连重试"""
+        import smtplib
+        if isinstance(error, (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)):
             return True
-            
-        except Exception as e:
-            self.logger.error(f"邮件发送失败: {str(e)}")
-            return False
-            
-    def format_resource_message(self, account_name, regional_resources, global_resources):
-        """格式化资源信息为HTML消息"""
-        html = f"""
-        <html>
-        <head>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                    max-width: 1200px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }}
-                h1 {{
-                    color: #1a73e8;
-                    border-bottom: 2px solid #1a73e8;
-                    padding-bottom: 10px;
-                }}
-                h2 {{
-                    color: #202124;
-                    margin-top: 30px;
-                }}
-                h3 {{
-                    color: #1a73e8;
-                    margin-top: 20px;
-                }}
-                .account {{
-                    background: #f8f9fa;
-                    border-radius: 8px;
-                    padding: 20px;
-                    margin-bottom: 30px;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }}
-                .service {{
-                    margin-bottom: 20px;
-                }}
-                .resource {{
-                    background: white;
-                    padding: 15px;
-                    margin: 10px 0;
-                    border-radius: 6px;
-                    border-left: 4px solid #1a73e8;
-                }}
-                .resource p {{
-                    margin: 5px 0;
-                }}
-                .warning {{
-                    border-left: 4px solid #f44336;
-                }}
-                .warning .days {{
-                    color: #f44336;
-                    font-weight: bold;
-                }}
-                .medium .days {{
-                    color: #fb8c00;
-                    font-weight: bold;
-                }}
-                .normal .days {{
-                    color: #1a73e8;
-                    font-weight: bold;
-                }}
-            </style>
-        </head>
-        <body>
-            <h1>📢 腾讯云资源到期提醒</h1>
-            <div class='account'>
-                <h2>账号：{account_name}</h2>
-        """
+        return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code == 421
 
-        # 处理CVM资源
-        cvm_resources = []
-        for region_data in regional_resources.values():
-            if 'CVM' in region_data:
-                cvm_resources.extend(region_data['CVM'])
-        
-        if cvm_resources:
-            html += "<div class='service'>"
-            html += "<h3>云服务器</h3>"
-            for resource in cvm_resources:
-                differ_days = resource['DifferDays']
-                if differ_days <= 15:
-                    resource_class = "warning"
-                elif differ_days <= 30:
-                    resource_class = "medium"
-                else:
-                    resource_class = "normal"
-                    
-                html += f"""
-                <div class='resource {resource_class}'>
-                    <p><strong>名称：</strong>{resource['InstanceName']}</p>
-                    <p><strong>项目：</strong>{resource.get('ProjectName', '默认项目')}</p>
-                    <p><strong>区域：</strong>{resource['Zone']}</p>
-                    <p><strong>到期时间：</strong>{resource['ExpiredTime']}</p>
-                    <p><strong>剩余天数：</strong><span class='days'>{differ_days}天</span></p>
-                </div>
-                """
-            html += "</div>"
-        
-        # 处理轻量应用服务器资源
-        lighthouse_resources = []
-        for region_data in regional_resources.values():
-            if 'Lighthouse' in region_data:
-                lighthouse_resources.extend(region_data['Lighthouse'])
-        
-        if lighthouse_resources:
-            html += "<div class='service'>"
-            html += "<h3>轻量应用服务器</h3>"
-            for resource in lighthouse_resources:
-                differ_days = resource['DifferDays']
-                if differ_days <= 15:
-                    resource_class = "warning"
-                elif differ_days <= 30:
-                    resource_class = "medium"
-                else:
-                    resource_class = "normal"
-                    
-                html += f"""
-                <div class='resource {resource_class}'>
-                    <p><strong>名称：</strong>{resource['InstanceName']}</p>
-                    <p><strong>区域：</strong>{resource['Zone']}</p>
-                    <p><strong>到期时间：</strong>{resource['ExpiredTime']}</p>
-                    <p><strong>剩余天数：</strong><span class='days'>{differ_days}天</span></p>
-                </div>
-                """
-            html += "</div>"
-        
-        # 处理CBS资源
-        cbs_resources = []
-        for region_data in regional_resources.values():
-            if 'CBS' in region_data:
-                cbs_resources.extend(region_data['CBS'])
-        
-        if cbs_resources:
-            html += "<div class='service'>"
-            html += "<h3>云硬盘</h3>"
-            for resource in cbs_resources:
-                differ_days = resource['DifferDays']
-                if differ_days <= 15:
-                    resource_class = "warning"
-                elif differ_days <= 30:
-                    resource_class = "medium"
-                else:
-                    resource_class = "normal"
-                    
-                html += f"""
-                <div class='resource {resource_class}'>
-                    <p><strong>名称：</strong>{resource['DiskName']}</p>
-                    <p><strong>项目：</strong>{resource['ProjectName']}</p>
-                    <p><strong>区域：</strong>{resource['Zone']}</p>
-                    <p><strong>到期时间：</strong>{resource['ExpiredTime']}</p>
-                    <p><strong>剩余天数：</strong><span class='days'>{differ_days}天</span></p>
-                </div>
-                """
-            html += "</div>"
+    def queue_summary(self, subject: str, all_accounts_data, receivers: List[str] = None):
+        """
+        将汇总报告加入发送队列
+        full 模式正文即完整报告；compact 模式正文只包含余额、到期概览和最先到期的资源，
+        完整报告压缩后作为附件，可选附带资源明细 CSV
+        :param receivers: 收件人，默认为配置的收件人
+        """
+        if self.report_mode != 'compact':
+            self.queue_email(subject, self.format_summary_message(all_accounts_data), receivers=receivers)
+            return
         
-        # 处理域名资源
-        domain_resources = global_resources.get('Domain', [])
-        if domain_resources:
-            html += "<div class='service'>"
-            html += "<h3>域名</h3>"
-            for resource in domain_resources:
-                differ_days = resource['DifferDays']
-                if differ_days <= 15:
-                    resource_class = "warning"
-                elif differ_days <= 30:
-                    resource_class = "medium"
-                else:
-                    resource_class = "normal"
-                    
-                html += f"""
-                <div class='resource {resource_class}'>
-                    <p><strong>名称：</strong>{resource['Domain']}</p>
-                    <p><strong>到期时间：</strong>{resource['ExpiredTime']}</p>
-                    <p><strong>剩余天数：</strong><span class='days'>{differ_days}天</span></p>
-                </div>
-                """
-            html += "</div>"
+        index = ExpiryIndex.from_accounts(all_accounts_data)
+        attachments = self.build_report_attachments(all_accounts_data, index)
+        content = self.format_compact_summary(all_accounts_data, index, [name for name, _, _ in attachments])
+        self.queue_email(subject, content, attachments, receivers)
+
+    def format_compact_summary(self, all_accounts_data, index, attachment_names: List[str]) -> str:
+        """格式化精简版汇总：余额汇总、到期概览和最先到期的资源，并注明附件"""
+        chunks = []
+        write = chunks.append
+        write(templates.HTML_HEAD)
+        templates.TITLE.render(write, title="腾讯云资源和账单汇总报告")
+        self._render_balance_summary(write, all_accounts_data)
+        self._render_expiry_overview(write, index, self.inline_top_n)
+        templates.ATTACHMENT_NOTE.render(write, total=len(index), attachments="、".join(attachment_names))
+        write(templates.HTML_FOOT)
+        return ''.join(chunks)
+
+    def build_report_attachments(self, all_accounts_data, index) -> List[Tuple[str, str, bytes]]:
+        """
+        生成完整报告附件，报告和 CSV 直接渲染到压缩流中，不在内存中保留未压缩的完整内容
+        :return: [(文件名, MIME类型, 内容)]
+        """
+        basename = self._report_basename()
+        writers = [(f"{basename}.html", 'utf-8',
+                    lambda stream: self.render_summary(stream.write, all_accounts_data, index))]
+        if self.csv_export:
+            # 带 BOM 便于 Excel 直接识别中文
+            writers.append((f"{basename}.csv", 'utf-8-sig',
+                            lambda stream: self.write_resource_csv(stream, all_accounts_data, index)))
         
-        # 处理SSL证书资源
-        ssl_resources = global_resources.get('SSL', [])
-        if ssl_resources:
-            html += "<div class='service'>"
-            html += "<h3>SSL证书</h3>"
-            for resource in ssl_resources:
-                differ_days = resource['DifferDays']
-                if differ_days <= 15:
-                    resource_class = "warning"
-                elif differ_days <= 30:
-                    resource_class = "medium"
-                else:
-                    resource_class = "normal"
-                    
-                html += f"""
-                <div class='resource {resource_class}'>
-                    <p><strong>域名：</strong>{resource['Domain']}</p>
-                    <p><strong>证书类型：</strong>{resource['ProductName']}</p>
-                    <p><strong>项目：</strong>{resource.get('ProjectName', '默认项目')}</p>
-                    <p><strong>到期时间：</strong>{resource['ExpiredTime']}</p>
-                    <p><strong>剩余天数：</strong><span class='days'>{differ_days}天</span></p>
-                </div>
-                """
-            html += "</div>"
+        if self.attachment_compression == 'zip':
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for filename, encoding, render in writers:
+                    with archive.open(filename, 'w') as raw, \
+                            io.TextIOWrapper(raw, encoding=encoding, newline='') as stream:
+                        render(stream)
+            return [(f"{basename}.zip", 'application/zip', buffer.getvalue())]
         
-        html += """
-            </div>
-        </body>
-        </html>
+        attachments = []
+        for filename, encoding, render in writers:
+            buffer = io.BytesIO()
+            if self.attachment_compression == 'gzip':
+                raw = gzip.GzipFile(filename=filename, mode='wb', fileobj=buffer)
+                filename, mime_type = f"{filename}.gz", 'application/gzip'
+            else:
+                raw = buffer
+                mime_type = 'text/html' if filename.endswith('.html') else 'text/csv'
+            stream = io.TextIOWrapper(raw, encoding=encoding, newline='')
+            render(stream)
+            # detach 会先刷新缓冲区，并且不会关闭底层的 buffer
+            stream.detach()
+            if raw is not buffer:
+                raw.close()
+            attachments.append((filename, mime_type, buffer.getvalue()))
+        return attachments
+
+    def write_resource_csv(self, stream, all_accounts_data, index):
+        """将所有账号的资源明细按账号、类型写为 CSV，各类资源按剩余天数升序"""
+        writer = csv.writer(stream)
+        writer.writerow(['账号', '资源类型', '名称', '项目', '区域', '到期时间', '剩余天数'])
+        for account_data in all_accounts_data:
+            account_name = account_data['account_name']
+            for service_type, config in self.RESOURCE_TYPES.items():
+                name_key = config['key']
+                writer.writerows(
+                    (account_name, config['name'], resource.get(name_key), resource.get('ProjectName'),
+                     resource.get('Zone'), resource['ExpiredTime'], resource['DifferDays'])
+                    for resource in index.within(account_name=account_name, service_type=service_type)
+                )
+
+    @staticmethod
+    def _report_basename() -> str:
+        return f"腾讯云资源报告-{datetime.now().strftime('%Y%m%d')}"
+
+    @staticmethod
+    def _base64_part(maintype: str, subtype: str, payload: str, **params) -> MIMENonMultipart:
+        """使用已编码的 base64 数据创建邮件部分"""
+        part = MIMENonMultipart(maintype, subtype, **params)
+        part.set_payload(payload)
+        part['Content-Transfer-Encoding'] = 'base64'
+        return part
+            
+    def format_resource_message(self, account_name, regional_resources, global_resources, index=None):
         """
-        
-        return html 
+        格式化资源信息为HTML消息，各类资源按剩余天数升序排列
+        :param index: 已建立的到期索引，不传时按传入的资源建立
+        """
+        if index is None:
+            index = ExpiryIndex.from_resources(account_name, regional_resources, global_resources)
+        chunks = []
+        write = chunks.append
+        write(templates.HTML_HEAD)
+        templates.TITLE.render(write, title="腾讯云资源到期提醒")
+        templates.ACCOUNT_START.render(write, account_name=account_name)
+        self._render_resources(write, index, account_name)
+        write(templates.DIV_END)
+        write(templates.HTML_FOOT)
+        return ''.join(chunks)
 
     def format_summary_message(self, all_accounts_data):
         """格式化所有账号的资源和账单信息为HTML消息"""
-        html = self._get_html_header()
-        html += self._format_balance_summary(all_accounts_data)
+        chunks = []
+        self.render_summary(chunks.append, all_accounts_data)
+        return ''.join(chunks)
+
+    def render_summary(self, write, all_accounts_data, index=None):
+        """
+        渲染汇总报告，按片段依次写入 write
+        :param write: 输出函数，如 list.append 或文本文件的 write
+        :param index: 已建立的到期索引，不传时按所有账号的数据建立
+        """
+        # 所有账号共用一个到期索引，各账号的资源列表都从索引查询
+        if index is None:
+            index = ExpiryIndex.from_accounts(all_accounts_data)
+        
+        write(templates.HTML_HEAD)
+        templates.TITLE.render(write, title="腾讯云资源和账单汇总报告")
+        self._render_balance_summary(write, all_accounts_data)
         
         for account_data in all_accounts_data:
-            html += self._format_account_info(account_data)
+            self._render_account_info(write, account_data, index)
         
-        html += "</body></html>"
-        return html
-
-    def _get_html_header(self):
-        """生成HTML头部和样式"""
-        return """
-<html>
-<head>
-    <meta charset="utf-8">
-    <style>
-        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 1200px; margin: 0 auto; padding: 20px; }
-        h1 { color: #1a73e8; border-bottom: 2px solid #1a73e8; padding-bottom: 10px; }
-        h2 { color: #202124; margin-top: 30px; }
-        h3 { color: #1a73e8; margin-top: 20px; }
-        .account { background: #f8f9fa; border-radius: 8px; padding: 20px; margin-bottom: 30px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
-        .service { margin-bottom: 20px; }
-        .resource { background: white; padding: 15px; margin: 10px 0; border-radius: 6px; border-left: 4px solid #1a73e8; }
-        .resource p { margin: 5px 0; }
-        .warning { border-left: 4px solid #f44336; }
-        .warning .days { color: #f44336; font-weight: bold; }
-        .medium .days { color: #fb8c00; font-weight: bold; }
-        .normal .days { color: #1a73e8; font-weight: bold; }
-        .billing-info { background: #e8f0fe; padding: 15px; border-radius: 6px; margin: 20px 0; }
-        .billing-info h3 { margin-top: 0; color: #1a73e8; }
-        .balance { font-size: 1.2em; color: #1a73e8; font-weight: bold; }
-        .bill-item { background: white; padding: 10px 15px; margin: 5px 0; border-radius: 4px; }
-    </style>
-</head>
-<body>
-    <h1>📢 腾讯云资源和账单汇总报告</h1>
-"""
+        write(templates.HTML_FOOT)
 
-    def _format_balance_summary(self, all_accounts_data):
-        """格式化余额汇总信息"""
-        html = "<div class='billing-info'><h3>账户余额汇总</h3>"
+    def _render_balance_summary(self, write, all_accounts_data):
+        """渲染余额汇总信息"""
+        write(templates.BALANCE_SUMMARY_START)
         for account_data in all_accounts_data:
-            account_name = account_data['account_name']
             billing_info = account_data.get('billing')
             if billing_info:
-                html += f"<p><strong>账号：{account_name}</strong> - <span class='balance'>{billing_info['balance']} 元</span></p>"
-        html += "</div>"
-        return html
+                templates.BALANCE_LINE.render(
+                    write, account_name=account_data['account_name'], balance=billing_info['balance']
+                )
+        write(templates.DIV_END)
 
-    def _format_account_info(self, account_data):
-        """格式化单个账号的信息"""
+    def _render_account_info(self, write, account_data, index):
+        """渲染单个账号的信息"""
         account_name = account_data['account_name']
-        resources = account_data['resources']
-        regional_resources = resources.get('regional', {})
-        global_resources = resources.get('global', {})
-        
-        html = f"<div class='account'><h2>账号：{account_name}</h2>"
+        templates.ACCOUNT_START.render(write, account_name=account_name)
         
         if account_data.get('billing'):
-            html += self._format_billing_info(account_data['billing'])
+            self._render_billing_info(write, account_data['billing'])
         
-        html += self._format_resources(regional_resources, global_resources)
-        html += "</div>"
-        return html
+        self._render_resources(write, index, account_name)
+        write(templates.DIV_END)
 
-    def _format_billing_info(self, billing_info):
-        """格式化账单信息"""
-        html = "<div class='service'><h3>本月账单</h3>"
+    def _render_billing_info(self, write, billing_info):
+        """渲染账单信息"""
+        write(templates.BILLING_START)
         for project_name, details in billing_info['bill_details'].items():
-            html += "<div class='bill-item'>"
-            html += f"<p><strong>项目：{project_name}</strong></p>"
+            templates.BILLING_PROJECT.render(write, project_name=project_name)
             for service_name, costs in details['services'].items():
-                html += f"<p>{service_name}: {costs['RealTotalCost']}元</p>"
-            html += "</div>"
-        html += "</div>"
-        return html
+                templates.BILLING_SERVICE.render(write, service_name=service_name, cost=costs['RealTotalCost'])
+            write(templates.DIV_END)
+        write(templates.DIV_END)
 
-    def _format_resources(self, regional_resources, global_resources):
-        """格式化资源信息"""
-        html = ""
-        
-        # 处理区域资源
-        resource_types = {
-            'CVM': {'name': '云服务器', 'key': 'InstanceName'},
-            'Lighthouse': {'name': '轻量应用服务器', 'key': 'InstanceName'},
-            'CBS': {'name': '云硬盘', 'key': 'DiskName'}
-        }
+    # 资源类型的显示名称和名称字段，顺序即邮件中的显示顺序
+    RESOURCE_TYPES = {
+        'CVM': {'name': '云服务器', 'key': 'InstanceName'},
+        'Lighthouse': {'name': '轻量应用服务器', 'key': 'InstanceName'},
+        'CBS': {'name': '云硬盘', 'key': 'DiskName'},
+        'Domain': {'name': '域名', 'key': 'Domain'},
+        'SSL': {'name': 'SSL证书', 'key': 'Domain'}
+    }
+
+    def _render_expiry_overview(self, write, index, top_k):
+        """
+        渲染所有账号的到期概览：各类资源的到期数量、按项目统计和最先到期的资源，只用于精简版正文
+        :param top_k: 列出的最先到期资源数量
+        """
+        if not len(index):
+            return
         
-        for service_type, config in resource_types.items():
-            resources = []
-            for region_data in regional_resources.values():
-                if service_type in region_data:
-                    resources.extend(region_data[service_type])
-            
-            # 只有在有资源时才添加这个区块
-            if resources:
-                html += self._format_resource_section(
-                    config['name'], 
-                    resources, 
-                    config['key']
+        write(templates.OVERVIEW_START)
+        for service_type, config in self.RESOURCE_TYPES.items():
+            total = index.count(service_type=service_type)
+            if total:
+                templates.OVERVIEW_TYPE_LINE.render(
+                    write, name=config['name'], total=total,
+                    within_15=index.count(15, service_type=service_type),
+                    within_30=index.count(30, service_type=service_type)
                 )
         
-        # 处理全局资源
-        if 'Domain' in global_resources and global_resources['Domain']:  # 只在有域名时显示
-            html += self._format_resource_section(
-                '域名',
-                global_resources['Domain'],
-                'Domain'
-            )
-        
-        if 'SSL' in global_resources and global_resources['SSL']:  # 只在有SSL证书时显示
-            html += self._format_ssl_section(global_resources['SSL'])
+        project_counts = index.project_counts(30)
+        if project_counts:
+            templates.OVERVIEW_PROJECTS.render(write, projects="，".join(
+                f"{project} {count} 个" for project, count in project_counts.items()
+            ))
         
-        return html
+        templates.OVERVIEW_TOP_TITLE.render(write, count=top_k)
+        for resource in index.soonest(top_k):
+            config = self.RESOURCE_TYPES.get(resource['Type'], {'name': resource['Type'], 'key': 'Domain'})
+            templates.OVERVIEW_TOP_ITEM.render(
+                write, name=config['name'], resource_name=resource.get(config['key'], ''),
+                expired_time=resource['ExpiredTime'], differ_days=resource['DifferDays']
+            )
+        write(templates.DIV_END)
 
-    def _format_resource_section(self, title, resources, name_key):
-        """格式化资源区块"""
-        html = f"<div class='service'><h3>{title}</h3>"
+    def _render_resources(self, write, index, account_name):
+        """渲染账号的资源信息，各类资源按剩余天数升序排列"""
+        for service_type, config in self.RESOURCE_TYPES.items():
+            resources = index.within(account_name=account_name, service_type=service_type)
+            # 只有在有资源时才添加这个区块
+            if not resources:
+                continue
+            if service_type == 'SSL':
+                self._render_ssl_section(write, resources)
+            else:
+                self._render_resource_section(write, config['name'], resources, config['key'])
+
+    def _render_resource_section(self, write, title, resources, name_key):
+        """渲染资源区块"""
+        items = templates.RESOURCE_ITEMS
+        templates.SECTION_START.render(write, title=title)
         for resource in resources:
             differ_days = resource['DifferDays']
-            resource_class = self._get_resource_class(differ_days)
-            
-            html += f"<div class='resource {resource_class}'>"
-            html += f"<p><strong>名称：</strong>{resource[name_key]}</p>"
-            
-            if 'ProjectName' in resource:
-                html += f"<p><strong>项目：</strong>{resource['ProjectName']}</p>"
-            if 'Zone' in resource:
-                html += f"<p><strong>区域：</strong>{resource['Zone']}</p>"
-                
-            html += f"<p><strong>到期时间：</strong>{resource['ExpiredTime']}</p>"
-            html += f"<p><strong>剩余天数：</strong><span class='days'>{differ_days}天</span></p>"
-            html += "</div>"
-        html += "</div>"
-        return html
+            item = items['ProjectName' in resource, 'Zone' in resource]
+            write(item.format(
+                resource_class=self._get_resource_class(differ_days), name=resource[name_key],
+                project=resource.get('ProjectName'), zone=resource.get('Zone'),
+                expired_time=resource['ExpiredTime'], differ_days=differ_days
+            ))
+        write(templates.DIV_END)
 
-    def _format_ssl_section(self, ssl_resources):
-        """格式化SSL证书区块"""
-        html = "<div class='service'><h3>SSL证书</h3>"
+    def _render_ssl_section(self, write, ssl_resources):
+        """渲染SSL证书区块"""
+        item = templates.SSL_ITEM.format
+        templates.SECTION_START.render(write, title="SSL证书")
         for resource in ssl_resources:
             differ_days = resource['DifferDays']
-            resource_class = self._get_resource_class(differ_days)
-            
-            html += f"<div class='resource {resource_class}'>"
-            html += f"<p><strong>域名：</strong>{resource['Domain']}</p>"
-            html += f"<p><strong>证书类型：</strong>{resource['ProductName']}</p>"
-            html += f"<p><strong>项目：</strong>{resource.get('ProjectName', '默认项目')}</p>"
-            html += f"<p><strong>到期时间：</strong>{resource['ExpiredTime']}</p>"
-            html += f"<p><strong>剩余天数：</strong><span class='days'>{differ_days}天</span></p>"
-            html += "</div>"
-        html += "</div>"
-        return html
+            write(item(
+                resource_class=self._get_resource_class(differ_days), domain=resource['Domain'],
+                product_name=resource['ProductName'], project=resource.get('ProjectName', '默认项目'),
+                expired_time=resource['ExpiredTime'], differ_days=differ_days
+            ))
+        write(templates.DIV_END)
 
     def _get_resource_class(self, differ_days):
         """根据剩余天数获取样式类名"""
@@ -440,4 +441,4 @@ class EmailService:
             return "warning"
         elif differ_days <= 30:
             return "medium"
-        return "normal" 
\ No newline at end of file
+        return "normal"
@@ -0,0 +1,138 @@
+import re
+from html import escape
+from string import Formatter
+from typing import Callable, List
+
+class Markup(str):
+    """可信的 HTML 片段，渲染时不再转义"""
+
+
+# 需要转义的字符，大部分字段值不含这些字符，可以跳过转义
+_needs_escape = re.compile('[&<>"\']').search
+
+def escape_value(value) -> str:
+    """转义字段值，Markup 原样输出"""
+    value_type = type(value)
+    if value_type is str:
+        return escape(value) if _needs_escape(value) else value
+    if value_type is Markup:
+        return value
+    if value_type is int:
+        return str(value)
+    text = str(value)
+    return escape(text) if _needs_escape(text) else text
+
+
+class HtmlTemplate:
+    """
+    预编译的 HTML 模板
+    创建时将 "{字段}" 占位符解析并编译为一个拼接函数，渲染时只做一次字符串拼接，
+    字段值统一做 HTML 转义（Markup 除外）
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.fields: List[str] = []
+        constants = {'_escape': escape_value}
+        expression = []
+        for literal, field, _, _ in Formatter().parse(source):
+            if literal:
+                name = f"_l{len(constants)}"
+                constants[name] = literal
+                expression.append(name)
+            if field is not None:
+                if not field.isidentifier():
+                    raise ValueError(f"模板字段名无效: {field!r}")
+                if field not in self.fields:
+                    self.fields.append(field)
+                expression.append(f"_escape({field})")
+        # 多余的字段直接忽略，便于同一组参数渲染字段不同的模板
+        code = (f"def _format(*, {''.join(field + ', ' for field in self.fields)}**_unused):\n"
+                f"    return {' + '.join(expression) or repr('')}\n")
+        exec(code, constants)
+        self.format: Callable[..., str] = constants['_format']
+
+    def render(self, write: Callable[[str], object], **values):
+        """
+        渲染模板
+        :param write: 输出函数，如 list.append、io.StringIO.write 或文本文件的 write
+        """
+        write(self.format(**values))
+
+
+# 样式中的大括号较多，页头不作为模板解析
+HTML_HEAD = Markup("""
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 1200px; margin: 0 auto; padding: 20px; }
+        h1 { color: #1a73e8; border-bottom: 2px solid #1a73e8; padding-bottom: 10px; }
+        h2 { color: #202124; margin-top: 30px; }
+        h3 { color: #1a73e8; margin-top: 20px; }
+        .account { background: #f8f9fa; border-radius: 8px; padding: 20px; margin-bottom: 30px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .service { margin-bottom: 20px; }
+        .resource { background: white; padding: 15px; margin: 10px 0; border-radius: 6px; border-left: 4px solid #1a73e8; }
+        .resource p { margin: 5px 0; }
+        .warning { border-left: 4px solid #f44336; }
+        .warning .days { color: #f44336; font-weight: bold; }
+        .medium .days { color: #fb8c00; font-weight: bold; }
+        .normal .days { color: #1a73e8; font-weight: bold; }
+        .billing-info { background: #e8f0fe; padding: 15px; border-radius: 6px; margin: 20px 0; }
+        .billing-info h3 { margin-top: 0; color: #1a73e8; }
+        .balance { font-size: 1.2em; color: #1a73e8; font-weight: bold; }
+        .bill-item { background: white; padding: 10px 15px; margin: 5px 0; border-radius: 4px; }
+    </style>
+</head>
+<body>
+""")
+HTML_FOOT = Markup("</body></html>")
+
+TITLE = HtmlTemplate("    <h1>📢 {title}</h1>\n")
+
+BALANCE_SUMMARY_START = Markup("<div class='billing-info'><h3>账户余额汇总</h3>")
+BALANCE_LINE = HtmlTemplate(
+    "<p><strong>账号：{account_name}</strong> - <span class='balance'>{balance} 元</span></p>"
+)
+
+OVERVIEW_START = Markup("<div class='billing-info'><h3>到期概览</h3>")
+OVERVIEW_TYPE_LINE = HtmlTemplate(
+    "<p><strong>{name}</strong>：共 {total} 个，15天内到期 {within_15} 个，30天内到期 {within_30} 个</p>"
+)
+OVERVIEW_PROJECTS = HtmlTemplate("<p><strong>30天内到期（按项目）</strong>：{projects}</p>")
+OVERVIEW_TOP_TITLE = HtmlTemplate("<p><strong>最先到期的 {count} 个资源</strong></p>")
+OVERVIEW_TOP_ITEM = HtmlTemplate(
+    "<div class='bill-item'>{name} - {resource_name}：{expired_time}（剩余 {differ_days} 天）</div>"
+)
+
+ATTACHMENT_NOTE = HtmlTemplate(
+    "<div class='billing-info'><p>共 {total} 个资源，各账号的账单和资源明细见附件：{attachments}</p></div>"
+)
+
+ACCOUNT_START = HtmlTemplate("<div class='account'><h2>账号：{account_name}</h2>")
+
+BILLING_START = Markup("<div class='service'><h3>本月账单</h3>")
+BILLING_PROJECT = HtmlTemplate("<div class='bill-item'><p><strong>项目：{project_name}</strong></p>")
+BILLING_SERVICE = HtmlTemplate("<p>{service_name}: {cost}元</p>")
+
+SECTION_START = HtmlTemplate("<div class='service'><h3>{title}</h3>")
+_RESOURCE_HEAD = "<div class='resource {resource_class}'><p><strong>名称：</strong>{name}</p>"
+_PROJECT_LINE = "<p><strong>项目：</strong>{project}</p>"
+_ZONE_LINE = "<p><strong>区域：</strong>{zone}</p>"
+_RESOURCE_TAIL = (
+    "<p><strong>到期时间：</strong>{expired_time}</p>"
+    "<p><strong>剩余天数：</strong><span class='days'>{differ_days}天</span></p></div>"
+)
+# 按资源是否包含项目、区域字段预编译四种模板，键为 (有项目, 有区域)
+RESOURCE_ITEMS = {
+    (has_project, has_zone): HtmlTemplate(
+        _RESOURCE_HEAD + (_PROJECT_LINE if has_project else "") + (_ZONE_LINE if has_zone else "") + _RESOURCE_TAIL
+    )
+    for has_project in (False, True) for has_zone in (False, True)
+}
+SSL_ITEM = HtmlTemplate(
+    "<div class='resource {resource_class}'><p><strong>域名：</strong>{domain}</p>"
+    "<p><strong>证书类型：</strong>{product_name}</p>" + _PROJECT_LINE + _RESOURCE_TAIL
+)
+
+DIV_END = Markup("</div>")
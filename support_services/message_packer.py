@@ -0,0 +1,277 @@
+import logging
+import threading
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from .webhook_dispatcher import WebhookDispatcher
+from utils.rate_limiter import SlidingWindowLimiter
+from utils.metrics import METRICS
+
+# 单条消息大小上限的最小值，小于该值时放不下账号标题、分组标题和一条资源
+MIN_MESSAGE_BYTES = 512
+# 拆分时每条消息除标题和分组标题外至少为资源保留的字节数
+MIN_ITEM_BYTES = 64
+
+def byte_length(text: str) -> int:
+    """消息的 UTF-8 字节数，平台的消息长度限制按字节计算"""
+    return len(text.encode('utf-8'))
+
+def truncate_bytes(text: str, max_bytes: int) -> str:
+    """按字节截断，不截断多字节字符"""
+    if max_bytes <= 0:
+        return ''
+    return text.encode('utf-8')[:max_bytes].decode('utf-8', 'ignore')
+
+
+class WebhookMessage:
+    """
+    分块的通知消息
+    由标题和若干分组组成，每个分组包含分组标题和多条资源，各部分之间用 joiner 连接；
+    拆分时只在资源之间断开，续发的消息重复消息标题和分组标题
+    """
+
+    def __init__(self, header: str, joiner: str = '\n'):
+        self.header = header
+        self.joiner = joiner
+        self.sections: List[Tuple[str, List[str]]] = []
+
+    @classmethod
+    def from_text(cls, text: str) -> 'WebhookMessage':
+        """将普通文本视为没有标题的消息，超长时按行拆分"""
+        message = cls('')
+        message.add_section('', text.split('\n'))
+        return message
+
+    def add_section(self, title: str, items: List[str]):
+        """添加分组，没有资源的分组不输出"""
+        if items:
+            self.sections.append((title, list(items)))
+
+    def map(self, func: Callable[[str], str]) -> 'WebhookMessage':
+        """对标题、分组标题和每条资源分别做转换，返回新消息"""
+        message = WebhookMessage(func(self.header), self.joiner)
+        for title, items in self.sections:
+            message.sections.append((func(title), [func(item) for item in items]))
+        return message
+
+    def parts(self) -> List[str]:
+        parts = [self.header] if self.header else []
+        for title, items in self.sections:
+            if title:
+                parts.append(title)
+            parts.extend(items)
+        return parts
+
+    def render(self) -> str:
+        return self.joiner.join(self.parts())
+
+    def __bool__(self) -> bool:
+        return bool(self.header or self.sections)
+
+    def __str__(self) -> str:
+        return self.render()
+
+
+class MessagePacker:
+    """
+    Webhook 消息打包器
+    超过平台大小上限的消息在资源之间拆分为多条，多条较小的消息按顺序合并为一次发送，
+    在不丢失内容的前提下尽量减少请求次数
+    """
+
+    def __init__(self, max_bytes: int, separator: str = '\n\n'):
+        """
+        :param max_bytes: 单次发送的最大字节数，不能小于 MIN_MESSAGE_BYTES
+        :param separator: 合并多条消息时的分隔符
+        """
+        if max_bytes < MIN_MESSAGE_BYTES:
+            raise ValueError(f"消息大小上限不能小于 {MIN_MESSAGE_BYTES} 字节，当前为 {max_bytes}")
+        self.max_bytes = max_bytes
+        self.separator = separator
+
+    def pack(self, messages: Iterable[Union[str, WebhookMessage]]) -> List[str]:
+        """
+        拆分并合并消息，保持原有顺序
+        :param messages: 字符串或 WebhookMessage，字符串超长时按行拆分
+        :return: 每次发送的消息内容
+        """
+        separator_size = byte_length(self.separator)
+        chunks, sizes = [], []
+        for message in messages:
+            for piece in self.split(message):
+                size = byte_length(piece)
+                if chunks and sizes[-1] + separator_size + size <= self.max_bytes:
+                    chunks[-1] += self.separator + piece
+                    sizes[-1] += separator_size + size
+                else:
+                    chunks.append(piece)
+                    sizes.append(size)
+        return chunks
+
+    def split(self, message: Union[str, WebhookMessage]) -> List[str]:
+        """
+        将单条消息拆分为不超过大小上限的多条
+        :raises ValueError: 标题和分组标题之外放不下 MIN_ITEM_BYTES 字节的资源
+        """
+        text = str(message)
+        if not text or byte_length(text) <= self.max_bytes:
+            return [text] if text else []
+        if isinstance(message, str):
+            message = WebhookMessage.from_text(message)
+
+        joiner_size = byte_length(message.joiner)
+        header_size = byte_length(message.header)
+        # 续发的消息重复标题和分组标题，放不下至少一条资源时无法拆分
+        for title, _ in message.sections:
+            fixed_size = header_size + byte_length(title) + joiner_size * (bool(message.header) + bool(title))
+            if fixed_size + MIN_ITEM_BYTES > self.max_bytes:
+                raise ValueError(
+                    f"消息大小上限 {self.max_bytes} 字节放不下标题、分组标题和一条资源，"
+                    f"至少需要 {fixed_size + MIN_ITEM_BYTES} 字节"
+                )
+        chunks = []
+        current, size = [], 0
+
+        def append(part: str, part_size: int):
+            nonlocal size
+            size += part_size + (joiner_size if current else 0)
+            current.append(part)
+
+        def start():
+            nonlocal current, size
+            current, size = [], 0
+            if message.header:
+                append(message.header, header_size)
+
+        start()
+        for title, items in message.sections:
+            title_size = byte_length(title)
+            title_written = False
+            for item in items:
+                item_size = byte_length(item)
+                extra = item_size + joiner_size
+                if not title_written and title:
+                    extra += title_size + joiner_size
+                # 当前消息已有资源且放不下时，另起一条，重复标题和分组标题
+                if size + extra > self.max_bytes and len(current) > (1 if message.header else 0):
+                    chunks.append(message.joiner.join(current))
+                    start()
+                    title_written = False
+                if not title_written and title:
+                    append(title, title_size)
+                    title_written = True
+                # 单条资源本身超过上限时截断，保证消息能够发出
+                room = self.max_bytes - size - (joiner_size if current else 0)
+                if item_size > room:
+                    item = truncate_bytes(item, room)
+                    item_size = byte_length(item)
+                append(item, item_size)
+        if len(current) > (1 if message.header else 0):
+            chunks.append(message.joiner.join(current))
+        return chunks
+
+
+class MessageOutbox:
+    """
+    Webhook 发件箱
+    按目标机器人分组暂存消息，在 flush 时合并发送；
+    每个机器人按平台的频率限制发送，同一机器人的多条消息按顺序发出。
+    暂存时不发送，频率限制的等待只发生在 flush 中，不会阻塞采集结果的处理
+    """
+
+    def __init__(self, bots: Dict[str, Dict], post: Callable[[str, Dict, str], bool],
+                 dispatcher: WebhookDispatcher, max_bytes: int, rate_limit: float = 20,
+                 channel: str = 'webhook'):
+        """
+        :param bots: 机器人配置字典，格式为 {bot_name: {"webhook_url": url}}
+        :param post: 发送单条消息的函数，参数为 (机器人名称, 机器人配置, 消息内容)
+        :param dispatcher: Webhook 发送器，多个机器人同时发送
+        :param max_bytes: 单条消息的最大字节数
+        :param rate_limit: 每个机器人每分钟最多发送的消息数
+        :param channel: 通知渠道名称，用于指标标签，如 wechat、yunzhijia
+        """
+        self.bots = bots
+        self.channel = channel
+        self.post = post
+        self.dispatcher = dispatcher
+        self.packer = MessagePacker(max_bytes)
+        self.rate_limit = max(1, int(rate_limit))
+        self.limiters: Dict[str, SlidingWindowLimiter] = {}
+        self.pending: Dict[Optional[Tuple[str, ...]], List[Union[str, WebhookMessage]]] = {}
+        self.stats = {'messages': 0, 'posts': 0}
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger('TencentCloudMonitor')
+
+    def send(self, message: Union[str, WebhookMessage], bot_names: Optional[List[str]] = None) -> Dict[str, bool]:
+        """立即发送一条消息，超长时拆分为多条"""
+        self.stats['messages'] += 1
+        return self._send(self.packer.pack([message]), bot_names)
+
+    def add(self, message: Union[str, WebhookMessage], bot_names: Optional[List[str]] = None):
+        """暂存一条消息，与同一目标的其他消息合并发送"""
+        key = tuple(bot_names) if bot_names is not None else None
+        self.stats['messages'] += 1
+        self.pending.setdefault(key, []).append(message)
+
+    def flush(self) -> Dict[str, bool]:
+        """
+        发送所有暂存的消息
+        :return: 每个机器人的发送结果，所有消息都成功才为 True
+        """
+        results = {}
+        for key, messages in self.pending.items():
+            bot_names = list(key) if key is not None else None
+            try:
+                chunks = self.packer.pack(messages)
+            except ValueError as e:
+                # 无法拆分的消息不发送，目标机器人按发送失败处理
+                self.logger.error(f"{self.channel} 消息拆分失败: {str(e)}")
+                for bot_name in self._target_bots(bot_names):
+                    results[bot_name] = False
+                continue
+            for bot_name, success in self._send(chunks, bot_names).items():
+                results[bot_name] = results.get(bot_name, True) and success
+        self.pending.clear()
+        return results
+
+    def reset_stats(self) -> Dict[str, int]:
+        """返回并清零消息数和实际发送次数"""
+        stats = dict(self.stats)
+        self.stats = {'messages': 0, 'posts': 0}
+        return stats
+
+    def _target_bots(self, bot_names: Optional[List[str]]) -> Dict[str, Dict]:
+        if bot_names is None:
+            return self.bots
+        return {name: self.bots[name] for name in bot_names if name in self.bots}
+
+    def _send(self, chunks: List[str], bot_names: Optional[List[str]]) -> Dict[str, bool]:
+        target_bots = self._target_bots(bot_names)
+        if not chunks:
+            return {bot_name: True for bot_name in target_bots}
+        return self.dispatcher.run({
+            bot_name: partial(self._send_to_bot, bot_name, bot_config, chunks)
+            for bot_name, bot_config in target_bots.items()
+        })
+
+    def _send_to_bot(self, bot_name: str, bot_config: Dict, chunks: List[str]) -> bool:
+        """按顺序发送到单个机器人，某条失败时继续发送其余消息"""
+        limiter = self._limiter(bot_name)
+        success = True
+        for chunk in chunks:
+            limiter.acquire()
+            with METRICS.span('notify.post', channel=self.channel, bot=bot_name) as span:
+                posted = self.post(bot_name, bot_config, chunk)
+                if not posted:
+                    span.fail()
+            success = posted and success
+            with self.lock:
+                self.stats['posts'] += 1
+        return success
+
+    def _limiter(self, bot_name: str) -> SlidingWindowLimiter:
+        with self.lock:
+            limiter = self.limiters.get(bot_name)
+            if limiter is None:
+                # 按 60 秒滑动窗口计数，任意一分钟内不超过 rate_limit 条
+                limiter = self.limiters[bot_name] = SlidingWindowLimiter(self.rate_limit, 60)
+            return limiter
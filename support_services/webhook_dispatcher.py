@@ -0,0 +1,108 @@
+import time
+import random
+import logging
+import threading
+import requests
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Callable, Dict
+
+class WebhookDispatcher:
+    """
+    Webhook 并发发送器
+    同一主机复用一个保持长连接的 Session，多个机器人的请求同时发出，
+    连接失败或服务端限流时按带抖动的指数退避重试
+    """
+    # 可以安全重试的状态码：限流和网关错误
+    RETRY_STATUS = (429, 502, 503, 504)
+
+    def __init__(self, connect_timeout: float = 3, read_timeout: float = 10,
+                 max_retries: int = 2, retry_backoff: float = 0.5, max_workers: int = 8):
+        """
+        :param connect_timeout: 建立连接超时秒数
+        :param read_timeout: 等待响应超时秒数
+        :param max_retries: 失败后的最大重试次数
+        :param retry_backoff: 首次重试前的等待秒数，之后每次翻倍
+        :param max_workers: 同时发送的最大请求数
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.max_workers = max(1, max_workers)
+        self.logger = logging.getLogger('TencentCloudMonitor')
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        发送 POST 请求，连接失败或返回可重试状态码时重试
+        读超时不重试，避免服务端已处理的消息被重复发送
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        session = self._session(url)
+        attempt = 0
+        while True:
+            try:
+                response = session.post(url, **kwargs)
+                if response.status_code not in self.RETRY_STATUS or attempt >= self.max_retries:
+                    return response
+                reason = f"HTTP {response.status_code}"
+            except requests.ConnectionError as e:
+                if attempt >= self.max_retries:
+                    raise
+                reason = str(e)
+
+            delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            attempt += 1
+            self.logger.warning(f"Webhook 请求失败，{delay:.2f}s 后第 {attempt} 次重试: {reason}")
+            time.sleep(delay)
+
+    def run(self, calls: Dict[str, Callable[[], bool]]) -> Dict[str, bool]:
+        """
+        并发执行各机器人的发送函数
+        :param calls: {机器人名称: 无参发送函数}
+        :return: {机器人名称: 是否成功}，顺序与传入一致
+        """
+        if len(calls) <= 1:
+            return {name: call() for name, call in calls.items()}
+
+        futures = {name: self._executor().submit(call) for name, call in calls.items()}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                self.logger.error(f"发送消息失败 - 机器人[{name}]: {str(e)}")
+                results[name] = False
+        return results
+
+    def close(self):
+        """关闭线程池和所有连接"""
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='webhook')
+            return self.executor
+
+    def _session(self, url: str) -> requests.Session:
+        """获取主机对应的 Session，同一主机的请求复用长连接"""
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount(host, adapter)
+                self.sessions[host] = session
+            return session
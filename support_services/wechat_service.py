@@ -1,7 +1,10 @@
-import requests
 import logging
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Union
 from datetime import datetime
+from .webhook_dispatcher import WebhookDispatcher
+from .message_packer import MessageOutbox, WebhookMessage
+from utils.expiry_index import ExpiryIndex
+from utils.alert_utils import expiry_level
 
 # 配置日志
 logging.basicConfig(
@@ -13,165 +16,158 @@ logger = logging.getLogger(__name__)
 class WeChatService:
     """企业微信服务类"""
     
-    def __init__(self, bots_config: Dict[str, Dict]):
+    def __init__(self, bots_config: Dict[str, Dict], dispatcher: Optional[WebhookDispatcher] = None,
+                 max_bytes: int = 4096, rate_limit: float = 20):
         """
         初始化企业微信服务
         :param bots_config: 机器人配置字典，格式为 {bot_name: {"webhook_url": url}}
+        :param dispatcher: Webhook 发送器，不传时使用默认配置
+        :param max_bytes: 单条 markdown 消息的最大字节数，企业微信限制为 4096
+        :param rate_limit: 每个机器人每分钟最多发送的消息数，企业微信限制为 20
         """
         self.bots = bots_config
+        self.dispatcher = dispatcher or WebhookDispatcher()
         self.logger = logging.getLogger('TencentCloudMonitor')
+        self.outbox = MessageOutbox(self.bots, self._send_to_bot, self.dispatcher, max_bytes, rate_limit,
+                                    channel='wechat')
         
-    def send_message(self, message: str, bot_names: Optional[List[str]] = None) -> Dict[str, bool]:
-        """发送企业微信消息"""
-        results = {}
-        target_bots = self.bots if bot_names is None else {
-            name: self.bots[name] for name in bot_names if name in self.bots
-        }
-        
-        for bot_name, bot_config in target_bots.items():
-            try:
-                data = {
-                    "msgtype": "markdown",
-                    "markdown": {"content": message}
-                }
-                response = requests.post(
-                    url=bot_config["webhook_url"],
-                    json=data,
-                    timeout=5
-                )
-                response.raise_for_status()
-                self.logger.info(f"消息发送成功 - 机器人[{bot_name}]")
-                results[bot_name] = True
-            except Exception as e:
-                self.logger.error(f"发送消息失败 - 机器人[{bot_name}]: {str(e)}")
-                results[bot_name] = False
-                
+    def send_message(self, message: Union[str, WebhookMessage], bot_names: Optional[List[str]] = None) -> Dict[str, bool]:
+        """发送企业微信消息，超长时拆分为多条，多个机器人同时发送"""
+        return self.outbox.send(message, bot_names)
+
+    def queue_message(self, message: Union[str, WebhookMessage], bot_names: Optional[List[str]] = None):
+        """暂存消息，调用 flush 时与其他消息合并发送"""
+        self.outbox.add(message, bot_names)
+
+    def flush(self) -> Dict[str, bool]:
+        """发送所有暂存的消息，返回每个机器人的发送结果"""
+        results = self.outbox.flush()
+        stats = self.outbox.reset_stats()
+        if stats['messages']:
+            self.logger.info(f"企业微信通知: {stats['messages']} 条消息，共发送 {stats['posts']} 次")
         return results
+
+    def _send_to_bot(self, bot_name: str, bot_config: Dict, content: str) -> bool:
+        """发送消息到单个机器人"""
+        data = {
+            "msgtype": "markdown",
+            "markdown": {"content": content}
+        }
+        try:
+            response = self.dispatcher.post(bot_config["webhook_url"], json=data)
+            response.raise_for_status()
+            # 消息超长、超过频率限制等错误也返回 HTTP 200，需要检查 errcode
+            result = response.json()
+            if result.get('errcode', 0) != 0:
+                self.logger.error(f"发送消息失败 - 机器人[{bot_name}]: {result.get('errcode')} {result.get('errmsg')}")
+                return False
+            self.logger.info(f"消息发送成功 - 机器人[{bot_name}]")
+            return True
+        except Exception as e:
+            self.logger.error(f"发送消息失败 - 机器人[{bot_name}]: {str(e)}")
+            return False
             
-    def format_resource_message(self, account_name, regional_resources, global_resources):
-        """格式化资源信息为markdown消息"""
-        messages = [
+    def format_resource_message(self, account_name, regional_resources, global_resources, index=None):
+        """
+        格式化资源信息为markdown消息，各类资源按剩余天数升序排列
+        :param index: 已建立的到期索引，不传时按传入的资源建立
+        """
+        return self.build_resource_message(account_name, regional_resources, global_resources, index).render()
+
+    def build_resource_message(self, account_name, regional_resources, global_resources,
+                               index=None) -> WebhookMessage:
+        """
+        构建分块的资源消息，每条资源为一块，超长时只在资源之间拆分
+        :param index: 已建立的到期索引，不传时按传入的资源建立
+        """
+        if index is None:
+            index = ExpiryIndex.from_resources(account_name, regional_resources, global_resources)
+        message = WebhookMessage("\n".join([
             f"## 📢 腾讯云资源到期提醒",
             f"### 账号：<font color='info'>{account_name}</font>\n"
-        ]
+        ]))
         
         # 处理CVM资源
-        cvm_resources = []
-        for region_data in regional_resources.values():
-            if 'CVM' in region_data:
-                cvm_resources.extend(region_data['CVM'])
-        
-        if cvm_resources:
-            messages.append("### 云服务器")
-            for resource in cvm_resources:
-                differ_days = resource['DifferDays']
-                if differ_days <= 15:
-                    days_color = "warning"  # 橙红色
-                elif differ_days <= 30:
-                    days_color = "info"     # 绿色
-                else:
-                    days_color = "comment"  # 灰色
-                    
-                resource_info = [
-                    f"**名称**：{resource['InstanceName']}",
-                    f"**项目**：{resource.get('ProjectName', '默认项目')}",
-                    f"**区域**：{resource['Zone']}",
-                    f"**到期时间**：{resource['ExpiredTime']}",
-                    f"**剩余天数**：<font color='{days_color}'>{differ_days}天</font>"
-                ]
-                messages.append("> " + "\n> ".join(resource_info) + "\n")
+        cvm_resources = index.within(account_name=account_name, service_type='CVM')
+        items = []
+        for resource in cvm_resources:
+            differ_days = resource['DifferDays']
+            # 剩余天数颜色：warning 橙红色，info 绿色，comment 灰色
+            days_color = expiry_level(differ_days)
+            
+            resource_info = [
+                f"**名称**：{resource['InstanceName']}",
+                f"**项目**：{resource.get('ProjectName', '默认项目')}",
+                f"**区域**：{resource['Zone']}",
+                f"**到期时间**：{resource['ExpiredTime']}",
+                f"**剩余天数**：<font color='{days_color}'>{differ_days}天</font>"
+            ]
+            items.append("> " + "\n> ".join(resource_info) + "\n")
+        message.add_section("### 云服务器", items)
         
         # 处理轻量应用服务器资源
-        lighthouse_resources = []
-        for region_data in regional_resources.values():
-            if 'Lighthouse' in region_data:
-                lighthouse_resources.extend(region_data['Lighthouse'])
-        
-        if lighthouse_resources:
-            messages.append("### 轻量应用服务器")
-            for resource in lighthouse_resources:
-                differ_days = resource['DifferDays']
-                if differ_days <= 15:
-                    days_color = "warning"
-                elif differ_days <= 30:
-                    days_color = "info"
-                else:
-                    days_color = "comment"
-                    
-                resource_info = [
-                    f"**名称**：{resource['InstanceName']}",
-                    f"**区域**：{resource['Zone']}",
-                    f"**到期时间**：{resource['ExpiredTime']}",
-                    f"**剩余天数**：<font color='{days_color}'>{differ_days}天</font>"
-                ]
-                messages.append("> " + "\n> ".join(resource_info) + "\n")
+        lighthouse_resources = index.within(account_name=account_name, service_type='Lighthouse')
+        items = []
+        for resource in lighthouse_resources:
+            differ_days = resource['DifferDays']
+            days_color = expiry_level(differ_days)
+            
+            resource_info = [
+                f"**名称**：{resource['InstanceName']}",
+                f"**区域**：{resource['Zone']}",
+                f"**到期时间**：{resource['ExpiredTime']}",
+                f"**剩余天数**：<font color='{days_color}'>{differ_days}天</font>"
+            ]
+            items.append("> " + "\n> ".join(resource_info) + "\n")
+        message.add_section("### 轻量应用服务器", items)
         
         # 处理CBS资源
-        cbs_resources = []
-        for region_data in regional_resources.values():
-            if 'CBS' in region_data:
-                cbs_resources.extend(region_data['CBS'])
-        
-        if cbs_resources:
-            messages.append("### 云硬盘")
-            for resource in cbs_resources:
-                differ_days = resource['DifferDays']
-                if differ_days <= 15:
-                    days_color = "warning"
-                elif differ_days <= 30:
-                    days_color = "info"
-                else:
-                    days_color = "comment"
-                    
-                resource_info = [
-                    f"**名称**：{resource['DiskName']}",
-                    f"**项目**：{resource['ProjectName']}",
-                    f"**区域**：{resource['Zone']}",
-                    f"**到期时间**：{resource['ExpiredTime']}",
-                    f"**剩余天数**：<font color='{days_color}'>{differ_days}天</font>"
-                ]
-                messages.append("> " + "\n> ".join(resource_info) + "\n")
+        cbs_resources = index.within(account_name=account_name, service_type='CBS')
+        items = []
+        for resource in cbs_resources:
+            differ_days = resource['DifferDays']
+            days_color = expiry_level(differ_days)
+            
+            resource_info = [
+                f"**名称**：{resource['DiskName']}",
+                f"**项目**：{resource['ProjectName']}",
+                f"**区域**：{resource['Zone']}",
+                f"**到期时间**：{resource['ExpiredTime']}",
+                f"**剩余天数**：<font color='{days_color}'>{differ_days}天</font>"
+            ]
+            items.append("> " + "\n> ".join(resource_info) + "\n")
+        message.add_section("### 云硬盘", items)
         
         # 处理域名资源
-        domain_resources = global_resources.get('Domain', [])
-        if domain_resources:
-            messages.append("### 域名")
-            for resource in domain_resources:
-                differ_days = resource['DifferDays']
-                if differ_days <= 15:
-                    days_color = "warning"
-                elif differ_days <= 30:
-                    days_color = "info"
-                else:
-                    days_color = "comment"
-                    
-                resource_info = [
-                    f"**名称**：{resource['Domain']}",
-                    f"**到期时间**：{resource['ExpiredTime']}",
-                    f"**剩余天数**：<font color='{days_color}'>{differ_days}天</font>"
-                ]
-                messages.append("> " + "\n> ".join(resource_info) + "\n")
+        domain_resources = index.within(account_name=account_name, service_type='Domain')
+        items = []
+        for resource in domain_resources:
+            differ_days = resource['DifferDays']
+            days_color = expiry_level(differ_days)
+            
+            resource_info = [
+                f"**名称**：{resource['Domain']}",
+                f"**到期时间**：{resource['ExpiredTime']}",
+                f"**剩余天数**：<font color='{days_color}'>{differ_days}天</font>"
+            ]
+            items.append("> " + "\n> ".join(resource_info) + "\n")
+        message.add_section("### 域名", items)
         
         # 处理SSL证书资源
-        ssl_resources = global_resources.get('SSL', [])
-        if ssl_resources:
-            messages.append("### SSL证书")
-            for resource in ssl_resources:
-                differ_days = resource['DifferDays']
-                if differ_days <= 15:
-                    days_color = "warning"
-                elif differ_days <= 30:
-                    days_color = "info"
-                else:
-                    days_color = "comment"
-                    
-                resource_info = [
-                    f"**域名**：{resource['Domain']}",
-                    f"**证书类型**：{resource['ProductName']}",
-                    f"**项目**：{resource.get('ProjectName', '默认项目')}",
-                    f"**到期时间**：{resource['ExpiredTime']}",
-                    f"**剩余天数**：<font color='{days_color}'>{differ_days}天</font>"
-                ]
-                messages.append("> " + "\n> ".join(resource_info) + "\n")
+        ssl_resources = index.within(account_name=account_name, service_type='SSL')
+        items = []
+        for resource in ssl_resources:
+            differ_days = resource['DifferDays']
+            days_color = expiry_level(differ_days)
+            
+            resource_info = [
+                f"**域名**：{resource['Domain']}",
+                f"**证书类型**：{resource['ProductName']}",
+                f"**项目**：{resource.get('ProjectName', '默认项目')}",
+                f"**到期时间**：{resource['ExpiredTime']}",
+                f"**剩余天数**：<font color='{days_color}'>{differ_days}天</font>"
+            ]
+            items.append("> " + "\n> ".join(resource_info) + "\n")
+        message.add_section("### SSL证书", items)
         
-        return "\n".join(messages) 
\ No newline at end of file
+        return message
@@ -1,96 +1,106 @@
-import requests
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 import re
+from .webhook_dispatcher import WebhookDispatcher
+from .message_packer import MessageOutbox, WebhookMessage
+from utils.expiry_index import ExpiryIndex
 
 class YunZhiJiaService:
     """云之家机器人服务类"""
     
-    def __init__(self, bots: Dict[str, Dict]):
+    def __init__(self, bots: Dict[str, Dict], dispatcher: Optional[WebhookDispatcher] = None,
+                 max_bytes: int = 4096, rate_limit: float = 20):
+        """
+        :param max_bytes: 单条消息的最大字节数
+        :param rate_limit: 每个机器人每分钟最多发送的消息数
+        """
         self.logger = logging.getLogger('TencentCloudMonitor')
         self.bots = bots
+        self.dispatcher = dispatcher or WebhookDispatcher()
+        self.outbox = MessageOutbox(self.bots, self._send_to_bot, self.dispatcher, max_bytes, rate_limit,
+                                    channel='yunzhijia')
     
-    def format_resource_message(self, account_name: str, regional_resources: Dict, global_resources: Dict) -> str:
+    def format_resource_message(self, account_name: str, regional_resources: Dict, global_resources: Dict,
+                                index: Optional[ExpiryIndex] = None) -> str:
+        """
+        格式化资源信息为文本消息，各类资源按剩余天数升序排列
+        :param index: 已建立的到期索引，不传时按传入的资源建立
         """
-        格式化资源信息为文本消息
+        return self.build_resource_message(account_name, regional_resources, global_resources, index).render()
+
+    def build_resource_message(self, account_name: str, regional_resources: Dict, global_resources: Dict,
+                               index: Optional[ExpiryIndex] = None) -> WebhookMessage:
+        """
+        构建分块的资源消息，每条资源为一块，超长时只在资源之间拆分
+        :param index: 已建立的到期索引，不传时按传入的资源建立
         """
-        messages = [f"腾讯云 {account_name} 资源到期提醒\n"]
+        if index is None:
+            index = ExpiryIndex.from_resources(account_name, regional_resources, global_resources)
+        message = WebhookMessage(f"腾讯云 {account_name} 资源到期提醒\n")
         
         # 处理CVM资源
-        cvm_resources = []
-        for region_data in regional_resources.values():
-            if 'CVM' in region_data:
-                cvm_resources.extend(region_data['CVM'])
-        
-        if cvm_resources:
-            messages.append("===== 云服务器 =====")
-            for resource in cvm_resources:
-                messages.extend([
+        cvm_resources = index.within(account_name=account_name, service_type='CVM')
+        message.add_section("===== 云服务器 =====", [
+            "\n".join([
                     f"名称: {resource['InstanceName']}",
                     f"项目: {resource.get('ProjectName', '未知项目')}",
                     f"区域: {resource['Zone']}",
                     f"到期时间: {resource['ExpiredTime']}",
                     f"剩余天数: {resource['DifferDays']}天\n"
-                ])
+            ])
+            for resource in cvm_resources
+        ])
         
         # 处理轻量应用服务器资源
-        lighthouse_resources = []
-        for region_data in regional_resources.values():
-            if 'Lighthouse' in region_data:
-                lighthouse_resources.extend(region_data['Lighthouse'])
-        
-        if lighthouse_resources:
-            messages.append("===== 轻量应用服务器 =====")
-            for resource in lighthouse_resources:
-                messages.extend([
+        lighthouse_resources = index.within(account_name=account_name, service_type='Lighthouse')
+        message.add_section("===== 轻量应用服务器 =====", [
+            "\n".join([
                     f"名称: {resource['InstanceName']}",
                     f"区域: {resource['Zone']}",
                     f"到期时间: {resource['ExpiredTime']}",
                     f"剩余天数: {resource['DifferDays']}天\n"
-                ])
+            ])
+            for resource in lighthouse_resources
+        ])
         
         # 处理CBS资源
-        cbs_resources = []
-        for region_data in regional_resources.values():
-            if 'CBS' in region_data:
-                cbs_resources.extend(region_data['CBS'])
-        
-        if cbs_resources:
-            messages.append("===== 云硬盘 =====")
-            for resource in cbs_resources:
-                messages.extend([
+        cbs_resources = index.within(account_name=account_name, service_type='CBS')
+        message.add_section("===== 云硬盘 =====", [
+            "\n".join([
                     f"名称: {resource['DiskName']}",
                     f"项目: {resource['ProjectName']}",
                     f"区域: {resource['Zone']}",
                     f"到期时间: {resource['ExpiredTime']}",
                     f"剩余天数: {resource['DifferDays']}天\n"
-                ])
+            ])
+            for resource in cbs_resources
+        ])
         
         # 处理域名资源
-        domain_resources = global_resources.get('Domain', [])
-        if domain_resources:
-            messages.append("===== 域名 =====")
-            for resource in domain_resources:
-                messages.extend([
+        domain_resources = index.within(account_name=account_name, service_type='Domain')
+        message.add_section("===== 域名 =====", [
+            "\n".join([
                     f"名称: {resource['Domain']}",
                     f"到期时间: {resource['ExpiredTime']}",
                     f"剩余天数: {resource['DifferDays']}天\n"
-                ])
+            ])
+            for resource in domain_resources
+        ])
         
         # 处理SSL证书资源
-        ssl_resources = global_resources.get('SSL', [])
-        if ssl_resources:
-            messages.append("===== SSL证书 =====")
-            for resource in ssl_resources:
-                messages.extend([
+        ssl_resources = index.within(account_name=account_name, service_type='SSL')
+        message.add_section("===== SSL证书 =====", [
+            "\n".join([
                     f"域名: {resource['Domain']}",
                     f"证书类型: {resource['ProductName']}",
                     f"项目: {resource.get('ProjectName', '未知项目')}",
                     f"到期时间: {resource['ExpiredTime']}",
                     f"剩余天数: {resource['DifferDays']}天\n"
-                ])
+            ])
+            for resource in ssl_resources
+        ])
         
-        return "\n".join(messages)
+        return message
 
     def format_billing_message(self, account_name: str, billing_info: Dict) -> str:
         """
@@ -115,6 +125,10 @@ class YunZhiJiaService:
         """
         将markdown格式转换为纯文本格式
         """
+        return self._plain_text(markdown_text).strip()
+
+    def _plain_text(self, markdown_text: str) -> str:
+        """移除markdown特殊字符，不去除首尾空白，可以对消息的每一块分别转换"""
         # 移除markdown特殊字符
         text = markdown_text
         text = re.sub(r'[#*`]', '', text)  # 移除#、*和`字符
@@ -123,63 +137,74 @@ class YunZhiJiaService:
         # 统一分隔线样式
         text = text.replace('===', '=====')
         
-        return text.strip()
+        return text
 
-    def send_message(self, message: str, bot_names: List[str] = None) -> Dict[str, bool]:
+    def send_message(self, message: Union[str, WebhookMessage], bot_names: List[str] = None) -> Dict[str, bool]:
         """
-        发送消息到云之家机器人
+        发送消息到云之家机器人，超长时拆分为多条，多个机器人同时发送
         :param message: 要发送的消息
         :param bot_names: 指定的机器人名称列表，如果为None则发送给所有机器人
         :return: 发送结果字典 {机器人名称: 是否成功}
         """
-        results = {}
-        target_bots = {name: self.bots[name] for name in (bot_names or self.bots.keys())}
-        
-        # 转换消息格式
-        text_message = self.convert_markdown_to_text(message)
-        
-        for bot_name, bot_config in target_bots.items():
-            try:
-                # 打印请求信息
-                self.logger.debug(f"正在发送消息到云之家机器人 {bot_name}")
-                self.logger.debug(f"Webhook URL: {bot_config['webhook_url']}")
-                self.logger.debug(f"请求内容: {text_message}")
-                
-                # 构造请求数据 - 修改为云之家要求的格式
-                request_data = {
-                    "content": text_message
-                }
-                self.logger.debug(f"请求数据: {request_data}")
-                
-                response = requests.post(
-                    bot_config['webhook_url'],
-                    json=request_data
-                )
-                
-                # 打印响应信息
-                self.logger.debug(f"响应状态码: {response.status_code}")
-                self.logger.debug(f"响应内容: {response.text}")
+        return self.outbox.send(self._to_text_message(message), bot_names)
+
+    def queue_message(self, message: Union[str, WebhookMessage], bot_names: List[str] = None):
+        """暂存消息，调用 flush 时与其他消息合并发送"""
+        self.outbox.add(self._to_text_message(message), bot_names)
+
+    def flush(self) -> Dict[str, bool]:
+        """发送所有暂存的消息，返回每个机器人的发送结果"""
+        results = self.outbox.flush()
+        stats = self.outbox.reset_stats()
+        if stats['messages']:
+            self.logger.info(f"云之家通知: {stats['messages']} 条消息，共发送 {stats['posts']} 次")
+        return results
+
+    def _to_text_message(self, message: Union[str, WebhookMessage]) -> Union[str, WebhookMessage]:
+        # 分块消息逐块转换，拆分时按转换后的长度计算
+        if isinstance(message, WebhookMessage):
+            return message.map(self._plain_text)
+        return self.convert_markdown_to_text(message)
+
+    def _send_to_bot(self, bot_name: str, bot_config: Dict, content: str) -> bool:
+        """发送消息到单个云之家机器人"""
+        # 构造请求数据 - 修改为云之家要求的格式
+        request_data = {
+            "content": content.strip()
+        }
+        self.logger.debug(f"请求数据: {request_data}")
+        try:
+            # 打印请求信息
+            self.logger.debug(f"正在发送消息到云之家机器人 {bot_name}")
+            self.logger.debug(f"Webhook URL: {bot_config['webhook_url']}")
+            
+            response = self.dispatcher.post(
+                bot_config['webhook_url'],
+                json=request_data
+            )
+            
+            # 打印响应信息
+            self.logger.debug(f"响应状态码: {response.status_code}")
+            self.logger.debug(f"响应内容: {response.text}")
+            
+            if response.status_code == 200:
+                resp_data = response.json()
+                self.logger.debug(f"响应JSON: {resp_data}")
                 
-                if response.status_code == 200:
-                    resp_data = response.json()
-                    self.logger.debug(f"响应JSON: {resp_data}")
-                    
-                    if resp_data.get('success') is True:  # 修改成功判断条件
-                        self.logger.info(f"消息成功发送到云之家机器人 {bot_name}")
-                        results[bot_name] = True
-                    else:
-                        error_msg = resp_data.get('error', '未知错误')
-                        self.logger.error(f"发送消息到云之家机器人 {bot_name} 失败: {error_msg}")
-                        self.logger.error(f"完整响应: {resp_data}")
-                        results[bot_name] = False
+                if resp_data.get('success') is True:  # 修改成功判断条件
+                    self.logger.info(f"消息成功发送到云之家机器人 {bot_name}")
+                    return True
                 else:
-                    self.logger.error(f"发送消息到云之家机器人 {bot_name} 失败: HTTP {response.status_code}")
-                    self.logger.error(f"错误响应: {response.text}")
-                    results[bot_name] = False
-                    
-            except Exception as e:
-                self.logger.error(f"发送消息到云之家机器人 {bot_name} 时发生错误: {str(e)}")
-                self.logger.exception("详细错误信息:")
-                results[bot_name] = False
+                    error_msg = resp_data.get('error', '未知错误')
+                    self.logger.error(f"发送消息到云之家机器人 {bot_name} 失败: {error_msg}")
+                    self.logger.error(f"完整响应: {resp_data}")
+                    return False
+            else:
+                self.logger.error(f"发送消息到云之家机器人 {bot_name} 失败: HTTP {response.status_code}")
+                self.logger.error(f"错误响应: {response.text}")
+                return False
                 
-        return results 
\ No newline at end of file
+        except Exception as e:
+            self.logger.error(f"发送消息到云之家机器人 {bot_name} 时发生错误: {str(e)}")
+            self.logger.exception("详细错误信息:")
+            return False
@@ -0,0 +1,58 @@
+import unittest
+from support_services.message_packer import (
+    MIN_ITEM_BYTES, MIN_MESSAGE_BYTES, MessageOutbox, MessagePacker, WebhookMessage, byte_length
+)
+
+
+class SerialDispatcher:
+    """按顺序执行每个机器人的发送任务"""
+
+    def run(self, jobs):
+        return {bot_name: job() for bot_name, job in jobs.items()}
+
+
+def build_message(header: str, title: str, count: int, item_size: int = 100) -> WebhookMessage:
+    message = WebhookMessage(header)
+    message.add_section(title, [f"{index:03d}" + 'x' * (item_size - 3) for index in range(count)])
+    return message
+
+
+class MessagePackerBoundaryTest(unittest.TestCase):
+
+    def test_rejects_max_bytes_below_minimum(self):
+        with self.assertRaises(ValueError):
+            MessagePacker(60)
+        MessagePacker(MIN_MESSAGE_BYTES)
+
+    def test_rejects_header_and_title_without_room_for_item(self):
+        title = '### 云服务器'
+        header = 'h' * (MIN_MESSAGE_BYTES - byte_length(title) - 2 - MIN_ITEM_BYTES + 1)
+        with self.assertRaises(ValueError):
+            MessagePacker(MIN_MESSAGE_BYTES).split(build_message(header, title, 10))
+
+    def test_chunks_fit_when_header_and_title_leave_minimum_room(self):
+        title = '### 云服务器'
+        header = 'h' * (MIN_MESSAGE_BYTES - byte_length(title) - 2 - MIN_ITEM_BYTES)
+        chunks = MessagePacker(MIN_MESSAGE_BYTES).split(build_message(header, title, 5))
+
+        self.assertEqual(len(chunks), 5)
+        for index, chunk in enumerate(chunks):
+            self.assertLessEqual(byte_length(chunk), MIN_MESSAGE_BYTES)
+            header_part, title_part, item = chunk.split('\n')
+            self.assertEqual((header_part, title_part), (header, title))
+            # 资源被截断到剩余空间，但不会被丢弃
+            self.assertEqual(byte_length(item), MIN_ITEM_BYTES)
+            self.assertTrue(item.startswith(f"{index:03d}"))
+
+    def test_outbox_reports_failure_for_unsplittable_message(self):
+        posted = []
+        outbox = MessageOutbox({'bot': {}}, lambda *args: posted.append(args) or True,
+                               SerialDispatcher(), MIN_MESSAGE_BYTES)
+        outbox.add(build_message('h' * MIN_MESSAGE_BYTES, '### 云服务器', 3))
+
+        self.assertEqual(outbox.flush(), {'bot': False})
+        self.assertEqual(posted, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
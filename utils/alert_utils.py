@@ -5,7 +5,19 @@ def filter_resources_by_days(resources, days):
     if not resources:
         return []
     
+    # 没有到期时间的资源（如按量计费实例）不参与到期告警
     return [
         resource for resource in resources 
-        if resource.get('DifferDays', 0) <= days
-    ] 
\ No newline at end of file
+        if resource.get('DifferDays', 0) is not None
+        and resource.get('DifferDays', 0) <= days
+    ] 
+def expiry_level(differ_days: int) -> str:
+    """
+    剩余天数对应的告警级别，与通知中剩余天数的颜色一致：
+    15 天内为 warning，30 天内为 info，其余为 comment
+    """
+    if differ_days <= 15:
+        return 'warning'
+    if differ_days <= 30:
+        return 'info'
+    return 'comment'
@@ -1,14 +1,81 @@
+import threading
 from tencentcloud.common import credential
 from tencentcloud.common.profile.client_profile import ClientProfile
 from tencentcloud.common.profile.http_profile import HttpProfile
+from utils.config import load_api_endpoint_config
 
-def get_client_profile():
-    """创建客户端配置"""
-    http_profile = HttpProfile()
+def get_client_profile(endpoint=None, protocol=None):
+    """
+    创建客户端配置
+    :param endpoint: 接入点，如 127.0.0.1:8900，默认读取 TENCENTCLOUD_API_ENDPOINT，未设置时按产品使用官方域名
+    :param protocol: 请求协议 https/http，默认读取 TENCENTCLOUD_API_PROTOCOL
+    """
+    endpoint_config = load_api_endpoint_config()
+    # 保持长连接，同一客户端的多次请求（如分页）复用连接，避免重复握手
+    http_profile = HttpProfile(
+        protocol=protocol or endpoint_config['protocol'],
+        endpoint=endpoint or endpoint_config['endpoint'],
+        keepAlive=True
+    )
     client_profile = ClientProfile()
     client_profile.httpProfile = http_profile
     return client_profile
 
 def create_credential(secret_id, secret_key):
     """创建认证信息"""
-    return credential.Credential(secret_id, secret_key) 
\ No newline at end of file
+    return credential.Credential(secret_id, secret_key)
+
+
+class ClientFactory:
+    """
+    SDK 客户端工厂
+    每个账号共用一个认证信息，客户端按 (账号, 产品, 区域) 缓存，
+    在整个运行期间复用客户端及其长连接
+    """
+
+    def __init__(self, client_profile: ClientProfile = None):
+        self.client_profile = client_profile or get_client_profile()
+        self.credentials = {}
+        self.clients = {}
+        self.lock = threading.Lock()
+        self.stats = {'constructed': 0, 'reused': 0}
+
+    def credential(self, secret_id, secret_key):
+        """获取账号的认证信息，同一账号只创建一次"""
+        with self.lock:
+            cred = self.credentials.get(secret_id)
+            if cred is None or cred.secret_key != secret_key:
+                cred = self.credentials[secret_id] = create_credential(secret_id, secret_key)
+            return cred
+
+    def get_client(self, client_cls, cred, region, client_profile: ClientProfile = None):
+        """
+        获取客户端，已创建过的直接复用
+        :param client_cls: SDK 客户端类，如 CvmClient
+        """
+        key = (cred.secret_id, getattr(client_cls, '_service', client_cls.__name__), region)
+        with self.lock:
+            client = self.clients.get(key)
+            if client is not None:
+                self.stats['reused'] += 1
+                return client
+        
+        # 在锁外创建客户端，并发创建同一客户端时以先写入的为准
+        client = client_cls(cred, region, client_profile or self.client_profile)
+        with self.lock:
+            if key in self.clients:
+                self.stats['reused'] += 1
+                return self.clients[key]
+            self.clients[key] = client
+            self.stats['constructed'] += 1
+            return client
+
+    def get_stats(self) -> dict:
+        """获取客户端创建和复用次数"""
+        with self.lock:
+            return dict(self.stats, clients=len(self.clients), accounts=len(self.credentials))
+
+    def reset_stats(self):
+        """清空统计，保留已创建的客户端"""
+        with self.lock:
+            self.stats = {'constructed': 0, 'reused': 0}
@@ -15,7 +15,13 @@ def load_accounts():
             
         accounts[account_name] = {
             "secret_id": os.getenv(f'ACCOUNT{i}_SECRET_ID'),
-            "secret_key": os.getenv(f'ACCOUNT{i}_SECRET_KEY')
+            "secret_key": os.getenv(f'ACCOUNT{i}_SECRET_KEY'),
+            # 账号单独的汇总邮件收件人，可选
+            "email_receivers": [
+                email.strip()
+                for email in os.getenv(f'ACCOUNT{i}_EMAIL_RECEIVERS', '').split(',')
+                if email.strip()
+            ]
         }
         i += 1
     
@@ -49,7 +55,10 @@ def load_wechat_send_config():
             name.strip() 
             for name in os.getenv('WECHAT_TARGET_BOTS', '').split(',')
             if name.strip()
-        ] if os.getenv('WECHAT_TARGET_BOTS') else None
+        ] if os.getenv('WECHAT_TARGET_BOTS') else None,
+        # 单条消息的最大字节数和每个机器人每分钟的最大发送次数
+        "max_bytes": int(os.getenv('WECHAT_MESSAGE_MAX_BYTES', '4096')),
+        "rate_limit": float(os.getenv('WECHAT_RATE_LIMIT', '20'))
     } 
 
 def load_email_config():
@@ -65,7 +74,13 @@ def load_email_config():
             for email in os.getenv('EMAIL_RECEIVERS', '').split(',')
             if email.strip()
         ],
-        'use_ssl': os.getenv('EMAIL_USE_SSL', 'true').lower() == 'true'
+        'use_ssl': os.getenv('EMAIL_USE_SSL', 'true').lower() == 'true',
+        'timeout': float(os.getenv('EMAIL_SMTP_TIMEOUT', '30')),
+        # full: 正文为完整报告；compact: 正文只包含概览，完整报告压缩后作为附件
+        'report_mode': os.getenv('EMAIL_REPORT_MODE', 'full').lower(),
+        'inline_top_n': int(os.getenv('EMAIL_INLINE_TOP_N', '20')),
+        'attachment_compression': os.getenv('EMAIL_ATTACHMENT_COMPRESSION', 'gzip').lower(),
+        'csv_export': os.getenv('EMAIL_CSV_EXPORT', 'false').lower() == 'true'
     } 
 
 def load_alert_config():
@@ -75,19 +90,25 @@ def load_alert_config():
         'enable_wechat': os.getenv('ENABLE_WECHAT_ALERT', 'false').lower() == 'true',
         'enable_yunzhijia': os.getenv('ENABLE_YUNZHIJIA_ALERT', 'false').lower() == 'true',
         'resource_alert_mode': os.getenv('RESOURCE_ALERT_MODE', 'all'),
-        'resource_alert_days': int(os.getenv('RESOURCE_ALERT_DAYS', '65'))
+        'resource_alert_days': int(os.getenv('RESOURCE_ALERT_DAYS', '65')),
+        'notify_delta_only': os.getenv('NOTIFY_DELTA_ONLY', 'false').lower() == 'true'
     } 
 
 def load_service_regions():
-    """加载服务区域配置"""
+    """加载服务区域配置，RESOURCE_SERVICE_REGIONS=auto 时通过 DescribeRegions 自动发现"""
     load_dotenv()
+    regions = os.getenv('RESOURCE_SERVICE_REGIONS', 'ap-guangzhou')
+    auto = regions.strip().lower() == 'auto'
     return {
         'billing': os.getenv('BILLING_SERVICE_REGION', 'ap-guangzhou'),
-        'resources': [
+        'auto': auto,
+        'resources': [] if auto else [
             region.strip() 
-            for region in os.getenv('RESOURCE_SERVICE_REGIONS', 'ap-guangzhou').split(',')
+            for region in regions.split(',')
             if region.strip()
-        ]
+        ],
+        'empty_region_ttl': float(os.getenv('EMPTY_REGION_TTL_HOURS', '0')),
+        'empty_region_cache_path': os.getenv('EMPTY_REGION_CACHE_PATH', 'data/empty_regions.json')
     } 
 
 def load_yunzhijia_config():
@@ -118,5 +139,83 @@ def load_yunzhijia_send_config():
             name.strip() 
             for name in os.getenv('YUNZHIJIA_TARGET_BOTS', '').split(',')
             if name.strip()
-        ] if os.getenv('YUNZHIJIA_TARGET_BOTS') else None
-    } 
\ No newline at end of file
+        ] if os.getenv('YUNZHIJIA_TARGET_BOTS') else None,
+        # 单条消息的最大字节数和每个机器人每分钟的最大发送次数
+        "max_bytes": int(os.getenv('YUNZHIJIA_MESSAGE_MAX_BYTES', '4096')),
+        "rate_limit": float(os.getenv('YUNZHIJIA_RATE_LIMIT', '20'))
+    } 
+
+def load_collect_config():
+    """加载资源采集并发配置"""
+    load_dotenv()
+    return {
+        'max_workers': int(os.getenv('COLLECT_MAX_WORKERS', '8')),
+        'max_workers_per_account': int(os.getenv('COLLECT_MAX_WORKERS_PER_ACCOUNT', '4')),
+        'page_prefetch': os.getenv('API_PAGE_PREFETCH', 'false').lower() == 'true'
+    }
+
+def load_rate_limit_config():
+    """加载云API限频配置"""
+    load_dotenv()
+    return {
+        'rate': float(os.getenv('API_RATE_LIMIT', '20')),
+        'burst': int(os.getenv('API_RATE_BURST', '0')) or None,
+        'max_retries': int(os.getenv('API_THROTTLE_RETRIES', '3')),
+        'retry_backoff': float(os.getenv('API_THROTTLE_BACKOFF', '1'))
+    }
+
+def load_api_endpoint_config():
+    """加载云API接入点配置，用于访问本地模拟服务或指定的接入点"""
+    load_dotenv()
+    return {
+        # 如 127.0.0.1:8900，设置后所有产品的请求都发往该地址
+        'endpoint': os.getenv('TENCENTCLOUD_API_ENDPOINT', '').strip() or None,
+        'protocol': os.getenv('TENCENTCLOUD_API_PROTOCOL', 'https').strip().lower() or 'https'
+    }
+
+def load_api_cache_config():
+    """加载云API响应缓存配置"""
+    load_dotenv()
+    # 按产品覆盖缓存有效期，如 API_CACHE_TTL_CVM=600
+    ttl_overrides = {
+        key[len('API_CACHE_TTL_'):].lower(): float(value)
+        for key, value in os.environ.items()
+        if key.startswith('API_CACHE_TTL_') and value.strip()
+    }
+    return {
+        'enable': os.getenv('ENABLE_API_CACHE', 'false').lower() == 'true',
+        'path': os.getenv('API_CACHE_PATH', 'data/api_cache.db'),
+        'ttl_overrides': ttl_overrides
+    }
+
+def load_daemon_config():
+    """加载常驻模式配置，间隔单位为秒"""
+    load_dotenv()
+    return {
+        'billing_interval': float(os.getenv('DAEMON_BILLING_INTERVAL', '3600')),
+        'instance_interval': float(os.getenv('DAEMON_INSTANCE_INTERVAL', '14400')),
+        'certificate_interval': float(os.getenv('DAEMON_CERTIFICATE_INTERVAL', '86400')),
+        'report_interval': float(os.getenv('DAEMON_REPORT_INTERVAL', '86400')),
+        'jitter': float(os.getenv('DAEMON_JITTER', '300'))
+    }
+
+def load_webhook_config():
+    """加载 Webhook 发送配置"""
+    load_dotenv()
+    return {
+        'connect_timeout': float(os.getenv('WEBHOOK_CONNECT_TIMEOUT', '3')),
+        'read_timeout': float(os.getenv('WEBHOOK_READ_TIMEOUT', '10')),
+        'max_retries': int(os.getenv('WEBHOOK_MAX_RETRIES', '2')),
+        'retry_backoff': float(os.getenv('WEBHOOK_RETRY_BACKOFF', '0.5')),
+        'max_workers': int(os.getenv('WEBHOOK_MAX_WORKERS', '8'))
+    }
+
+def load_metrics_config():
+    """加载运行指标配置，导出路径为空时不写该文件"""
+    load_dotenv()
+    return {
+        'enable': os.getenv('ENABLE_METRICS', 'false').lower() == 'true',
+        'report_path': os.getenv('METRICS_REPORT_PATH', 'logs/metrics_report.json'),
+        'prometheus_path': os.getenv('METRICS_PROMETHEUS_PATH', ''),
+        'max_spans': int(os.getenv('METRICS_MAX_SPANS', '10000'))
+    }
@@ -0,0 +1,103 @@
+import time
+import random
+import signal
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+class ScheduleEntry:
+    """定时任务，对应一个 (任务组, 账号) 组合，账号为 None 表示不区分账号"""
+
+    def __init__(self, group: str, account_name: Optional[str], interval: float, next_run: float):
+        self.group = group
+        self.account_name = account_name
+        self.interval = interval
+        self.next_run = next_run
+
+    def __repr__(self):
+        return f"{self.group}/{self.account_name or '-'}"
+
+
+class DaemonScheduler:
+    """
+    常驻模式调度器
+    每个 (任务组, 账号) 按各自的间隔执行，首次执行和每次重新调度都加上随机抖动，
+    避免所有账号在同一时刻请求云API
+    """
+
+    def __init__(self, jitter: float = 300):
+        """
+        :param jitter: 随机抖动的最大秒数
+        """
+        self.jitter = max(0.0, jitter)
+        self.entries: List[ScheduleEntry] = []
+        self.stop_event = threading.Event()
+        self.logger = logging.getLogger('TencentCloudMonitor')
+
+    def add(self, group: str, interval: float, account_names: List[Optional[str]] = (None,),
+            initial_delay: float = 0):
+        """
+        添加任务组
+        :param interval: 执行间隔秒数
+        :param account_names: 需要分别调度的账号，默认不区分账号
+        :param initial_delay: 首次执行前的固定延迟，会再加上随机抖动
+        """
+        now = time.time()
+        for account_name in account_names:
+            self.entries.append(ScheduleEntry(
+                group, account_name, interval,
+                now + initial_delay + random.uniform(0, self.jitter)
+            ))
+
+    def due(self, now: float = None) -> Dict[str, List[Optional[str]]]:
+        """取出已到期的任务并重新调度，返回 {任务组: [账号]}，顺序与添加顺序一致"""
+        now = time.time() if now is None else now
+        groups = {}
+        for entry in self.entries:
+            if entry.next_run <= now:
+                groups.setdefault(entry.group, []).append(entry.account_name)
+                entry.next_run = now + entry.interval + random.uniform(0, self.jitter)
+        return groups
+
+    def seconds_until_next(self, now: float = None) -> float:
+        """距离下一个任务到期的秒数"""
+        now = time.time() if now is None else now
+        if not self.entries:
+            return 60.0
+        return max(0.0, min(entry.next_run for entry in self.entries) - now)
+
+    def run_forever(self, callback: Callable[[Dict[str, List[Optional[str]]]], None]):
+        """
+        循环执行到期任务，直到收到 SIGINT/SIGTERM 或调用 stop
+        :param callback: 接收 {任务组: [账号]} 的回调，异常会被记录但不会中断循环
+        """
+        self._install_signal_handlers()
+        self.logger.info(f"[常驻模式] 已启动，共 {len(self.entries)} 个定时任务")
+        while not self.stop_event.is_set():
+            groups = self.due()
+            if groups:
+                try:
+                    callback(groups)
+                except Exception as e:
+                    self.logger.exception(f"[常驻模式] 执行定时任务时发生错误: {str(e)}")
+                continue
+            # 最长等待一分钟，便于及时响应停止信号
+            self.stop_event.wait(min(self.seconds_until_next(), 60))
+        self.logger.info("[常驻模式] 已停止")
+
+    def stop(self, *args):
+        """停止调度循环，当前正在执行的任务会执行完"""
+        if not self.stop_event.is_set():
+            self.logger.info("[常驻模式] 收到停止信号，当前任务完成后退出")
+        self.stop_event.set()
+
+    def _install_signal_handlers(self):
+        # 只有主线程可以注册信号处理
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                signal.signal(sig, self.stop)
+            except (ValueError, OSError):
+                pass
+
@@ -0,0 +1,135 @@
+from bisect import bisect_right
+from itertools import product
+from typing import Dict, Iterable, List, Mapping, Optional
+
+# 没有项目信息的资源归入默认项目
+DEFAULT_PROJECT = '默认项目'
+
+
+class _Bucket:
+    """按剩余天数排序的资源列表，追加时只记录是否乱序，查询前统一排序"""
+    __slots__ = ('days', 'items', 'ordered')
+
+    def __init__(self):
+        self.days = []
+        self.items = []
+        self.ordered = True
+
+    def append(self, differ_days: int, item: Mapping):
+        if self.days and differ_days < self.days[-1]:
+            self.ordered = False
+        self.days.append(differ_days)
+        self.items.append(item)
+
+    def sort(self):
+        if self.ordered:
+            return
+        # 稳定排序，剩余天数相同的资源保持采集顺序
+        order = sorted(range(len(self.days)), key=self.days.__getitem__)
+        self.days = [self.days[i] for i in order]
+        self.items = [self.items[i] for i in order]
+        self.ordered = True
+
+    def end(self, days: Optional[int]) -> int:
+        """剩余天数不超过 days 的资源数量"""
+        self.sort()
+        return len(self.days) if days is None else bisect_right(self.days, days)
+
+
+class ExpiryIndex:
+    """
+    到期索引
+    按剩余天数排序保存资源，并按 (账号, 资源类型, 项目) 的所有组合分桶，
+    任意条件组合下的"N天内到期"、"最先到期的K个"和计数查询都只需一次二分查找。
+    没有到期时间的资源不进入索引
+    """
+
+    def __init__(self):
+        self.buckets: Dict[tuple, _Bucket] = {}
+        # 用字典保存出现过的账号、类型和项目，保持首次出现的顺序
+        self.accounts: Dict[str, None] = {}
+        self.service_types: Dict[str, None] = {}
+        self.projects: Dict[str, None] = {}
+        self.unscheduled = 0
+
+    @classmethod
+    def from_resources(cls, account_name: str, regional_resources: Dict, global_resources: Dict) -> 'ExpiryIndex':
+        """从单个账号的 regional/global 资源结构建立索引"""
+        index = cls()
+        index.add_account(account_name, regional_resources, global_resources)
+        return index
+
+    @classmethod
+    def from_accounts(cls, all_accounts_data: Iterable[Dict]) -> 'ExpiryIndex':
+        """从多个账号的采集数据建立索引"""
+        index = cls()
+        for account_data in all_accounts_data:
+            resources = account_data['resources']
+            index.add_account(account_data['account_name'], resources.get('regional', {}),
+                              resources.get('global', {}))
+        return index
+
+    def add_account(self, account_name: str, regional_resources: Dict, global_resources: Dict):
+        """添加单个账号的 regional/global 资源结构，区域资源按区域顺序合并"""
+        for region_data in regional_resources.values():
+            for service_type, resources in region_data.items():
+                self.add(account_name, service_type, resources)
+        for service_type, resources in global_resources.items():
+            self.add(account_name, service_type, resources)
+
+    def add(self, account_name: str, service_type: str, resources: Iterable[Mapping]):
+        """添加一批同类型的资源"""
+        self.accounts.setdefault(account_name)
+        self.service_types.setdefault(service_type)
+        for resource in resources:
+            differ_days = resource.get('DifferDays')
+            if differ_days is None:
+                self.unscheduled += 1
+                continue
+            project = resource.get('ProjectName') or DEFAULT_PROJECT
+            self.projects.setdefault(project)
+            # 每条资源登记到 8 个桶中，None 表示该维度不限
+            for key in product((account_name, None), (service_type, None), (project, None)):
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    bucket = self.buckets[key] = _Bucket()
+                bucket.append(differ_days, resource)
+
+    def within(self, days: Optional[int] = None, account_name: str = None,
+               service_type: str = None, project: str = None) -> List[Mapping]:
+        """
+        查询剩余天数不超过 days 的资源，按剩余天数升序排列
+        :param days: 天数上限，None 表示不限
+        """
+        bucket = self.buckets.get((account_name, service_type, project))
+        if bucket is None:
+            return []
+        return bucket.items[:bucket.end(days)]
+
+    def soonest(self, k: int, account_name: str = None, service_type: str = None,
+                project: str = None) -> List[Mapping]:
+        """查询最先到期的 k 个资源"""
+        bucket = self.buckets.get((account_name, service_type, project))
+        if bucket is None:
+            return []
+        bucket.sort()
+        return bucket.items[:max(0, k)]
+
+    def count(self, days: Optional[int] = None, account_name: str = None,
+              service_type: str = None, project: str = None) -> int:
+        """统计剩余天数不超过 days 的资源数量"""
+        bucket = self.buckets.get((account_name, service_type, project))
+        return bucket.end(days) if bucket is not None else 0
+
+    def project_counts(self, days: Optional[int] = None, account_name: str = None,
+                       service_type: str = None) -> Dict[str, int]:
+        """按项目统计剩余天数不超过 days 的资源数量，只返回数量大于 0 的项目"""
+        counts = {}
+        for project in self.projects:
+            count = self.count(days, account_name, service_type, project)
+            if count:
+                counts[project] = count
+        return counts
+
+    def __len__(self) -> int:
+        return self.count()
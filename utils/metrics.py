@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from collections import Counter
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 阶段耗时直方图的分桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 作为直方图标签的标签名，账号、区域等高基数标签只出现在 JSON 报告的明细中
+HISTOGRAM_LABELS = ('service', 'product', 'action', 'table', 'channel')
+
+# 云API请求的阶段名称，按 (账号, 产品, 接口, 结果) 统计调用次数
+API_STAGE = 'api'
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """最近秩法计算百分位数，ordered 需已排序"""
+    if not ordered:
+        return 0.0
+    rank = -(-len(ordered) * pct // 100)
+    return ordered[min(len(ordered), max(1, int(rank))) - 1]
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + '}'
+
+
+class Span:
+    """
+    计时区间
+    进入时开始计时并将标签压入当前线程的标签栈，区间内的子区间继承这些标签；
+    区间内抛出异常时以异常的错误码（没有错误码时为异常类名）作为结果
+    """
+    __slots__ = ('metrics', 'stage', 'tags', 'status', 'start')
+
+    def __init__(self, metrics: 'Metrics', stage: str, tags: Dict):
+        self.metrics = metrics
+        self.stage = stage
+        self.tags = tags
+        self.status = 'ok'
+        self.start = 0.0
+
+    def set(self, **tags):
+        """补充标签，如写入的行数"""
+        self.tags.update(tags)
+
+    def fail(self, status: str = 'error'):
+        """将区间标记为失败，用于不抛出异常的失败"""
+        self.status = status
+
+    def __enter__(self) -> 'Span':
+        stack = self.metrics._stack()
+        if stack:
+            self.tags = dict(stack[-1], **self.tags)
+        stack.append(self.tags)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        self.metrics._stack().pop()
+        if exc is not None:
+            self.status = getattr(exc, 'code', None) or exc_type.__name__
+        self.metrics._record(self, duration)
+        return False
+
+
+class _NullSpan:
+    """未启用指标时使用的空区间"""
+    __slots__ = ()
+    status = 'ok'
+
+    def set(self, **tags):
+        pass
+
+    def fail(self, status: str = 'error'):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """
+    运行指标
+    采集任务、云API请求、数据库批次和通知发送包在带标签的计时区间中，
+    每次运行结束后导出为 JSON 运行报告和 Prometheus textfile；未启用时区间为空操作
+    """
+
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                 max_spans: int = 10000):
+        """
+        :param enabled: 是否记录指标
+        :param buckets: 直方图分桶上界（秒）
+        :param max_spans: JSON 报告中保留的区间明细数，超出后只做汇总统计
+        """
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self.max_spans = max_spans
+        self.logger = logging.getLogger('TencentCloudMonitor')
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.begin_run()
+
+    def configure(self, enabled: bool = None, max_spans: int = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if max_spans is not None:
+            self.max_spans = max_spans
+
+    def begin_run(self, **info):
+        """开始新一次运行，清空上次运行的指标"""
+        with self.lock:
+            self.run_info = dict(info)
+            self.started_at = datetime.now()
+            self.started = time.perf_counter()
+            self.durations: Dict[Tuple, List[float]] = {}
+            self.errors: Counter = Counter()
+            self.api_calls: Counter = Counter()
+            self.spans: List[Dict] = []
+            self.dropped = 0
+
+    def span(self, stage: str, **tags):
+        """
+        创建计时区间，用作上下文管理器
+        :param stage: 阶段名称，如 collect、api、db.upsert、notify.post
+        :param tags: 标签，如 account、region、service、action
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, stage, tags)
+
+    def current_tags(self) -> Dict:
+        """当前线程继承的标签"""
+        stack = self._stack()
+        return dict(stack[-1]) if stack else {}
+
+    def bind(self, func: Callable) -> Callable:
+        """在其他线程中执行 func 时沿用当前线程的标签，用于提交到线程池的任务"""
+        if not self.enabled:
+            return func
+        tags = self.current_tags()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = self._stack()
+            stack.append(tags)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stack.pop()
+        return wrapper
+
+    def count_api_call(self, product: str, action: str, status: str):
+        """记录没有实际发出的云API调用，如命中响应缓存"""
+        if not self.enabled:
+            return
+        account = self.current_tags().get('account', '')
+        with self.lock:
+            self.api_calls[(account, product, action, status)] += 1
+
+    def _stack(self) -> List[Dict]:
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def _record(self, span: Span, duration: float):
+        tags = span.tags
+        key = (span.stage,) + tuple(tags.get(label, '') for label in HISTOGRAM_LABELS)
+        with self.lock:
+            self.durations.setdefault(key, []).append(duration)
+            if span.status != 'ok':
+                self.errors[key] += 1
+            if span.stage == API_STAGE:
+                self.api_calls[(tags.get('account', ''), tags.get('product', ''),
+                                tags.get('action', ''), span.status)] += 1
+            if len(self.spans) < self.max_spans:
+                self.spans.append({
+                    'stage': span.stage,
+                    'start': round(span.start - self.started, 6),
+                    'duration': round(duration, 6),
+                    'status': span.status,
+                    'tags': tags
+                })
+            else:
+                self.dropped += 1
+
+    def report(self) -> Dict:
+        """生成运行报告：各阶段耗时统计、云API调用次数和区间明细"""
+        with self.lock:
+            durations = {key: sorted(values) for key, values in self.durations.items()}
+            errors = dict(self.errors)
+            api_calls = dict(self.api_calls)
+            spans = list(self.spans)
+            dropped = self.dropped
+
+        stages = []
+        for key, values in sorted(durations.items()):
+            labels = {label: value for label, value in zip(HISTOGRAM_LABELS, key[1:]) if value}
+            stages.append(dict(
+                stage=key[0],
+                labels=labels,
+                count=len(values),
+                errors=errors.get(key, 0),
+                total=round(sum(values), 6),
+                p50=round(_percentile(values, 50), 6),
+                p99=round(_percentile(values, 99), 6),
+                max=round(values[-1], 6)
+            ))
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'duration': round(time.perf_counter() - self.started, 3),
+            'run': self.run_info,
+            'stages': stages,
+            'api_calls': [
+                {'account': account, 'product': product, 'action': action, 'status': status, 'count': count}
+                for (account, product, action, status), count in sorted(api_calls.items())
+            ],
+            'spans': spans,
+            'dropped_spans': dropped
+        }
+
+    def render_prometheus(self) -> str:
+        """生成 Prometheus 文本格式的指标"""
+        with self.lock:
+            durations = {key: list(values) for key, values in self.durations.items()}
+            errors = dict(self.errors)
+            api_calls = dict(self.api_calls)
+        lines = [
+            '# HELP tcm_stage_duration_seconds 各阶段耗时',
+            '# TYPE tcm_stage_duration_seconds histogram'
+        ]
+        for key, values in sorted(durations.items()):
+            labels = {'stage': key[0]}
+            labels.update((label, value) for label, value in zip(HISTOGRAM_LABELS, key[1:]) if value)
+            for bound in self.buckets:
+                count = sum(1 for value in values if value <= bound)
+                lines.append(f"tcm_stage_duration_seconds_bucket{_format_labels(dict(labels, le=repr(float(bound))))} {count}")
+            lines.append(f"tcm_stage_duration_seconds_bucket{_format_labels(dict(labels, le='+Inf'))} {len(values)}")
+            lines.append(f"tcm_stage_duration_seconds_sum{_format_labels(labels)} {sum(values):.6f}")
+            lines.append(f"tcm_stage_duration_seconds_count{_format_labels(labels)} {len(values)}")
+
+        lines += ['# HELP tcm_stage_errors_total 各阶段失败次数', '# TYPE tcm_stage_errors_total counter']
+        for key, count in sorted(errors.items()):
+            labels = {'stage': key[0]}
+            labels.update((label, value) for label, value in zip(HISTOGRAM_LABELS, key[1:]) if value)
+            lines.append(f"tcm_stage_errors_total{_format_labels(labels)} {count}")
+
+        lines += ['# HELP tcm_api_calls_total 云API调用次数', '# TYPE tcm_api_calls_total counter']
+        for (account, product, action, status), count in sorted(api_calls.items()):
+            labels = {'account': account, 'product': product, 'action': action, 'status': status}
+            lines.append(f"tcm_api_calls_total{_format_labels(labels)} {count}")
+
+        lines += [
+            '# HELP tcm_run_duration_seconds 最近一次运行的耗时',
+            '# TYPE tcm_run_duration_seconds gauge',
+            f"tcm_run_duration_seconds {time.perf_counter() - self.started:.6f}",
+            '# HELP tcm_run_timestamp_seconds 最近一次运行的开始时间',
+            '# TYPE tcm_run_timestamp_seconds gauge',
+            f"tcm_run_timestamp_seconds {self.started_at.timestamp():.0f}"
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def export(self, report_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        """导出 JSON 运行报告和 Prometheus textfile，路径为空时跳过"""
+        if not self.enabled:
+            return
+        if report_path:
+            self._write(report_path, json.dumps(self.report(), ensure_ascii=False, indent=2))
+        if prometheus_path:
+            self._write(prometheus_path, self.render_prometheus())
+
+    def _write(self, path: str, content: str):
+        """先写临时文件再替换，避免 node_exporter 读到写了一半的文件"""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            self.logger.debug(f"[指标] 已写入 {path}")
+        except Exception as e:
+            self.logger.error(f"写入指标文件失败 - {path}: {str(e)}")
+
+
+# 全局指标实例，由 main 按配置启用
+METRICS = Metrics()
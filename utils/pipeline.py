@@ -0,0 +1,175 @@
+import queue
+import logging
+import threading
+from typing import Dict, List
+from utils.alert_utils import filter_resources_by_days, expiry_level
+from utils.snapshot_store import RESOURCE_ID_FIELDS, content_hash
+from utils.resource_model import define_record
+
+# 通知和邮件格式化时用到的资源字段
+ALERT_FIELDS = (
+    'Type', 'InstanceName', 'DiskName', 'Domain', 'ProductName',
+    'ProjectName', 'Zone', 'ExpiredTime', 'DifferDays'
+)
+
+AlertRecord = define_record('AlertRecord', ALERT_FIELDS)
+
+def project_alert_fields(resource: Dict) -> AlertRecord:
+    """只保留告警需要的字段，字段是否存在与原资源保持一致"""
+    return AlertRecord.from_mapping(resource)
+
+def count_alert_resources(resources: Dict) -> int:
+    """统计 {'regional': ..., 'global': ...} 结构中的资源数量"""
+    count = sum(len(items) for region_data in resources['regional'].values() for items in region_data.values())
+    return count + sum(len(items) for items in resources['global'].values())
+
+def merge_account_data(target: Dict, account_data: Dict) -> Dict:
+    """将一次采集的账号数据合并到 target 中，只覆盖本次采集到的服务"""
+    merged = target.setdefault(account_data['account_name'], {
+        'account_name': account_data['account_name'],
+        'resources': {'regional': {}, 'global': {}},
+        'billing': None
+    })
+    for region, services in account_data['resources']['regional'].items():
+        merged['resources']['regional'].setdefault(region, {}).update(services)
+    merged['resources']['global'].update(account_data['resources']['global'])
+    if account_data['billing'] is not None:
+        merged['billing'] = account_data['billing']
+    return merged
+
+
+class ResourceWriter:
+    """
+    数据库写入器
+    采集结果按 (账号, 服务) 批次放入有界队列，由后台线程写入数据库，
+    队列满时阻塞提交方，避免未写入的数据无限堆积
+    """
+    _STOP = object()
+
+    def __init__(self, db_service, threads: int = 2, max_pending: int = 32):
+        self.db_service = db_service
+        self.logger = logging.getLogger('TencentCloudMonitor')
+        self.queue = queue.Queue(maxsize=max(1, max_pending))
+        self.threads = [
+            threading.Thread(target=self._run, name=f"db-writer-{i}", daemon=True)
+            for i in range(max(1, threads))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, account_name: str, service_type: str, resources: List[Dict]):
+        """提交一批资源数据"""
+        if resources:
+            self.queue.put((self.db_service.insert_resources, (account_name, service_type, resources)))
+
+    def submit_billing(self, account_name: str, billing_info: Dict):
+        """提交账单数据"""
+        self.queue.put((self.db_service.insert_billing_info,
+                        (account_name, billing_info['balance'], billing_info['bill_details'])))
+
+    def close(self):
+        """等待队列中的数据全部写完后停止写入线程"""
+        for _ in self.threads:
+            self.queue.put(self._STOP)
+        for thread in self.threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is self._STOP:
+                return
+            method, args = item
+            try:
+                method(*args)
+            except Exception as e:
+                self.logger.error(f"写入数据库时发生错误 - 账号[{args[0]}]: {str(e)}")
+
+
+class AlertAccumulator:
+    """
+    告警数据累积器
+    每批采集结果到达时即按告警配置过滤，只保留告警所需的精简字段，
+    按账号组织成 regional/global 结构供通知和汇总邮件使用。
+    传入快照存储时，额外记录相对上次通知新增或变化的资源，供只推送变化的通知使用
+    """
+
+    def __init__(self, alert_config: Dict, snapshots=None):
+        self.alert_mode = alert_config['resource_alert_mode']
+        self.alert_days = alert_config['resource_alert_days']
+        self.snapshots = snapshots
+        self.accounts = {}
+        self.deltas = {}
+        self.pending = {}
+
+    def reserve(self, account_name: str, region: str = None):
+        """预先登记账号和区域，使输出顺序与配置顺序一致"""
+        for accounts in (self.accounts, self.deltas):
+            account = self._account(account_name, accounts)
+            if region:
+                account['regional'].setdefault(region, {})
+
+    def add(self, account_name: str, scope: str, service_type: str, region: str, resources: List[Dict]):
+        """累积一批采集结果"""
+        if self.alert_mode == 'specific':
+            # 只在 specific 模式下过滤资源
+            resources = filter_resources_by_days(resources, self.alert_days)
+        else:
+            # 没有到期时间的资源（如按量计费实例）不参与到期告警
+            resources = [resource for resource in resources if resource.get('DifferDays') is not None]
+        projected = [project_alert_fields(resource) for resource in resources]
+
+        self._store(self.accounts, account_name, scope, service_type, region, projected)
+        
+        if self.snapshots is not None:
+            changed = self._diff(account_name, service_type, resources, projected)
+            self._store(self.deltas, account_name, scope, service_type, region, changed)
+
+    def get(self, account_name: str) -> Dict:
+        """获取账号的告警数据，格式为 {'regional': {...}, 'global': {...}}"""
+        return self._account(account_name, self.accounts)
+
+    def get_delta(self, account_name: str) -> Dict:
+        """获取相对上次通知新增或变化的告警数据，格式与 get 相同"""
+        return self._account(account_name, self.deltas)
+
+    def commit(self, account_name: str):
+        """账号通知全部发送成功后记录已通知的资源，下次运行不再重复推送"""
+        for kind, entries in self.pending.pop(account_name, {}).items():
+            self.snapshots.commit(account_name, kind, entries)
+
+    def _diff(self, account_name: str, service_type: str, resources: List[Dict], projected: List[Dict]) -> List[Dict]:
+        """与上次通知的快照比较，返回新增或变化的资源"""
+        id_field = RESOURCE_ID_FIELDS.get(service_type)
+        if id_field is None:
+            return projected
+        
+        kind = f"alert:{service_type}"
+        hashes = {}
+        for resource, item in zip(resources, projected):
+            # 剩余天数每天变化，只将告警级别计入内容哈希，进入 30 天、15 天内时重新推送
+            fields = [(key, value) for key, value in item.items() if key != 'DifferDays']
+            fields.append(('Level', expiry_level(item['DifferDays'])))
+            hashes[str(resource.get(id_field))] = content_hash(fields)
+        changed, _ = self.snapshots.diff(account_name, kind, hashes)
+        
+        changed_ids = set(changed)
+        pending = self.pending.setdefault(account_name, {}).setdefault(kind, {})
+        delta = []
+        for resource, item in zip(resources, projected):
+            resource_id = str(resource.get(id_field))
+            if resource_id in changed_ids:
+                delta.append(item)
+            pending[resource_id] = (hashes[resource_id], None)
+        return delta
+
+    def _store(self, accounts: Dict, account_name: str, scope: str, service_type: str, region: str, items: List[Dict]):
+        account = self._account(account_name, accounts)
+        if scope == 'regional':
+            account['regional'].setdefault(region, {})[service_type] = items
+        else:
+            account['global'][service_type] = items
+
+    @staticmethod
+    def _account(account_name: str, accounts: Dict) -> Dict:
+        return accounts.setdefault(account_name, {'regional': {}, 'global': {}})
@@ -0,0 +1,213 @@
+import os
+import re
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from datetime import datetime
+from collections import Counter
+from typing import Dict, List, Optional
+
+# 内存统计中忽略的文件：分析器自身和 tracemalloc 内部
+_IGNORED_FILES = (tracemalloc.__file__, __file__)
+
+# 项目根目录，调用栈中项目内的文件显示相对路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Profiler:
+    """
+    运行分析器
+    后台线程按固定间隔采样所有线程的调用栈（按墙钟时间采样，等待网络和锁的时间也会计入），
+    在每个阶段结束时记录 tracemalloc 快照，与上一快照比较得出该阶段新增内存最多的代码位置。
+    结束时写出 flamegraph.pl / speedscope 可直接读取的折叠栈文件和内存分配表；
+    未启动时 phase 为空操作
+    """
+
+    def __init__(self, interval: float = 0.005, memory_frames: int = 1, top: int = 15):
+        """
+        :param interval: 采样间隔（秒）
+        :param memory_frames: tracemalloc 为每个内存块记录的调用栈深度
+        :param top: 每个阶段输出的分配位置数
+        """
+        self.interval = interval
+        self.memory_frames = memory_frames
+        self.top = top
+        self.logger = logging.getLogger('TencentCloudMonitor')
+        self.active = False
+        self.stacks = Counter()
+        self.phases: List[Dict] = []
+        self.current = []
+        self.labels = {}
+        self.thread = None
+        self.stopping = threading.Event()
+        self.snapshot = None
+
+    def start(self):
+        """开始采样调用栈和跟踪内存分配"""
+        if self.active:
+            return
+        self.active = True
+        self.started = time.perf_counter()
+        self.samples = 0
+        tracemalloc.start(self.memory_frames)
+        self.snapshot = self._take_snapshot()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self, output_dir: str = 'logs') -> Optional[Dict[str, str]]:
+        """
+        停止分析并写出结果文件
+        :return: {'stacks': 折叠栈文件路径, 'memory': 内存分配表路径}，未启动时返回 None
+        """
+        if not self.active:
+            return None
+        self.stopping.set()
+        self.thread.join()
+        final = self._take_snapshot()
+        tracemalloc.stop()
+        self.active = False
+
+        os.makedirs(output_dir, exist_ok=True)
+        basename = os.path.join(output_dir, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        paths = {'stacks': f"{basename}.folded", 'memory': f"{basename}_memory.txt"}
+        with open(paths['stacks'], 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        with open(paths['memory'], 'w', encoding='utf-8') as f:
+            f.write(self._format_memory_report(final))
+        self.logger.info(
+            f"[性能分析] 采样 {self.samples} 次，耗时 {time.perf_counter() - self.started:.2f}s，"
+            f"调用栈: {paths['stacks']}，内存分配: {paths['memory']}"
+        )
+        return paths
+
+    def phase(self, name: str):
+        """标记一个阶段，用作上下文管理器；阶段内的采样以阶段名为栈底，阶段结束时记录内存快照"""
+        if not self.active:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def _enter(self, name: str):
+        self.current.append(name)
+
+    def _exit(self, name: str, elapsed: float):
+        self.current.pop()
+        snapshot = self._take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        self.phases.append({
+            'name': name,
+            'elapsed': elapsed,
+            'current': current,
+            'peak': peak,
+            'top': snapshot.compare_to(self.snapshot, 'lineno')[:self.top]
+        })
+        self.snapshot = snapshot
+        # Python 3.9 起可以清零峰值，使每个阶段的峰值只反映本阶段
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+        )
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            root = self.current[-1] if self.current else 'other'
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(self._thread_label(names.get(ident, 'unknown')))
+                stack.append(root)
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def _label(self, code) -> str:
+        label = self.labels.get(code)
+        if label is None:
+            # 项目内的文件显示相对路径，标准库和第三方库只显示文件名
+            filename = code.co_filename
+            if filename.startswith(ROOT):
+                filename = os.path.relpath(filename, ROOT)
+            else:
+                filename = os.path.basename(filename)
+            label = self.labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        return label
+
+    @staticmethod
+    def _thread_label(name: str) -> str:
+        # 线程池中的线程按名称前缀合并，如 ThreadPoolExecutor-0_3 -> ThreadPoolExecutor
+        return re.sub(r'[-_]\d+.*$', '', name) or name
+
+    def _format_memory_report(self, final) -> str:
+        lines = [f"采样间隔 {self.interval * 1000:.0f}ms，共采样 {self.samples} 次", ""]
+        for phase in self.phases:
+            lines.append(
+                f"阶段 {phase['name']}：耗时 {phase['elapsed']:.2f}s，"
+                f"结束时占用 {_format_size(phase['current'])}，峰值 {_format_size(phase['peak'])}"
+            )
+            lines.append(f"  {'新增内存':>12}  {'新增块数':>10}  位置")
+            for stat in phase['top']:
+                if stat.size_diff <= 0:
+                    continue
+                frame = stat.traceback[0]
+                lines.append(f"  {'+' + _format_size(stat.size_diff):>14}  {stat.count_diff:>+12}  "
+                             f"{frame.filename}:{frame.lineno}")
+            lines.append("")
+
+        lines.append("运行结束时占用内存最多的位置")
+        lines.append(f"  {'占用内存':>12}  {'块数':>10}  位置")
+        for stat in final.statistics('lineno')[:self.top]:
+            frame = stat.traceback[0]
+            lines.append(f"  {_format_size(stat.size):>14}  {stat.count:>12}  {frame.filename}:{frame.lineno}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_size(size: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler._exit(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+# 全局分析器实例，使用 --profile 运行时由 main 启动
+PROFILER = Profiler()
@@ -0,0 +1,188 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from typing import Dict
+
+# 腾讯云接口限频错误码，如 RequestLimitExceeded、RequestLimitExceeded.UinLimitExceeded
+THROTTLE_CODE_PREFIX = 'RequestLimitExceeded'
+
+def is_throttle_error(error: Exception) -> bool:
+    """判断异常是否为接口限频"""
+    code = getattr(error, 'code', None) or ''
+    return code.startswith(THROTTLE_CODE_PREFIX)
+
+
+class TokenBucket:
+    """
+    令牌桶
+    按 rate 每秒补充令牌，最多积攒 burst 个；遇到限频时速率减半，
+    之后每次成功调用按加法逐步恢复到配置速率
+    """
+
+    def __init__(self, rate: float, burst: int = None, min_rate: float = 0.5):
+        self.max_rate = max(min_rate, rate)
+        self.min_rate = min_rate
+        self.rate = self.max_rate
+        self.burst = max(1, burst or int(rate))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """取一个令牌，令牌不足时等待，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_success(self):
+        """调用成功，逐步恢复速率"""
+        with self.lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def on_throttle(self):
+        """被限频，速率减半并清空积攒的令牌"""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+
+class SlidingWindowLimiter:
+    """
+    滑动窗口限频器
+    保证任意 window 秒内最多放行 limit 次，用于按"每分钟最多 N 条"限频的 Webhook 机器人；
+    窗口内未满时立即放行，满时等到最早的一次移出窗口
+    """
+
+    def __init__(self, limit: int, window: float = 60.0):
+        self.limit = max(1, int(limit))
+        self.window = window
+        self.sent = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """取得一次发送额度，窗口已满时等待，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.sent and now - self.sent[0] >= self.window:
+                    self.sent.popleft()
+                if len(self.sent) < self.limit:
+                    self.sent.append(now)
+                    return waited
+                delay = self.sent[0] + self.window - now
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    """
+    云API限频器
+    每个 (账号, 产品, 接口) 使用独立的令牌桶，与腾讯云按账号、按接口限频的方式一致，
+    并统计请求、限频和等待次数
+    """
+
+    def __init__(self, rate: float = 20, burst: int = None, max_retries: int = 3,
+                 retry_backoff: float = 1.0):
+        """
+        :param rate: 每个接口每秒请求数
+        :param burst: 允许的突发请求数，默认等于 rate
+        :param max_retries: 被限频后的最大重试次数
+        :param retry_backoff: 首次重试前的等待秒数，之后每次翻倍
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.logger = logging.getLogger('TencentCloudMonitor')
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'throttled': 0, 'retries': 0, 'waits': 0, 'wait_time': 0.0}
+        self.throttled_apis = {}
+
+    def configure(self, rate: float = None, burst: int = None, max_retries: int = None,
+                  retry_backoff: float = None):
+        """更新限频配置并清空已有的令牌桶"""
+        with self.lock:
+            if rate is not None:
+                self.rate = rate
+            if burst is not None:
+                self.burst = burst
+            if max_retries is not None:
+                self.max_retries = max(0, max_retries)
+            if retry_backoff is not None:
+                self.retry_backoff = retry_backoff
+            self.buckets.clear()
+
+    def bucket(self, account: str, product: str, action: str) -> TokenBucket:
+        """获取接口对应的令牌桶"""
+        key = (account, product, action)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def call(self, account: str, product: str, action: str, func):
+        """
+        在限频控制下调用接口，被限频时降低速率并按带抖动的指数退避重试
+        :param func: 无参可调用对象，执行实际的接口请求
+        """
+        bucket = self.bucket(account, product, action)
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            with self.lock:
+                self.stats['requests'] += 1
+                if waited:
+                    self.stats['waits'] += 1
+                    self.stats['wait_time'] += waited
+            try:
+                result = func()
+            except Exception as e:
+                if not is_throttle_error(e):
+                    raise
+                bucket.on_throttle()
+                with self.lock:
+                    self.stats['throttled'] += 1
+                    name = f"{product}.{action}"
+                    self.throttled_apis[name] = self.throttled_apis.get(name, 0) + 1
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                attempt += 1
+                with self.lock:
+                    self.stats['retries'] += 1
+                self.logger.warning(
+                    f"[限频] {product}.{action} 被限频，{delay:.2f}s 后第 {attempt} 次重试，"
+                    f"当前速率 {bucket.rate:.1f} 次/秒"
+                )
+                time.sleep(delay)
+                continue
+            bucket.on_success()
+            return result
+
+    def get_stats(self) -> Dict:
+        """获取限频统计"""
+        with self.lock:
+            return dict(self.stats, apis=dict(self.throttled_apis))
+
+    def reset_stats(self):
+        """清空统计，每次运行开始时调用"""
+        with self.lock:
+            for key in self.stats:
+                self.stats[key] = 0
+            self.stats['wait_time'] = 0.0
+            self.throttled_apis.clear()
@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import logging
+import threading
+
+class EmptyRegionCache:
+    """
+    空区域缓存
+    记录查询结果为空的 (账号, 服务, 区域)，在有效期内跳过这些区域，
+    过期后重新探测；查询失败的结果不会被记为空区域
+    """
+
+    def __init__(self, path: str = os.path.join('data', 'empty_regions.json'), ttl_hours: float = 24):
+        """
+        :param path: 缓存文件路径
+        :param ttl_hours: 空区域的跳过时长（小时），为 0 时不跳过任何区域
+        """
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.logger = logging.getLogger('TencentCloudMonitor')
+        self.lock = threading.Lock()
+        self.entries = self._load()
+        self.stats = {'skipped': 0, 'probed': 0, 'emptied': 0, 'revived': 0}
+
+    @staticmethod
+    def _key(account_name: str, service_name: str, region: str) -> str:
+        return f"{account_name}|{service_name}|{region}"
+
+    def should_skip(self, account_name: str, service_name: str, region: str) -> bool:
+        """判断区域是否在空区域有效期内"""
+        if self.ttl <= 0:
+            return False
+        with self.lock:
+            checked_at = self.entries.get(self._key(account_name, service_name, region))
+            if checked_at is not None and time.time() - checked_at < self.ttl:
+                self.stats['skipped'] += 1
+                return True
+            return False
+
+    def record(self, account_name: str, service_name: str, region: str, count: int, error: Exception = None):
+        """
+        记录一次区域查询结果
+        :param count: 查询到的资源数量
+        :param error: 查询异常，有异常时不更新缓存
+        """
+        if error is not None:
+            return
+        key = self._key(account_name, service_name, region)
+        with self.lock:
+            self.stats['probed'] += 1
+            if count:
+                if self.entries.pop(key, None) is not None:
+                    self.stats['revived'] += 1
+            else:
+                if key not in self.entries:
+                    self.stats['emptied'] += 1
+                self.entries[key] = time.time()
+
+    def save(self):
+        """写入缓存文件，先写临时文件再替换，避免中断时损坏"""
+        with self.lock:
+            data = dict(self.entries)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.logger.error(f"保存空区域缓存失败: {str(e)}")
+
+    def get_stats(self) -> dict:
+        """获取跳过和探测次数"""
+        with self.lock:
+            return dict(self.stats, cached=len(self.entries))
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return {key: float(value) for key, value in json.load(f).items()}
+        except Exception as e:
+            self.logger.warning(f"读取空区域缓存失败，将重新探测所有区域: {str(e)}")
+            return {}
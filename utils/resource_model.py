@@ -0,0 +1,92 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, Tuple
+
+# 未设置字段的占位值，与字典中不存在该键等价
+_MISSING = object()
+
+
+class ResourceRecord(Mapping):
+    """
+    资源记录
+    使用 __slots__ 存储固定字段，不为每条资源分配字典，也不重复保存字段名；
+    同时实现只读映射接口，resource['Zone']、resource.get('ProjectName', ...)、
+    'Zone' in resource 等用法与原来的字典一致，未设置的字段视为不存在
+    """
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, values.pop(field, _MISSING))
+        if values:
+            raise TypeError(f"{type(self).__name__} 不支持的字段: {', '.join(values)}")
+
+    @classmethod
+    def from_mapping(cls, resource: Mapping) -> 'ResourceRecord':
+        """从字典或其他记录中取出本类型的字段，源中不存在的字段保持未设置"""
+        record = cls.__new__(cls)
+        for field in cls.FIELDS:
+            setattr(record, field, resource.get(field, _MISSING))
+        return record
+
+    def __getitem__(self, key: str):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.FIELDS:
+            raise KeyError(f"{type(self).__name__} 没有字段 {key}")
+        setattr(self, key, value)
+
+    def get(self, key: str, default=None):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        return default
+
+    def __contains__(self, key) -> bool:
+        return key in self.FIELDS and getattr(self, key) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self.FIELDS:
+            if getattr(self, field) is not _MISSING:
+                yield field
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict:
+        """转换为普通字典，用于序列化"""
+        return {field: getattr(self, field) for field in self}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def define_record(name: str, fields: Tuple[str, ...]) -> type:
+    """按字段列表定义资源记录类型"""
+    return type(name, (ResourceRecord,), {'__slots__': fields, 'FIELDS': fields})
+
+
+# 区域资源在采集后会补充 Region 字段
+CVMRecord = define_record('CVMRecord', (
+    'Type', 'InstanceId', 'InstanceName', 'Zone', 'ProjectName', 'ExpiredTime', 'DifferDays', 'Region'
+))
+LighthouseRecord = define_record('LighthouseRecord', (
+    'Type', 'InstanceId', 'InstanceName', 'Zone', 'ExpiredTime', 'DifferDays', 'Region'
+))
+CBSRecord = define_record('CBSRecord', (
+    'Type', 'DiskId', 'DiskName', 'ProjectId', 'ProjectName', 'Zone', 'ExpiredTime', 'DifferDays',
+    'Status', 'Region'
+))
+DomainRecord = define_record('DomainRecord', (
+    'Type', 'DomainId', 'Domain', 'ProjectId', 'ProjectName', 'Zone', 'ExpiredTime', 'DifferDays', 'Status'
+))
+SSLRecord = define_record('SSLRecord', (
+    'Type', 'CertificateId', 'Domain', 'AllDomains', 'ProjectId', 'ProjectName', 'ExpiredTime',
+    'DifferDays', 'Status', 'IsWildcard', 'ProductName'
+))
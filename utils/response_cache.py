@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional
+
+class ResponseCacheMiss(Exception):
+    """离线模式下缓存中没有对应的响应"""
+
+
+class ResponseCache:
+    """
+    云API响应缓存
+    以 (账号, 产品, 接口, 区域, 参数) 的哈希为键，将压缩后的响应保存在本地 SQLite 中。
+    在线模式下未过期的缓存直接返回；离线模式下只读缓存，忽略有效期，未命中时抛出 ResponseCacheMiss
+    """
+
+    def __init__(self, path: str = os.path.join('data', 'api_cache.db'), offline: bool = False,
+                 ttl_overrides: Dict[str, float] = None):
+        """
+        :param path: 缓存文件路径
+        :param offline: 是否只从缓存读取，不访问网络
+        :param ttl_overrides: 按产品覆盖服务默认的缓存有效期（秒），如 {'cvm': 600}
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.offline = offline
+        self.ttl_overrides = ttl_overrides or {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0}
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                cache_key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(account: str, product: str, action: str, region: str, params: Optional[Dict]) -> str:
+        """生成缓存键，只保存哈希值，不落盘账号密钥等原始信息"""
+        raw = json.dumps([account, product, action, region, params or {}],
+                         sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def ttl_for(self, product: str, default_ttl: float) -> float:
+        """获取产品的缓存有效期"""
+        return self.ttl_overrides.get(product, default_ttl)
+
+    def get(self, key: str, ttl: float) -> Optional[Dict]:
+        """
+        读取缓存的响应
+        :param ttl: 有效期（秒），离线模式下忽略
+        :return: 响应字典，未命中或已过期时返回 None；离线模式下未命中抛出 ResponseCacheMiss
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT body, created_at FROM responses WHERE cache_key = ?", (key,)
+            ).fetchone()
+            fresh = row is not None and (self.offline or time.time() - row[1] < ttl)
+            self.stats['hits' if fresh else 'misses'] += 1
+
+        if fresh:
+            return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+        if self.offline:
+            raise ResponseCacheMiss("离线模式下缓存中没有该请求的响应")
+        return None
+
+    def put(self, key: str, response: Dict):
+        """保存响应"""
+        body = zlib.compress(json.dumps(response, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, body, created_at) VALUES (?, ?, ?)",
+                (key, body, time.time())
+            )
+            self.connection.commit()
+            self.stats['stores'] += 1
+
+    def prune(self, max_age: float = 7 * 86400) -> int:
+        """清理超过 max_age 秒的缓存，返回清理数量"""
+        with self.lock:
+            cursor = self.connection.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - max_age,)
+            )
+            self.connection.commit()
+            return cursor.rowcount
+
+    def get_stats(self) -> Dict:
+        """获取命中统计"""
+        with self.lock:
+            return dict(self.stats)
+
+    def close(self):
+        """关闭缓存数据库"""
+        with self.lock:
+            self.connection.close()
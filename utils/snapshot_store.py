@@ -0,0 +1,110 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Tuple
+
+# 资源类型对应的唯一标识字段
+RESOURCE_ID_FIELDS = {
+    'CVM': 'InstanceId',
+    'Lighthouse': 'InstanceId',
+    'CBS': 'DiskId',
+    'Domain': 'DomainId',
+    'SSL': 'CertificateId',
+}
+
+def content_hash(values: Iterable) -> str:
+    """计算资源内容的哈希值，调用方需自行排除剩余天数等每天变化的字段"""
+    data = json.dumps(list(values), ensure_ascii=False, default=str, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class SnapshotStore:
+    """
+    本地资源快照
+    以 (账号, 类型, 资源ID) 为键记录上次写入时的内容哈希和批次号，
+    用于判断资源是否发生变化，只对新增或变化的资源做完整写入
+    """
+
+    def __init__(self, path: str = os.path.join('data', 'snapshots.db')):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                account_name TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                resource_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                batch_number TEXT,
+                seen_at TEXT NOT NULL,
+                PRIMARY KEY (account_name, kind, resource_id)
+            )
+        """)
+        self.connection.commit()
+
+    def diff(self, account_name: str, kind: str, hashes: Dict[str, str]) -> Tuple[list, Dict[str, str]]:
+        """
+        与上次快照比较
+        :param hashes: {资源ID: 内容哈希}
+        :return: (新增或变化的资源ID列表, {未变化的资源ID: 上次写入的批次号})
+        """
+        previous = {}
+        ids = list(hashes)
+        with self.lock:
+            # SQLite 默认限制单条语句的参数个数，分段查询
+            for offset in range(0, len(ids), 500):
+                chunk = ids[offset:offset + 500]
+                rows = self.connection.execute(
+                    f"SELECT resource_id, content_hash, batch_number FROM snapshots "
+                    f"WHERE account_name = ? AND kind = ? AND resource_id IN ({', '.join('?' * len(chunk))})",
+                    [account_name, kind] + chunk
+                )
+                for resource_id, digest, batch_number in rows:
+                    previous[resource_id] = (digest, batch_number)
+
+        changed, unchanged = [], {}
+        for resource_id, digest in hashes.items():
+            old = previous.get(resource_id)
+            if old and old[0] == digest:
+                unchanged[resource_id] = old[1]
+            else:
+                changed.append(resource_id)
+        return changed, unchanged
+
+    def commit(self, account_name: str, kind: str, entries: Dict[str, Tuple[str, str]]):
+        """
+        记录写入成功的资源
+        :param entries: {资源ID: (内容哈希, 批次号)}
+        """
+        if not entries:
+            return
+        seen_at = datetime.now().isoformat(timespec='seconds')
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO snapshots "
+                "(account_name, kind, resource_id, content_hash, batch_number, seen_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(account_name, kind, resource_id, digest, batch_number, seen_at)
+                 for resource_id, (digest, batch_number) in entries.items()]
+            )
+            self.connection.commit()
+
+    def prune(self, max_age_days: int = 30) -> int:
+        """清理长时间未出现的资源快照（资源已释放），返回清理数量"""
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat(timespec='seconds')
+        with self.lock:
+            cursor = self.connection.execute("DELETE FROM snapshots WHERE seen_at < ?", (cutoff,))
+            self.connection.commit()
+            return cursor.rowcount
+
+    def close(self):
+        """关闭快照数据库"""
+        with self.lock:
+            self.connection.close()
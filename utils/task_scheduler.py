@@ -0,0 +1,117 @@
+import time
+import logging
+from collections import OrderedDict, deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Iterator, List, Optional
+from utils.metrics import METRICS
+
+
+class CollectionTask:
+    """采集任务，对应一个 (账号, 区域, 服务) 组合"""
+
+    def __init__(self, account_name: str, scope: str, service_name: str,
+                 region: Optional[str], func: Callable, default=None):
+        """
+        :param account_name: 账号名称
+        :param scope: 任务类型，regional / global / billing
+        :param service_name: 服务名称，如 CVM、SSL、Billing
+        :param region: 区域，全局服务为 None
+        :param func: 无参可调用对象，返回采集结果
+        :param default: 任务执行异常时使用的结果
+        """
+        self.account_name = account_name
+        self.scope = scope
+        self.service_name = service_name
+        self.region = region
+        self.func = func
+        self.default = default
+
+    def __repr__(self):
+        return f"{self.account_name}/{self.service_name}/{self.region or '-'}"
+
+
+class TaskResult:
+    """采集任务的执行结果"""
+
+    def __init__(self, index: int, task: CollectionTask, result, elapsed: float, error: Exception = None):
+        self.index = index
+        self.task = task
+        self.result = result
+        self.elapsed = elapsed
+        self.error = error
+
+
+class CollectionScheduler:
+    """
+    采集任务调度器
+    将所有任务分发到有界线程池中执行，同时限制全局并发数和单账号并发数
+    """
+
+    def __init__(self, max_workers: int = 8, max_workers_per_account: int = 4):
+        self.max_workers = max(1, max_workers)
+        self.max_workers_per_account = max(1, max_workers_per_account)
+        self.logger = logging.getLogger('TencentCloudMonitor')
+
+    def run(self, tasks: Iterable[CollectionTask]) -> List[TaskResult]:
+        """执行所有任务，按任务提交顺序返回结果"""
+        return sorted(self.iter_results(tasks), key=lambda item: item.index)
+
+    def iter_results(self, tasks: Iterable[CollectionTask]) -> Iterator[TaskResult]:
+        """执行所有任务，按完成顺序逐个返回结果"""
+        # 按账号分队列，轮流提交，避免单个账号占满线程池
+        queues = OrderedDict()
+        for index, task in enumerate(tasks):
+            queues.setdefault(task.account_name, deque()).append((index, task))
+
+        total = sum(len(queue) for queue in queues.values())
+        if not total:
+            return
+
+        in_flight = defaultdict(int)
+        running = {}
+        task_time = 0.0
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while queues or running:
+                for account_name in list(queues):
+                    queue = queues[account_name]
+                    while (queue and len(running) < self.max_workers
+                           and in_flight[account_name] < self.max_workers_per_account):
+                        index, task = queue.popleft()
+                        future = executor.submit(self._execute, task)
+                        running[future] = (index, task)
+                        in_flight[account_name] += 1
+                    if not queue:
+                        del queues[account_name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, task = running.pop(future)
+                    in_flight[task.account_name] -= 1
+                    result, elapsed, error = future.result()
+                    task_time += elapsed
+
+                    if error:
+                        self.logger.error(f"[采集] {task} 执行失败，耗时 {elapsed:.2f}s: {str(error)}")
+                    else:
+                        self.logger.info(f"[采集] {task} 完成，耗时 {elapsed:.2f}s")
+
+                    yield TaskResult(index, task, result, elapsed, error)
+
+        wall_time = time.perf_counter() - start
+        self.logger.info(
+            f"[采集] 共 {total} 个任务，总耗时 {wall_time:.2f}s，"
+            f"任务累计耗时 {task_time:.2f}s，并发数 {self.max_workers}/{self.max_workers_per_account}"
+        )
+
+    def _execute(self, task: CollectionTask):
+        """在工作线程中执行任务并计时"""
+        start = time.perf_counter()
+        try:
+            with METRICS.span('collect', account=task.account_name, service=task.service_name,
+                              region=task.region or '-', scope=task.scope):
+                result = task.func()
+            return result, time.perf_counter() - start, None
+        except Exception as e:
+            return task.default, time.perf_counter() - start, e
@@ -1,15 +1,77 @@
-import pytz
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
+# 北京时间固定为 UTC+8，没有夏令时，直接使用固定偏移，避免每次查询时区数据库
+BEIJING_TZ = timezone(timedelta(hours=8), 'Asia/Shanghai')
+_UTC_OFFSET = timedelta(hours=8)
+
+# 本次运行的统一参考时间，同一次运行内所有资源的剩余天数都以它为准
+_reference_now: Optional[datetime] = None
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """
+    解析云API返回的时间字符串，返回不带时区的北京时间
+    支持 "YYYY-MM-DDTHH:MM:SSZ"（UTC）、"YYYY-MM-DD HH:MM:SS" 和 "YYYY-MM-DD"（北京时间），
+    按固定位置切片解析，比 strptime 快得多；空值或无法解析时返回 None
+    """
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+        parsed = datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                          int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    except (TypeError, ValueError):
+        return None
+    if value.endswith('Z'):
+        parsed += _UTC_OFFSET
+    return parsed
 
 def convert_utc_to_beijing(utc_time_str):
     """将UTC时间字符串转换为北京时间"""
-    utc_time = datetime.strptime(utc_time_str, "%Y-%m-%dT%H:%M:%SZ")
-    utc_time = utc_time.replace(tzinfo=pytz.UTC)
-    beijing_tz = pytz.timezone('Asia/Shanghai')
-    beijing_time = utc_time.astimezone(beijing_tz)
-    return beijing_time
+    beijing_time = parse_time(utc_time_str)
+    if beijing_time is None:
+        raise ValueError(f"无法解析的时间: {utc_time_str!r}")
+    return beijing_time.replace(tzinfo=BEIJING_TZ)
 
 def get_beijing_now():
     """获取北京当前时间"""
-    beijing_tz = pytz.timezone('Asia/Shanghai')
-    return datetime.now(beijing_tz) 
\ No newline at end of file
+    return datetime.now(BEIJING_TZ)
+
+def begin_run(now: datetime = None) -> datetime:
+    """
+    设置本次运行的参考时间，每次采集开始时调用
+    :param now: 指定参考时间，默认为北京当前时间
+    """
+    global _reference_now
+    _reference_now = (now or get_beijing_now()).astimezone(BEIJING_TZ).replace(tzinfo=None)
+    return _reference_now
+
+def get_reference_now() -> datetime:
+    """获取本次运行的参考时间（不带时区的北京时间），未调用 begin_run 时返回当前时间"""
+    if _reference_now is not None:
+        return _reference_now
+    return get_beijing_now().replace(tzinfo=None)
+
+def compute_differ_days(expired_times: Iterable[Optional[str]], now: datetime = None) -> List[Optional[int]]:
+    """
+    批量计算剩余天数，与 (过期时间 - 当前时间).days 一致（向下取整）
+    同一过期时间只解析一次，没有过期时间（如按量计费实例）的资源返回 None
+    :param expired_times: 云API返回的过期时间字符串列表
+    :param now: 参考时间（不带时区的北京时间），默认为本次运行的参考时间
+    :return: 与输入顺序一致的剩余天数列表
+    """
+    now = now or get_reference_now()
+    cache = {}
+    result = []
+    for value in expired_times:
+        if value not in cache:
+            expired_time = parse_time(value)
+            cache[value] = None if expired_time is None else (expired_time - now).days
+        result.append(cache[value])
+    return result
+
+def format_time(value: Optional[str]) -> Optional[str]:
+    """将云API返回的时间字符串转换为 "YYYY-MM-DD HH:MM:SS" 格式的北京时间"""
+    parsed = parse_time(value)
+    return parsed.isoformat(' ') if parsed is not None else None